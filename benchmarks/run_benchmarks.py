@@ -0,0 +1,234 @@
+"""Benchmarks of the CLASS model.
+
+Times ``Model.run()`` over the matrix of component switches and over run lengths and time
+steps, ``ModelOutput.to_pandas()``, and the throughput of ensembles and parallel sweeps in
+members per second. The results are written as JSON; with ``--baseline`` they are compared
+with an earlier result file, and the script exits with status 1 if a benchmark is slower
+than the baseline by more than the threshold::
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --output current.json --baseline baseline.json
+
+Timings are the minimum over ``--repeat`` runs, which is the least sensitive to other load
+on the machine. Use ``--quick`` for a smaller selection of the switch matrix.
+
+The time of ``import classmodel.model`` in a fresh interpreter, which adds to the latency of
+every worker process and short-lived job, is also measured; the script exits with status 1
+if it exceeds ``--import-budget``.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from datetime import UTC, datetime
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+from classmodel.sweep import grid, run_sweep
+
+# land surface settings: off, Jarvis-Stewart or A-gs
+LAND_SURFACE = {
+    "none": {"sw_ls": False},
+    "js": {"sw_ls": True, "ls_type": "js"},
+    "ags": {"sw_ls": True, "ls_type": "ags"},
+}
+
+# switches that are combined in the switch matrix, besides the land surface
+SWITCHES = ("sw_ml", "sw_sl", "sw_rad", "sw_cu", "sw_wind")
+
+# switch combinations of the quick selection
+QUICK = ("ml", "ml+sl+rad+ls_js", "ml+sl+rad+ls_ags", "ml+sl+rad+cu+wind+ls_ags")
+
+# run lengths [s] and time steps [s] of the configuration with all components; the default
+# run length is 12 h and the default time step 60 s
+RUNTIMES = (3 * 3600.0, 6 * 3600.0, 24 * 3600.0)
+TIMESTEPS = (30.0, 60.0, 300.0)
+
+# ensemble and sweep sizes [members]
+ENSEMBLE_SIZES = (16, 256)
+SWEEP_SIZE = 32
+
+# budget of the time of importing the model [s]; pandas alone takes about as long
+IMPORT_BUDGET = 0.25
+
+# switches of the configuration with all components
+FULL = {"sw_sl": True, "sw_rad": True, "sw_ls": True, "ls_type": "ags", "sw_cu": True, "sw_wind": True}
+
+
+def switch_matrix():
+    """Yield the name and configuration of every valid combination of switches.
+
+    The A-gs land surface needs the radiation, so it is only combined with ``sw_rad``.
+    """
+    for values in itertools.product((False, True), repeat=len(SWITCHES)):
+        for ls, settings in LAND_SURFACE.items():
+            switches = dict(zip(SWITCHES, values, strict=True), **settings)
+            if ls == "ags" and not switches["sw_rad"]:
+                continue
+            parts = [name[3:] for name, value in zip(SWITCHES, values, strict=True) if value]
+            if ls != "none":
+                parts.append(f"ls_{ls}")
+            yield "+".join(parts) or "none", CLASSConfig(**switches)
+
+
+def best_time(function, repeat):
+    """Return the minimum and median wall time of ``repeat`` calls of ``function`` [s]."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"time": min(times), "median": float(np.median(times)), "repeat": repeat}
+
+
+def bench_run(config, repeat):
+    """Time a run of the scalar model."""
+
+    def run():
+        Model(config).run()
+
+    return best_time(run, repeat)
+
+
+def bench_import(repeat, module="classmodel.model"):
+    """Time the import of ``module`` in a fresh interpreter, without the startup of the interpreter."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = [
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeat)
+    ]
+    return {"time": min(times), "median": float(np.median(times)), "repeat": repeat}
+
+
+def bench_to_pandas(config, repeat):
+    """Time the conversion of the output of a run to a DataFrame."""
+    model = Model(config)
+    model.run()
+    return best_time(model.out.to_pandas, repeat)
+
+
+def bench_ensemble(config, nmembers, repeat):
+    """Time an ensemble run of ``nmembers`` members, which differ in their initial soil moisture."""
+    ensemble = replace(config, wg=np.linspace(0.2, 0.3, nmembers))
+
+    def run():
+        EnsembleModel(ensemble).run()
+
+    result = best_time(run, repeat)
+    result["members_per_second"] = nmembers / result["time"]
+    return result
+
+
+def bench_sweep(config, nmembers, repeat, max_workers):
+    """Time a sweep of ``nmembers`` runs over worker processes."""
+    configs = list(grid(config, wg=np.linspace(0.2, 0.3, nmembers)))
+
+    def run():
+        run_sweep(configs, max_workers=max_workers)
+
+    result = best_time(run, repeat)
+    result["members_per_second"] = nmembers / result["time"]
+    return result
+
+
+def run_benchmarks(repeat=3, quick=False, max_workers=None, log=print):
+    """Run all benchmarks and return the results by name."""
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        log(f"{name:<48}{result['time']:>10.4f} s")
+
+    record("import/model", bench_import(max(repeat, 5)))
+
+    for name, config in switch_matrix():
+        if not quick or name in QUICK:
+            record(f"run/switches/{name}", bench_run(config, repeat))
+
+    full = CLASSConfig(**FULL)
+    for runtime in RUNTIMES:
+        record(f"run/runtime/{runtime / 3600:g}h", bench_run(replace(full, runtime=runtime), repeat))
+    for dt in TIMESTEPS:
+        record(f"run/dt/{dt:g}s", bench_run(replace(full, dt=dt), repeat))
+
+    record("output/to_pandas", bench_to_pandas(full, 10 * repeat))
+
+    for nmembers in ENSEMBLE_SIZES:
+        record(f"ensemble/{nmembers}", bench_ensemble(full, nmembers, repeat))
+    record(f"sweep/{SWEEP_SIZE}", bench_sweep(full, SWEEP_SIZE, repeat, max_workers))
+    return results
+
+
+def metadata():
+    """Return a description of the environment of the benchmarks."""
+    return {
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Compare timings with a baseline; returns the names of benchmarks that became slower.
+
+    A benchmark regresses if its time exceeds the baseline time by more than the fraction
+    ``threshold``. Benchmarks that are missing in either file are skipped.
+    """
+    regressions = []
+    print(f"{'benchmark':<48}{'baseline':>10}{'current':>10}{'ratio':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["time"] / baseline[name]["time"]
+        flag = ""
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+            flag = "  slower"
+        print(f"{name:<48}{baseline[name]['time']:>10.4f}{result['time']:>10.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks, write the results and compare them with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmarks.json", help="file to write the results to")
+    parser.add_argument("--baseline", help="result file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown relative to the baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per benchmark")
+    parser.add_argument("--quick", action="store_true", help="only run a selection of the switch matrix")
+    parser.add_argument(
+        "--import-budget", type=float, default=IMPORT_BUDGET, help="allowed time of importing the model [s]"
+    )
+    parser.add_argument("--max-workers", type=int, help="number of processes of the sweep benchmark")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat, args.quick, args.max_workers)
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+
+    status = 0
+    if results["import/model"]["time"] > args.import_budget:
+        print(f"importing the model takes longer than the budget of {args.import_budget:g} s")
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,10 @@
 #
 
 import matplotlib.pyplot as plt
-from classmodel.model import Model, ModelInput
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
 
-run1input = ModelInput()
+run1input = CLASSConfig()
 r1 = Model(run1input)
 r1.run()
 
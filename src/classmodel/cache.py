@@ -0,0 +1,215 @@
+"""Cache of model results, keyed on the configuration.
+
+A :class:`ResultCache` stores the :class:`classmodel.output.ModelOutput` of a run under a
+hash of all fields of its :class:`classmodel.config.CLASSConfig`, the model class and the
+package version, so that a repeated request for the same configuration skips the integration::
+
+    cache = ResultCache("~/.cache/classmodel")
+    out = cache.run(config)
+
+Results are held in two tiers: the most recently used results in memory, and all results in
+``.npz`` files in a directory. The directory is limited to ``max_bytes``; the least recently
+used files are removed first, and so are temporary files that writers left behind. Both tiers
+return copies, so changing a returned output does not change the cache.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import fields
+from importlib.metadata import PackageNotFoundError, version
+
+import numpy as np
+
+from classmodel.forcing import TimeSeries
+from classmodel.model import Model
+from classmodel.output import ModelOutput
+
+try:
+    VERSION = version("classmodel")
+except PackageNotFoundError:
+    VERSION = "unknown"
+
+# age after which a temporary file is taken to be left behind by a writer that died [s]
+STALE_TEMPORARY = 600.0
+
+
+def _canonical(value):
+    # JSON representation of a configuration value that is equal for equal values
+    if isinstance(value, TimeSeries):
+        return {"series": [_canonical(value.time), _canonical(value.values)]}
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return {"objects": [_canonical(v) for v in value.flat], "shape": value.shape}
+    if isinstance(value, np.ndarray):
+        return {"array": value.tolist(), "dtype": value.dtype.str, "shape": value.shape}
+    if isinstance(value, tuple):
+        return {"tuple": [_canonical(v) for v in value]}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def config_key(config, cls=Model):
+    """Return the cache key of a run of ``cls`` with ``config``: a SHA-256 hex digest."""
+    description = {
+        "version": VERSION,
+        "class": f"{cls.__module__}.{cls.__qualname__}",
+        "config": {f.name: _canonical(getattr(config, f.name)) for f in fields(config)},
+    }
+    text = json.dumps(description, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _copy(out):
+    return ModelOutput.from_buffer(out.data.copy(), out.variables)
+
+
+class ResultCache:
+    """Two-tier cache of model output.
+
+    ``path`` is the directory of the on-disk tier (None for a cache in memory only), which is
+    limited to ``max_bytes``; the memory tier holds up to ``memory_items`` results. The numbers
+    of hits per tier, misses and evictions are counted in ``stats()``.
+    """
+
+    def __init__(self, path=None, max_bytes=2**30, memory_items=32):
+        """Open the cache; the directory ``path`` is created if it does not exist."""
+        self.path = None if path is None else os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.npz")
+
+    def run(self, config, cls=Model):
+        """Return the output of a run of ``cls`` with ``config``; runs the model on a miss."""
+        key = config_key(config, cls)
+        out = self._get(key)
+        if out is not None:
+            return out
+
+        self.misses += 1
+        model = cls(config)
+        model.run()
+        self._put(key, model.out)
+        return _copy(model.out)
+
+    def get(self, config, cls=Model):
+        """Return the cached output of a run of ``cls`` with ``config``, or None."""
+        out = self._get(config_key(config, cls))
+        if out is None:
+            self.misses += 1
+        return out
+
+    def put(self, config, out, cls=Model):
+        """Store the output of a run of ``cls`` with ``config``."""
+        self._put(config_key(config, cls), out)
+
+    def contains(self, config, cls=Model):
+        """Return whether the output of a run of ``cls`` with ``config`` is cached."""
+        key = config_key(config, cls)
+        return key in self.memory or (self.path is not None and os.path.exists(self._file(key)))
+
+    def __contains__(self, config):
+        """Return whether a run of Model with ``config`` is cached; see :meth:`contains` for other classes."""
+        return self.contains(config)
+
+    def _get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits_memory += 1
+            return _copy(self.memory[key])
+
+        if self.path is None:
+            return None
+        try:
+            with np.load(self._file(key)) as data:
+                out = ModelOutput.from_buffer(data["data"], tuple(str(name) for name in data["variables"]))
+            # the modification time of a file records its last use, which orders the eviction
+            os.utime(self._file(key))
+        except FileNotFoundError:
+            # not cached, or evicted by another process
+            return None
+
+        self.hits_disk += 1
+        self._remember(key, out)
+        return _copy(out)
+
+    def _put(self, key, out):
+        out = _copy(out)
+        self._remember(key, out)
+        if self.path is None:
+            return
+
+        # write to a temporary file first, so that other processes never read a partial file
+        temporary = os.path.join(self.path, f"{key}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as f:
+            np.savez(f, data=out.data, variables=np.array(out.variables))
+        os.replace(temporary, self._file(key))
+        self._evict()
+
+    def _remember(self, key, out):
+        if self.memory_items <= 0:
+            return
+        self.memory[key] = out
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        # remove the least recently used files until the directory fits in max_bytes; temporary
+        # files that are being written count toward the size, stale ones are removed
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.path):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".tmp") and now - stat.st_mtime > STALE_TEMPORARY:
+                    os.remove(entry.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".npz"):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            if entry.name.endswith((".npz", ".tmp")):
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all results from both tiers."""
+        self.memory.clear()
+        if self.path is not None:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".npz"):
+                    os.remove(entry.path)
+
+    def stats(self):
+        """Return the numbers of hits, misses and evictions, and the hit rate."""
+        hits = self.hits_memory + self.hits_disk
+        requests = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hits / requests if requests else 0.0,
+            "memory_items": len(self.memory),
+        }
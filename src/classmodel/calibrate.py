@@ -0,0 +1,274 @@
+"""Calibration of configuration parameters against observed time series.
+
+A :class:`Calibration` compares model output with observations, given as a table with the
+columns ``time`` (in the units of the output time ``t``: hours of the day), ``variable`` (a
+name of :data:`classmodel.output.VARIABLES`) and ``value``, and an optional column ``weight``.
+The misfit of a run is half the weighted sum of squares of the differences between the output,
+interpolated linearly to the times of the observations, and the observations::
+
+    calibration = Calibration(config, observations, {"beta": (0.05, 0.5), "wg": (0.15, 0.35)})
+    result = calibration.differential_evolution(generations=30)
+    result.config  # configuration with the fitted parameters
+
+Two optimizers search the parameters within their bounds:
+
+- :meth:`Calibration.differential_evolution` is derivative free. It evaluates a population of
+  candidates per generation, either as one batched :class:`classmodel.ensemble.EnsembleModel`
+  run or as a parallel sweep over worker processes.
+- :meth:`Calibration.levenberg_marquardt` is a gradient-based least-squares method that takes the
+  derivatives of the output from :func:`classmodel.sensitivity.sensitivities`, where these are
+  available.
+"""
+
+from dataclasses import dataclass, field, fields, replace
+
+import numpy as np
+
+from classmodel.ensemble import SHARED_FIELDS, EnsembleModel
+from classmodel.model import Model
+from classmodel.output import VARIABLES
+from classmodel.sensitivity import sensitivities
+from classmodel.sweep import run_sweep
+
+# ways to evaluate a population of candidates
+EVALUATORS = ("ensemble", "processes")
+
+# differential evolution mutates a candidate with three other members of the population
+DE_MIN_POPSIZE = 4
+
+# bounds of the damping of the Levenberg-Marquardt method
+LM_MIN_DAMPING = 1.0e-12
+LM_MAX_DAMPING = 1.0e12
+
+
+@dataclass
+class CalibrationResult:
+    """Outcome of a calibration."""
+
+    config: object  # configuration with the fitted parameters
+    parameters: dict  # fitted value of every free field
+    misfit: float  # misfit of the fitted configuration
+    evaluations: int  # number of model runs
+    history: list = field(default_factory=list)  # best misfit after every generation or iteration
+
+
+class Calibration:
+    """Weighted least-squares misfit between model runs and observations.
+
+    ``bounds`` maps the free fields of ``config`` to their (lower, upper) bounds. ``weights``
+    optionally maps variables to a weight (such as the inverse of their error variance), which
+    multiplies the weight of each observation.
+    """
+
+    def __init__(self, config, observations, bounds, weights=None):
+        """Check the bounds and the observations; raises ValueError if either is invalid."""
+        self.config = config
+        self.names = tuple(bounds)
+        self.lower = np.array([bounds[name][0] for name in self.names], dtype=float)
+        self.upper = np.array([bounds[name][1] for name in self.names], dtype=float)
+        if not np.all(self.upper > self.lower):
+            raise ValueError("the upper bound of every parameter must exceed its lower bound")
+
+        names = {f.name for f in fields(config)}
+        for name in self.names:
+            value = getattr(config, name, None) if name in names else None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'field "{name}" is not a numeric parameter of the configuration')
+
+        missing = {"time", "variable", "value"} - set(observations.columns)
+        if missing:
+            raise ValueError(f"observations lack the columns {', '.join(sorted(missing))}")
+        stored = VARIABLES if config.output_variables is None else config.output_variables
+        unknown = sorted(set(observations["variable"]) - set(stored))
+        if unknown:
+            raise ValueError(f"observed variables are not in the output: {', '.join(unknown)}")
+
+        # observations grouped by variable; the residuals are in this order
+        weights = weights or {}
+        groups = list(observations.groupby("variable", sort=True))
+        self.times = {variable: group["time"].to_numpy(float) for variable, group in groups}
+        self.values = np.concatenate([group["value"].to_numpy(float) for _, group in groups])
+        weight = np.concatenate(
+            [
+                (group["weight"].to_numpy(float) if "weight" in group else np.ones(len(group)))
+                * weights.get(variable, 1.0)
+                for variable, group in groups
+            ]
+        )
+        self.sqrt_weight = np.sqrt(weight)
+        self.evaluations = 0
+
+    def configure(self, x):
+        """Return the configuration with the parameter vector ``x``."""
+        return replace(self.config, **{name: float(value) for name, value in zip(self.names, x, strict=True)})
+
+    def sample(self, out, t=None):
+        """Interpolate an output (a mapping of variables) to the observations.
+
+        ``t`` gives the output time if ``out`` does not hold it, as for derivatives.
+        """
+        t = np.asarray(out["t"] if t is None else t)
+        return np.concatenate([np.interp(time, t, out[variable]) for variable, time in self.times.items()])
+
+    def residuals(self, out):
+        """Return the weighted differences between an output and the observations."""
+        return self.sqrt_weight * (self.sample(out) - self.values)
+
+    def misfit(self, out):
+        """Return the misfit of an output; infinite if the run failed."""
+        r = self.residuals(out)
+        misfit = 0.5 * float(np.dot(r, r))
+        return misfit if np.isfinite(misfit) else np.inf
+
+    def run(self, x):
+        """Return the output of a run with the parameter vector ``x``, as a mapping of variables."""
+        model = Model(self.configure(x))
+        model.run()
+        self.evaluations += 1
+        return model.out.to_dict()
+
+    def evaluate(self, points, evaluator="ensemble", max_workers=None):
+        """Return the misfit of every parameter vector in ``points``, from runs of all of them together.
+
+        With ``evaluator="ensemble"`` the points are the members of one ensemble run; with
+        ``"processes"`` they are run as a sweep on ``max_workers`` processes.
+        """
+        configs = [self.configure(x) for x in points]
+        if evaluator == "ensemble":
+            ensemble = EnsembleModel(configs)
+            ensemble.run()
+            outputs = [ensemble.out.member(i).to_dict() for i in range(len(configs))]
+        elif evaluator == "processes":
+            table = run_sweep(configs, max_workers=max_workers)
+            outputs = [table.xs(member, level="member") for member in range(len(configs))]
+        else:
+            raise ValueError(f"evaluator must be one of {', '.join(EVALUATORS)}")
+        self.evaluations += len(configs)
+        return np.array([self.misfit(out) for out in outputs])
+
+    def differential_evolution(  # noqa: PLR0913
+        self,
+        *,
+        popsize=16,
+        generations=50,
+        mutation=0.7,
+        crossover=0.9,
+        tol=1.0e-6,
+        seed=None,
+        evaluator="ensemble",
+        max_workers=None,
+    ):
+        """Minimize the misfit with differential evolution (DE/rand/1/bin).
+
+        Every generation evaluates ``popsize`` trial candidates together (see :meth:`evaluate`).
+        The initial population holds the parameters of the configuration and random points
+        within the bounds. Stops after ``generations``, or when the misfits of the population
+        are within ``tol`` (relative) of the best.
+        """
+        if evaluator == "ensemble":
+            shared = [name for name in self.names if name in SHARED_FIELDS]
+            if shared:
+                raise ValueError(f"fields that are shared by ensemble members cannot be free: {', '.join(shared)}")
+        if popsize < DE_MIN_POPSIZE:
+            raise ValueError(f"differential evolution needs a population of at least {DE_MIN_POPSIZE}")
+
+        # search in coordinates that the bounds scale to the unit interval
+        rng = np.random.default_rng(seed)
+        width = self.upper - self.lower
+        population = rng.random((popsize, len(self.names)))
+        population[0] = (self._start() - self.lower) / width
+        misfits = self.evaluate(self.lower + population * width, evaluator, max_workers)
+        history = [float(misfits.min())]
+
+        for _ in range(generations):
+            # mutate with the difference of two other members, and cross over with the target
+            others = np.array([rng.choice(np.delete(np.arange(popsize), i), 3, replace=False) for i in range(popsize)])
+            a, b, c = (population[others[:, k]] for k in range(3))
+            mutant = np.clip(a + mutation * (b - c), 0.0, 1.0)
+            cross = rng.random(population.shape) < crossover
+            cross[np.arange(popsize), rng.integers(len(self.names), size=popsize)] = True
+            trial = np.where(cross, mutant, population)
+
+            trial_misfits = self.evaluate(self.lower + trial * width, evaluator, max_workers)
+            better = trial_misfits <= misfits
+            population[better] = trial[better]
+            misfits[better] = trial_misfits[better]
+
+            best = float(misfits.min())
+            history.append(best)
+            if np.all(np.isfinite(misfits)) and np.ptp(misfits) <= tol * best:
+                break
+
+        best = int(np.argmin(misfits))
+        return self._result(self.lower + population[best] * width, float(misfits[best]), history)
+
+    def levenberg_marquardt(self, x0=None, iterations=30, damping=1.0e-3, tol=1.0e-8):
+        """Minimize the misfit with the Levenberg-Marquardt method, within the bounds.
+
+        The Jacobian of the residuals follows from one run with forward-mode sensitivities per
+        iteration (see :mod:`classmodel.sensitivity`); a step that does not reduce the misfit
+        is retried with more damping. Steps are projected onto the bounds. Stops after
+        ``iterations``, or when a step reduces the misfit by less than ``tol`` (relative).
+        """
+        x = self._start() if x0 is None else np.clip(np.asarray(x0, dtype=float), self.lower, self.upper)
+        width = self.upper - self.lower
+        history = []
+        misfit = None
+        for _ in range(iterations):
+            # residuals and their derivatives to the parameters, scaled by the bounds
+            out, jacobian = sensitivities(self.configure(x), self.names)
+            self.evaluations += 1
+            r = self.residuals(out.to_dict())
+            misfit = 0.5 * float(np.dot(r, r))
+            history.append(misfit)
+            J = np.column_stack(
+                [self.sqrt_weight * self.sample(jacobian[name].to_dict(), out.t) for name in self.names]
+            )
+            J *= width
+            A = J.T @ J
+            g = J.T @ r
+
+            while True:
+                step = np.linalg.solve(A + damping * np.diag(np.diag(A) + np.finfo(float).eps), -g)
+                x_new = np.clip(x + step * width, self.lower, self.upper)
+                r_new = self.residuals(self.run(x_new))
+                misfit_new = 0.5 * float(np.dot(r_new, r_new))
+                if misfit_new < misfit:
+                    damping = max(damping / 3.0, LM_MIN_DAMPING)
+                    break
+                damping *= 3.0
+                if damping > LM_MAX_DAMPING:
+                    # no step within the bounds reduces the misfit
+                    return self._result(x, misfit, history)
+
+            x, converged = x_new, misfit - misfit_new <= tol * misfit
+            misfit = misfit_new
+            if converged:
+                break
+
+        history.append(misfit)
+        return self._result(x, misfit, history)
+
+    def _start(self):
+        # the parameters of the configuration, moved into the bounds
+        return np.clip([getattr(self.config, name) for name in self.names], self.lower, self.upper)
+
+    def _result(self, x, misfit, history):
+        config = self.configure(x)
+        parameters = {name: getattr(config, name) for name in self.names}
+        return CalibrationResult(config, parameters, misfit, self.evaluations, history)
+
+
+def calibrate(config, observations, bounds, method="evolution", weights=None, **options):
+    """Fit the fields in ``bounds`` to ``observations``; returns a :class:`CalibrationResult`.
+
+    ``method`` is ``"evolution"`` (see :meth:`Calibration.differential_evolution`) or
+    ``"levenberg-marquardt"`` (see :meth:`Calibration.levenberg_marquardt`); ``options`` are
+    passed on to the method.
+    """
+    calibration = Calibration(config, observations, bounds, weights)
+    if method == "evolution":
+        return calibration.differential_evolution(**options)
+    if method == "levenberg-marquardt":
+        return calibration.levenberg_marquardt(**options)
+    raise ValueError('method must be "evolution" or "levenberg-marquardt"')
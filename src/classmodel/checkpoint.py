@@ -0,0 +1,150 @@
+"""Checkpoints of a model run.
+
+A checkpoint holds the configuration, the numeric state of the model (prognostic and diagnostic
+variables, time index and counters), the state of the adaptive integrator and the output that
+has been written so far, in a single ``.npz`` file. Constants and other settings that follow from
+the configuration are not stored; they are set up again by ``Model.init`` on restore, after
+which the stored state is put back. A restored run is bit-for-bit identical to a run without
+interruption. The output of the run that a branch continues from (``prefix``) is stored with
+the branch, so that a restored branch still has its :meth:`~classmodel.model.Model.full_output`.
+Registered events are not part of a checkpoint. A model attribute that holds a value that cannot
+be stored (such as a dual number of a sensitivity run) raises a :class:`TypeError`.
+"""
+
+import json
+from dataclasses import fields
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.forcing import TimeSeries
+from classmodel.integrators import DormandPrince
+from classmodel.output import ModelOutput
+from classmodel.state import items
+
+# attributes of the model that are not part of the numeric state: the results and integrator, which are
+# stored separately, and the tables and settings that Model.init sets up from the configuration
+EXCLUDED = (
+    *("input", "out", "prefix", "events", "solver"),
+    *("sltable", "forcing", "solar_time", "solar_sinlea", "solar_Tr"),
+    *("CO2comp298", "Q10CO2", "gm298", "Ammax298", "Q10gm", "T1gm", "T2gm", "Q10Am", "T1Am", "T2Am"),
+    *("f0", "ad", "alpha0", "Kx", "gmin"),
+    *("ls_type", "lcl_type", "ribtol_type", "c3c4", "integrator"),
+    *("output_variables", "output_attributes", "output_reduction"),
+)
+
+# attributes of the adaptive integrator
+SOLVER_STATE = ("h", "t0", "t1", "y0", "y1", "f0", "f1", "nsteps", "nrejected")
+
+
+def _encode(value):
+    # JSON representation of a configuration value
+    if isinstance(value, TimeSeries):
+        return {"series": [_encode(value.time), _encode(value.values)]}
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return {"objects": [_encode(v) for v in value.flat], "shape": value.shape}
+    if isinstance(value, np.ndarray):
+        return {"array": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, tuple):
+        return {"tuple": list(value)}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and "series" in value:
+        return TimeSeries(*(_decode(v) for v in value["series"]))
+    if isinstance(value, dict) and "objects" in value:
+        objects = np.empty(len(value["objects"]), dtype=object)
+        objects[:] = [_decode(v) for v in value["objects"]]
+        return objects.reshape(value["shape"])
+    if isinstance(value, dict) and "array" in value:
+        return np.array(value["array"], dtype=value["dtype"])
+    if isinstance(value, dict) and "tuple" in value:
+        return tuple(value["tuple"])
+    return value
+
+
+def _kind(value):
+    # type of a numeric value, so that it is restored with the same type
+    if value is None:
+        return "none"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, (np.generic, np.ndarray)) and value.dtype.kind in "biuf":
+        return "generic" if isinstance(value, np.generic) else "array"
+    raise TypeError(f"cannot store a {type(value).__name__} in a checkpoint")
+
+
+def _pack(obj, names, prefix, arrays):
+    # store the numeric attributes of obj in arrays; returns their kinds
+    kinds = {}
+    for name in names:
+        value = getattr(obj, name)
+        try:
+            kind = _kind(value)
+        except TypeError as e:
+            raise TypeError(f"{e} (attribute {name!r} of {type(obj).__name__})") from None
+        kinds[name] = kind
+        if kind != "none":
+            arrays[f"{prefix}.{name}"] = np.asarray(value)
+    return kinds
+
+
+def _unpack(obj, kinds, prefix, data):
+    convert = {"int": int, "float": float, "bool": bool, "generic": lambda a: a[()], "array": lambda a: a}
+    for name, kind in kinds.items():
+        setattr(obj, name, None if kind == "none" else convert[kind](data[f"{prefix}.{name}"]))
+
+
+def save_checkpoint(model, path):
+    """Write a checkpoint of ``model`` to ``path``."""
+    arrays = {}
+    # callables are the timed methods of a profiler
+    names = [name for name, value in items(model) if name not in EXCLUDED and not callable(value)]
+    meta = {
+        "class": type(model).__name__,
+        "config": {f.name: _encode(getattr(model.input, f.name)) for f in fields(model.input)},
+        "state": _pack(model, names, "state", arrays),
+        "solver": None if model.solver is None else _pack(model.solver, SOLVER_STATE, "solver", arrays),
+        "out_length": len(model.out),
+        "prefix": model.prefix is not None,
+    }
+
+    # the output rows written so far, including a row that is being reduced
+    arrays["out"] = model.out.data[:, : -(-(model.tnext - model.tstore) // model.nstore)]
+    if model.prefix is not None:
+        arrays["prefix"] = model.prefix.data
+
+    with open(path, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_checkpoint(cls, path):
+    """Restore a model of class ``cls`` from the checkpoint at ``path``."""
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta["class"] != cls.__name__:
+            raise TypeError(f"checkpoint holds a {meta['class']}, not a {cls.__name__}")
+
+        config = CLASSConfig(**{name: _decode(value) for name, value in meta["config"].items()})
+        model = cls(config)
+        model.init()
+        _unpack(model, meta["state"], "state", data)
+
+        written = data["out"]
+        out = np.zeros(written.shape[:1] + (meta["out_length"],) + written.shape[2:])
+        out[:, : written.shape[1]] = written
+        model.out = ModelOutput.from_buffer(out, model.output_variables)
+        if meta["prefix"]:
+            model.prefix = ModelOutput.from_buffer(data["prefix"], model.output_variables)
+
+        if meta["solver"] is not None:
+            model.solver = DormandPrince(
+                model.rhs, (0.0, None, None), 0.0, model.integrator_rtol, model.integrator_atol
+            )
+            _unpack(model.solver, meta["solver"], "solver", data)
+    return model
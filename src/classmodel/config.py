@@ -3,10 +3,16 @@
 from dataclasses import dataclass
 from typing import Literal
 
+from classmodel.forcing import FORCING_FIELDS, TimeSeries
+
 
 @dataclass
 class CLASSConfig:
-    """Class for storing mixed-layer model input data."""
+    """Class for storing mixed-layer model input data.
+
+    The fields listed in ``classmodel.forcing.FORCING_FIELDS`` take a constant, or a
+    ``TimeSeries`` or ``(time, values)`` tuple for a forcing that varies in time.
+    """
 
     # general model variables
     runtime: int = 12 * 3600  # total run time [s]
@@ -17,39 +23,39 @@ class CLASSConfig:
     sw_shearwe: bool = False  # Shear growth ABL switch
     sw_fixft: bool = False  # Fix the free-troposphere switch
     h: float = 200.0  # initial ABL height [m]
-    Ps: float = 101300.0  # surface pressure [Pa]
-    divU: float = 0.0  # horizontal large-scale divergence of wind [s-1]
+    Ps: float | TimeSeries = 101300.0  # surface pressure [Pa]
+    divU: float | TimeSeries = 0.0  # horizontal large-scale divergence of wind [s-1]
     fc: float = 1.0e-4  # Coriolis parameter [s-1]
 
     theta: float = 288.0  # initial mixed-layer potential temperature [K]
     dtheta: float = 1.0  # initial temperature jump at h [K]
     gammatheta: float = 0.006  # free atmosphere potential temperature lapse rate [K m-1]
-    advtheta: float = 0.0  # advection of heat [K s-1]
+    advtheta: float | TimeSeries = 0.0  # advection of heat [K s-1]
     beta: float = 0.2  # entrainment ratio for virtual heat [-]
-    wtheta: float = 0.1  # surface kinematic heat flux [K m s-1]
+    wtheta: float | TimeSeries = 0.1  # surface kinematic heat flux [K m s-1]
 
     q: float = 0.008  # initial mixed-layer specific humidity [kg kg-1]
     dq: float = -0.001  # initial specific humidity jump at h [kg kg-1]
     gammaq: float = 0.0  # free atmosphere specific humidity lapse rate [kg kg-1 m-1]
-    advq: float = 0.0  # advection of moisture [kg kg-1 s-1]
-    wq: float = 0.1e-3  # surface kinematic moisture flux [kg kg-1 m s-1]
+    advq: float | TimeSeries = 0.0  # advection of moisture [kg kg-1 s-1]
+    wq: float | TimeSeries = 0.1e-3  # surface kinematic moisture flux [kg kg-1 m s-1]
 
     CO2: float = 422.0  # initial mixed-layer potential temperature [K]
     dCO2: float = -44.0  # initial temperature jump at h [K]
     gammaCO2: float = 0.0  # free atmosphere potential temperature lapse rate [K m-1]
-    advCO2: float = 0.0  # advection of heat [K s-1]
+    advCO2: float | TimeSeries = 0.0  # advection of heat [K s-1]
     wCO2: float = 0.0  # surface kinematic heat flux [K m s-1]
 
     sw_wind: bool = False  # prognostic wind switch
     u: float = 6.0  # initial mixed-layer u-wind speed [m s-1]
     du: float = 4.0  # initial u-wind jump at h [m s-1]
     gammau: float = 0.0  # free atmosphere u-wind speed lapse rate [s-1]
-    advu: float = 0.0  # advection of u-wind [m s-2]
+    advu: float | TimeSeries = 0.0  # advection of u-wind [m s-2]
 
     v: float = -4.0  # initial mixed-layer u-wind speed [m s-1]
     dv: float = 4.0  # initial u-wind jump at h [m s-1]
     gammav: float = 0.0  # free atmosphere v-wind speed lapse rate [s-1]
-    advv: float = 0.0  # advection of v-wind [m s-2]
+    advv: float | TimeSeries = 0.0  # advection of v-wind [m s-2]
 
     # surface layer variables
     sw_sl: bool = False  # surface layer switch
@@ -60,6 +66,15 @@ class CLASSConfig:
     Cs: float | None = None  # drag coefficient for scalars [-]
     L: float | None = None  # Obukhov length [-]
     Rib: float | None = None  # bulk Richardson number [-]
+    ribtol_type: Literal["fd", "newton"] = "fd"  # Obukhov length solver ('fd' or 'newton' with analytic derivative)
+    ribtol_tol: float = 1.0e-6  # relative tolerance on the Obukhov length for the 'newton' solver [-]
+    ribtol_itmax: int = 50  # maximum number of iterations of the 'newton' solver [-]
+    sl_spinup_tol: float = 1.0e-3  # relative change of ustar, L and thetasurf that ends the initial spin-up [-]
+    sl_spinup_itmax: int = 10  # maximum number of passes of the initial spin-up [-]
+    sw_sltable: bool = False  # tabulated surface layer switch (interpolate L, Cm and Cs instead of solving for L)
+    sltable_shape: tuple[int, int, int] = (161, 40, 21)  # table points in Rib, ln(zsl/z0m) and ln(z0m/z0h) [-]
+    sltable_tol: float = 0.025  # maximum relative interpolation error of Cm and Cs [-]
+    sltable_path: str | None = None  # file to store and reuse the table
 
     # radiation parameters
     sw_rad: bool = False  # radiation switch
@@ -67,7 +82,7 @@ class CLASSConfig:
     lon: float = -4.93  # longitude [deg]
     doy: float = 268.0  # day of the year [-]
     tstart: float = 6.8  # time of the day [h UTC]
-    cc: float = 0.0  # cloud cover fraction [-]
+    cc: float | TimeSeries = 0.0  # cloud cover fraction [-]
     Q: float = 400.0  # net radiation [W m-2]
     dFz: float = 0.0  # cloud top radiative divergence [W m-2]
 
@@ -110,6 +125,32 @@ class CLASSConfig:
     # A-Gs parameters
     c3c4: Literal["C3", "C4"] = "c3"  # Plant type ('c3' or 'c4')
 
-    # Cumulus parameters
+    # Cumulus and lifting condensation level parameters
     sw_cu: bool = False  # Cumulus parameterization switch
     dz_h: float = 150.0  # Transition layer thickness [m]
+    lcl_type: Literal["fixed", "newton", "analytic"] = "fixed"  # LCL solver (fixed steps, Newton or closed form)
+    lcl_tol: float = 1.0e-10  # tolerance on ln(RH) at the LCL for the 'newton' solver [-]
+    lcl_itmax: int = 20  # maximum number of iterations of the 'newton' solver [-]
+
+    # time integration
+    integrator: Literal["euler", "heun", "rk4", "rk45"] = "euler"  # scheme for the prognostic equations
+    integrator_rtol: float = 1.0e-5  # relative tolerance of the 'rk45' scheme and of the coupled tendencies [-]
+    integrator_atol: float = 1.0e-8  # absolute tolerance of the 'rk45' scheme and of the coupled tendencies [-]
+    integrator_itmax: int = 10  # maximum passes over the coupled components per tendency evaluation [-]
+
+    # update intervals of the slow components, multiples of dt (dt if None); their output is held in between [s]
+    radiation_interval: float | None = None  # interval between radiation updates [s]
+    surface_layer_interval: float | None = None  # interval between surface-layer updates [s]
+    land_surface_interval: float | None = None  # interval between land-surface updates [s]
+
+    # output
+    output_variables: tuple[str, ...] | None = None  # variables to store (all if None; time t is always stored)
+    output_interval: float | None = None  # interval between stored values, a multiple of dt (dt if None) [s]
+    output_reduction: Literal["instantaneous", "mean", "min", "max", "sum"] = "instantaneous"  # over each interval
+
+    def __post_init__(self):
+        """Convert (time, values) tuples of the forcing fields to time series."""
+        for name in FORCING_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, tuple):
+                setattr(self, name, TimeSeries(*value))
@@ -0,0 +1,215 @@
+"""Dual numbers for forward-mode differentiation.
+
+A :class:`Dual` holds a scalar ``value`` and the vector ``eps`` of its derivatives to a set of
+parameters. Arithmetic, comparisons and the numpy functions that the model physics uses
+propagate the derivatives with the chain rule, so that the scalar model can be run with dual
+numbers in place of floats. Comparisons act on the value only: a branch of the physics is
+differentiated as the branch that is taken. Roots at zero (such as the square root of a zero
+variance) have no finite derivative; these, and the derivatives of functions that are flat at
+their argument, are taken as zero, so that no NaN enters the derivatives.
+"""
+
+import math
+
+import numpy as np
+
+from classmodel.special import E1, e1_scalar
+
+
+class Dual:
+    """Scalar ``value`` with derivatives ``eps`` (an array with one element per parameter)."""
+
+    __slots__ = ("value", "eps")
+
+    def __init__(self, value, eps):
+        """Create a dual number; ``eps`` is not copied."""
+        self.value = value
+        self.eps = eps
+
+    @classmethod
+    def variable(cls, value, i, n):
+        """Return ``value`` as the ``i``-th of ``n`` independent variables."""
+        eps = np.zeros(n)
+        eps[i] = 1.0
+        return cls(float(value), eps)
+
+    def chain(self, value, derivative):
+        """Return the dual number of a function of self, with ``value`` and ``derivative`` at self."""
+        # a function that is flat at self removes the derivatives, also if they are not finite
+        return Dual(value, derivative * self.eps if derivative != 0.0 else np.zeros_like(self.eps))
+
+    def __repr__(self):
+        """Return the constructor call of the dual number."""
+        return f"Dual({self.value!r}, {self.eps!r})"
+
+    # arithmetic
+    def __add__(self, other):
+        """Return self + other."""
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.eps + other.eps)
+        return Dual(self.value + other, self.eps)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        """Return self - other."""
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.eps - other.eps)
+        return Dual(self.value - other, self.eps)
+
+    def __rsub__(self, other):
+        """Return other - self."""
+        return Dual(other - self.value, -self.eps)
+
+    def __mul__(self, other):
+        """Return self * other."""
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value, other.value * self.eps + self.value * other.eps)
+        return Dual(self.value * other, other * self.eps)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Return self / other."""
+        if isinstance(other, Dual):
+            value = self.value / other.value
+            return Dual(value, (self.eps - value * other.eps) / other.value)
+        return Dual(self.value / other, self.eps / other)
+
+    def __rtruediv__(self, other):
+        """Return other / self."""
+        value = other / self.value
+        return Dual(value, -value / self.value * self.eps)
+
+    def __pow__(self, other):
+        """Return self ** other."""
+        if isinstance(other, Dual):
+            value = self.value**other.value
+            return Dual(value, value * (other.value / self.value * self.eps + np.log(self.value) * other.eps))
+        if other == 0.0 or (self.value == 0.0 and other < 1.0):
+            # a constant, or a root at zero, which has no finite derivative and is taken as flat
+            return Dual(self.value**other, np.zeros_like(self.eps))
+        return Dual(self.value**other, other * self.value ** (other - 1.0) * self.eps)
+
+    def __rpow__(self, other):
+        """Return other ** self."""
+        value = other**self.value
+        return Dual(value, value * np.log(other) * self.eps)
+
+    def __neg__(self):
+        """Return -self."""
+        return Dual(-self.value, -self.eps)
+
+    def __pos__(self):
+        """Return self."""
+        return self
+
+    def __abs__(self):
+        """Return abs(self), with the derivatives of the branch of the sign of the value."""
+        return self if self.value >= 0.0 else -self
+
+    # comparisons, of the value only
+    def __lt__(self, other):
+        """Return self.value < other."""
+        return self.value < primal(other)
+
+    def __le__(self, other):
+        """Return self.value <= other."""
+        return self.value <= primal(other)
+
+    def __gt__(self, other):
+        """Return self.value > other."""
+        return self.value > primal(other)
+
+    def __ge__(self, other):
+        """Return self.value >= other."""
+        return self.value >= primal(other)
+
+    def __eq__(self, other):
+        """Return self.value == other."""
+        return self.value == primal(other)
+
+    def __ne__(self, other):
+        """Return self.value != other."""
+        return self.value != primal(other)
+
+    __hash__ = None
+
+    def __bool__(self):
+        """Return whether the value is nonzero."""
+        return bool(self.value)
+
+    # numpy functions
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """Apply a numpy function from ``UFUNCS`` to the dual number."""
+        if method != "__call__" or kwargs or ufunc not in UFUNCS:
+            return NotImplemented
+        return UFUNCS[ufunc](*inputs)
+
+
+def primal(x):
+    """Return the value of a dual number, or x itself if it is not a dual number."""
+    return x.value if isinstance(x, Dual) else x
+
+
+def _dual(x):
+    # x as a dual number, so that a ufunc can treat all of its inputs alike
+    return x if isinstance(x, Dual) else Dual(x, 0.0)
+
+
+def _maximum(a, b):
+    return a if primal(a) >= primal(b) else b
+
+
+def _minimum(a, b):
+    return a if primal(a) <= primal(b) else b
+
+
+def _unary(f, df):
+    # ufunc of one argument with derivative df
+    def ufunc(x):
+        return x.chain(f(x.value), df(x.value))
+
+    return ufunc
+
+
+def _comparison(f):
+    def ufunc(a, b):
+        return f(primal(a), primal(b))
+
+    return ufunc
+
+
+@E1.register
+def _e1(x: Dual):
+    # dE1/dx = -exp(-x) / x
+    return x.chain(e1_scalar(float(x.value)), -math.exp(-x.value) / x.value)
+
+
+UFUNCS = {
+    np.add: lambda a, b: _dual(a) + b,
+    np.subtract: lambda a, b: _dual(a) - b,
+    np.multiply: lambda a, b: _dual(a) * b,
+    np.true_divide: lambda a, b: _dual(a) / b,
+    np.power: lambda a, b: _dual(a) ** b,
+    np.negative: lambda x: -x,
+    np.positive: lambda x: x,
+    np.absolute: abs,
+    np.maximum: _maximum,
+    np.minimum: _minimum,
+    np.exp: _unary(np.exp, np.exp),
+    np.log: _unary(np.log, lambda x: 1.0 / x),
+    np.log10: _unary(np.log10, lambda x: 1.0 / (x * np.log(10.0))),
+    np.sqrt: _unary(np.sqrt, lambda x: 0.5 / np.sqrt(x)),
+    np.sin: _unary(np.sin, np.cos),
+    np.cos: _unary(np.cos, lambda x: -np.sin(x)),
+    np.arctan: _unary(np.arctan, lambda x: 1.0 / (1.0 + x * x)),
+    np.sign: lambda x: np.sign(x.value),
+    np.isfinite: lambda x: np.isfinite(x.value),
+    np.less: _comparison(np.less),
+    np.less_equal: _comparison(np.less_equal),
+    np.greater: _comparison(np.greater),
+    np.greater_equal: _comparison(np.greater_equal),
+    np.equal: _comparison(np.equal),
+    np.not_equal: _comparison(np.not_equal),
+}
@@ -0,0 +1,184 @@
+"""Batched ensemble version of the CLASS mixed-layer model.
+
+All members of an ensemble are integrated together: every model variable is held as an array
+with one element per member. The physics, time loop and component order are inherited from
+:class:`classmodel.model.Model`, whose branches are evaluated as masks for arrays; the ensemble
+replaces the iterative surface-layer solvers and the table lookup by vectorized versions.
+"""
+
+from dataclasses import fields, replace
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.forcing import TimeSeries
+from classmodel.model import RIBTOL_FD_ITMAX, RIBTOL_FD_TOL, Model
+from classmodel.output import ModelOutput
+from classmodel.surfacelayer import L_NEUTRAL, dpsih, dpsim, psih, psim, rib, ribtol_newton
+
+# settings that select code paths or define the time axis; these must be equal for all members
+SHARED_FIELDS = (
+    "runtime",
+    "dt",
+    "sw_ml",
+    "sw_shearwe",
+    "sw_fixft",
+    "sw_wind",
+    "sw_sl",
+    "sw_rad",
+    "sw_ls",
+    "ls_type",
+    "sw_cu",
+    "lcl_type",
+    "lcl_tol",
+    "lcl_itmax",
+    "ribtol_type",
+    "ribtol_itmax",
+    "sl_spinup_tol",
+    "sl_spinup_itmax",
+    "sw_sltable",
+    "sltable_shape",
+    "sltable_tol",
+    "sltable_path",
+    "output_variables",
+    "output_interval",
+    "output_reduction",
+    "integrator",
+    "integrator_rtol",
+    "integrator_atol",
+    "integrator_itmax",
+    "radiation_interval",
+    "surface_layer_interval",
+    "land_surface_interval",
+)
+
+# optional input fields that are not used by the model
+UNUSED_FIELDS = ("Cm", "Cs", "L", "Rib")
+
+
+def _member_series(value):
+    return isinstance(value, TimeSeries) and value.values.ndim > 1
+
+
+def stack_configs(configs):
+    """Combine member configurations into a single configuration with array-valued fields.
+
+    Accepts either a sequence of ``CLASSConfig`` objects or one ``CLASSConfig`` whose
+    member-dependent fields hold arrays (scalars are broadcast). Returns the batched
+    configuration and the number of members.
+    """
+    if isinstance(configs, CLASSConfig):
+        names = [f.name for f in fields(CLASSConfig) if f.name not in SHARED_FIELDS + UNUSED_FIELDS]
+        values = [getattr(configs, name) for name in names]
+        values = [0.0 if v is None and name == "c_beta" else v for name, v in zip(names, values, strict=True)]
+        # a series with a column per member counts as one value per member
+        values = [np.full(v.values.shape[1], v, dtype=object) if _member_series(v) else v for v in values]
+        arrays = np.broadcast_arrays(*[np.atleast_1d(v) for v in values])
+        batch = {name: np.array(a) for name, a in zip(names, arrays, strict=True)}
+        return replace(configs, **batch), arrays[0].size
+
+    configs = list(configs)
+    if not configs:
+        raise ValueError("an ensemble needs at least one member")
+
+    first = configs[0]
+    for name in SHARED_FIELDS:
+        if any(getattr(c, name) != getattr(first, name) for c in configs):
+            raise ValueError(f'field "{name}" must be identical for all ensemble members')
+
+    batch = {}
+    for f in fields(CLASSConfig):
+        if f.name in SHARED_FIELDS + UNUSED_FIELDS:
+            continue
+        values = [getattr(c, f.name) for c in configs]
+        if f.name == "c_beta":
+            values = [0.0 if v is None else v for v in values]
+        batch[f.name] = np.array(values)
+    return replace(first, **batch), len(configs)
+
+
+class EnsembleModel(Model):
+    """CLASS model that integrates N members at once.
+
+    Member-dependent input fields become arrays of length N; the fields listed in
+    ``SHARED_FIELDS`` must be equal for all members. Output is stored in a
+    :class:`ModelOutput` with arrays of shape (tsteps, N); use ``out.member(i)``
+    to obtain the output of a single member.
+    """
+
+    def __init__(self, configs):
+        """Stack the member configurations; see :func:`stack_configs`."""
+        self.input, self.nmembers = stack_configs(configs)
+        self.events = []
+
+    def new_output(self, tsteps):
+        """Allocate output with a column per member."""
+        return ModelOutput(-(-tsteps // self.nstore), self.nmembers, self.output_variables)
+
+    def lookup_drag_coefficients(self, Rib, zsl):  # noqa: N803
+        """Interpolate L, Cm and Cs from the surface-layer table.
+
+        Members outside the range of the table are solved with :meth:`drag_coefficients`.
+        """
+        L, Cm, Cs, inside = self.sltable.interpolate(Rib, zsl, self.z0m, self.z0h)
+        it = np.zeros(self.nmembers, dtype=int)
+        res = np.full(self.nmembers, np.nan)
+        outside = np.flatnonzero(~inside)
+        if outside.size > 0:
+            L0 = None if self.L is None else np.broadcast_to(self.L, L.shape)[outside]
+            L[outside], Cm[outside], Cs[outside] = self.drag_coefficients(
+                Rib[outside], zsl[outside], self.z0m[outside], self.z0h[outside], L0
+            )
+            it[outside] = self.ribtol_it
+            res[outside] = self.ribtol_res
+        self.ribtol_it, self.ribtol_res = it, res
+        return L, Cm, Cs
+
+    def ribtol(self, Rib, zsl, z0m, z0h):  # noqa: N803
+        """Solve the Obukhov length of all members with the 'fd' method.
+
+        The Newton iteration continues on the members that have not converged yet.
+        """
+        Rib, zsl, z0m, z0h = np.broadcast_arrays(Rib, zsl, z0m, z0h)
+        L = np.where(Rib > 0.0, 1.0, -1.0)
+        it = np.zeros(L.size, dtype=int)
+        res = np.full(L.size, np.nan)
+
+        # Newton iteration on the members that have not converged yet
+        active = np.arange(L.size)
+        for _ in range(RIBTOL_FD_ITMAX):
+            Rib_a = Rib[active]
+            zsl_a = zsl[active]
+            z0m_a = z0m[active]
+            z0h_a = z0h[active]
+            L0 = L[active]
+
+            fx = Rib_a - rib(L0, zsl_a, z0m_a, z0h_a)
+            Lstart = L0 - 0.001 * L0
+            Lend = L0 + 0.001 * L0
+            fxdif = ((-rib(Lstart, zsl_a, z0m_a, z0h_a)) - (-rib(Lend, zsl_a, z0m_a, z0h_a))) / (Lstart - Lend)
+            L_new = L0 - fx / fxdif
+            L[active] = L_new
+            it[active] += 1
+            res[active] = fx
+
+            active = active[(abs(L_new - L0) > RIBTOL_FD_TOL) & ~(abs(L_new) > L_NEUTRAL)]
+            if active.size == 0:
+                break
+
+        if active.size > 0:
+            self.ribtol_not_converged(active.size)
+
+        self.ribtol_it = it
+        self.ribtol_res = res
+        return L
+
+    def ribtol_newton(self, Rib, zsl, z0m, z0h, L):  # noqa: N803
+        """Solve the Obukhov length of all members with :func:`classmodel.surfacelayer.ribtol_newton`."""
+        L, self.ribtol_it, self.ribtol_res = ribtol_newton(Rib, zsl, z0m, z0h, L, self.ribtol_tol, self.ribtol_itmax)
+        return L
+
+    psim = staticmethod(psim)
+    psih = staticmethod(psih)
+    dpsim = staticmethod(dpsim)
+    dpsih = staticmethod(dpsih)
@@ -0,0 +1,77 @@
+"""Detection of events during a model run.
+
+An event is a zero crossing of a function of the model, such as ``h - lcl``. Events are
+registered with :meth:`classmodel.model.Model.add_event` and checked at every time step, after
+the diagnostic variables are computed. The time of the first crossing is refined by linear
+interpolation between the time steps; a terminal event stops the run.
+"""
+
+import numpy as np
+
+
+class Event:
+    """Zero crossing of ``function(model)``.
+
+    ``direction`` selects upward (> 0), downward (< 0) or both (0) crossings. After a run,
+    ``time`` holds the time of the first crossing in hours, like ``ModelOutput.t`` (NaN if
+    there was none), and ``count`` the number of crossings. For an ensemble both hold one
+    value per member, and a terminal event stops the run once it occurred in all members.
+    """
+
+    def __init__(self, name, function, direction=0, terminal=False):
+        """Create an event that has not occurred yet."""
+        self.name = name
+        self.function = function
+        self.direction = direction
+        self.terminal = terminal
+        self.reset()
+
+    def reset(self):
+        """Forget the crossings of a previous run."""
+        self.time = np.nan
+        self.count = 0
+        self.previous = None
+        self.previous_time = None
+
+    def check(self, model):
+        """Evaluate the event at the current time step; returns True if the run should stop."""
+        value = np.asarray(self.function(model), dtype=float)
+        time = model.time / 3600.0 + model.tstart
+
+        if self.previous is not None:
+            g0, g1 = self.previous, value
+            up = (g0 <= 0.0) & (g1 > 0.0)
+            down = (g0 >= 0.0) & (g1 < 0.0)
+            hit = up if self.direction > 0 else down if self.direction < 0 else up | down
+
+            if np.any(hit):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    crossing = self.previous_time + np.where(hit, g0 / (g0 - g1), 0.0) * (time - self.previous_time)
+                first = hit & (self.count == 0)
+                self.time = np.where(first, crossing, self.time)
+                self.count = self.count + hit
+                if value.ndim == 0:
+                    self.time = float(self.time)
+                    self.count = int(self.count)
+
+        self.previous = value
+        self.previous_time = time
+        return self.terminal and bool(np.all(self.count > 0))
+
+
+def threshold(name, value):
+    """Event function for model variable ``name`` crossing ``value``."""
+
+    def function(model):
+        return getattr(model, name) - value
+
+    return function
+
+
+def crossing(name, other):
+    """Event function for model variable ``name`` crossing model variable ``other``."""
+
+    def function(model):
+        return getattr(model, name) - getattr(model, other)
+
+    return function
@@ -0,0 +1,109 @@
+"""Time-varying forcing.
+
+The fields of :class:`classmodel.config.CLASSConfig` listed in ``FORCING_FIELDS`` accept a
+:class:`TimeSeries` (or a ``(time, values)`` tuple, which the configuration converts) instead
+of a constant. At ``Model.init`` every series is resampled once onto the time steps of the
+run; at every time step the model then takes the value of the step from the resampled array,
+and holds it during the step. Before the first and after the last time of a series its first
+and last values are used.
+"""
+
+import numpy as np
+
+# configuration fields that can vary in time
+FORCING_FIELDS = ("advtheta", "advq", "advCO2", "advu", "advv", "divU", "wtheta", "wq", "cc", "Ps")
+
+
+class TimeSeries:
+    """Values of a forcing at increasing times [s since the start of the run].
+
+    ``values`` has the length of ``time``, with an optional trailing dimension of ensemble
+    members. Use :meth:`load` to read a series from a (memory-mapped) ``.npy`` file.
+    """
+
+    def __init__(self, time, values):
+        """Create a series; raises ValueError if the times are not increasing or do not match the values."""
+        self.time = np.asarray(time, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        if self.time.ndim != 1 or self.time.size == 0:
+            raise ValueError("the time of a series must be a non-empty 1-D array")
+        if self.values.shape[:1] != self.time.shape or self.values.ndim not in (1, 2):
+            raise ValueError("the values of a series must be an array of shape (time,) or (time, members)")
+        if np.any(np.diff(self.time) <= 0.0):
+            raise ValueError("the time of a series must be increasing")
+
+    @classmethod
+    def load(cls, path):
+        """Read a series from a ``.npy`` file with time in the first column and values in the others.
+
+        The file is memory mapped, so only the rows that are needed for resampling are read.
+        A file with more than one column of values holds one column per ensemble member.
+        """
+        data = np.load(path, mmap_mode="r")
+        if data.ndim != 2 or data.shape[1] < 2:  # noqa: PLR2004
+            raise ValueError(f"{path} must hold an array of shape (time, 1 + columns)")
+        values = data[:, 1:]
+        return cls(data[:, 0], values[:, 0] if values.shape[1] == 1 else values)
+
+    def resample(self, times):
+        """Interpolate the series linearly at ``times``."""
+        i = np.clip(np.searchsorted(self.time, times, side="right") - 1, 0, self.time.size - 1)
+        j = np.minimum(i + 1, self.time.size - 1)
+        span = self.time[j] - self.time[i]
+        w = np.clip(np.divide(times - self.time[i], span, out=np.zeros(len(times)), where=span > 0.0), 0.0, 1.0)
+        if self.values.ndim > 1:
+            w = w[:, None]
+        # exact at the times of the series and where the series is constant
+        return self.values[i] + w * (self.values[j] - self.values[i])
+
+    def __eq__(self, other):
+        """Return whether both series have the same times and values."""
+        if not isinstance(other, TimeSeries):
+            return NotImplemented
+        return np.array_equal(self.time, other.time) and np.array_equal(self.values, other.values)
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Return a summary of the time axis of the series."""
+        return f"TimeSeries({self.time.size} times, {self.time[0]:g}..{self.time[-1]:g} s)"
+
+
+def is_series(value):
+    """Return True if a configuration value is a time series (for an ensemble: for any member)."""
+    if isinstance(value, TimeSeries):
+        return True
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return any(isinstance(v, TimeSeries) for v in value.flat)
+    return False
+
+
+def resample_forcing(config, tsteps, dt):
+    """Return the forcing fields of ``config`` that are series, resampled at the time steps.
+
+    The result maps field names to arrays of shape (tsteps,), or (tsteps, members) if the
+    field holds one value or series per ensemble member.
+    """
+    times = np.arange(tsteps) * dt
+    forcing = {}
+    for name in FORCING_FIELDS:
+        value = getattr(config, name)
+        if isinstance(value, TimeSeries):
+            forcing[name] = value.resample(times)
+        elif is_series(value):
+            # an ensemble with a constant or a series per member, or one series (possibly with
+            # a column per member) for all members
+            members = list(value.flat)
+            if all(v is members[0] for v in members):
+                resampled = members[0].resample(times).reshape(tsteps, -1)
+                if resampled.shape[1] not in (1, len(members)):
+                    raise ValueError(
+                        f'the series of "{name}" has {resampled.shape[1]} columns for {len(members)} members'
+                    )
+                forcing[name] = np.ascontiguousarray(np.broadcast_to(resampled, (tsteps, len(members))))
+            else:
+                if any(isinstance(v, TimeSeries) and v.values.ndim > 1 for v in members):
+                    raise ValueError(f'the series of "{name}" of a single member must have one column')
+                columns = [v.resample(times) if isinstance(v, TimeSeries) else np.full(tsteps, v) for v in members]
+                forcing[name] = np.stack(columns, axis=-1)
+    return forcing
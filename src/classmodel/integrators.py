@@ -0,0 +1,129 @@
+"""Time integration schemes for the prognostic model equations.
+
+The schemes advance a state vector ``y`` with a right-hand side ``rhs(time, y)`` that returns
+the tendencies of ``y``. The tendencies ``f`` at the start of a step are passed in, because the
+model has already computed them for its output. States may have a trailing ensemble dimension.
+"""
+
+import numpy as np
+
+
+def euler_step(rhs, time, y, f, dt):
+    """Advance ``y`` by one forward Euler step."""
+    return y + dt * f
+
+
+def heun_step(rhs, time, y, f, dt):
+    """Advance ``y`` by one step of Heun's second-order method."""
+    f1 = rhs(time + dt, y + dt * f)
+    return y + 0.5 * dt * (f + f1)
+
+
+def rk4_step(rhs, time, y, f, dt):
+    """Advance ``y`` by one step of the classical fourth-order Runge-Kutta method."""
+    f1 = rhs(time + 0.5 * dt, y + 0.5 * dt * f)
+    f2 = rhs(time + 0.5 * dt, y + 0.5 * dt * f1)
+    f3 = rhs(time + dt, y + dt * f2)
+    return y + dt / 6.0 * (f + 2.0 * f1 + 2.0 * f2 + f3)
+
+
+def hermite(start, end, time):
+    """Interpolate the state at ``time`` with the cubic Hermite polynomial over a step.
+
+    ``start`` and ``end`` are the (time, state, tendencies) at both ends of the step.
+    """
+    t0, y0, f0 = start
+    t1, y1, f1 = end
+    h = t1 - t0
+    s = (time - t0) / h
+    return (
+        (1.0 + 2.0 * s) * (1.0 - s) ** 2 * y0
+        + s * (1.0 - s) ** 2 * h * f0
+        + s**2 * (3.0 - 2.0 * s) * y1
+        + s**2 * (s - 1.0) * h * f1
+    )
+
+
+# Butcher tableau of the Dormand-Prince 5(4) pair
+DP_C = (0.0, 1.0 / 5.0, 3.0 / 10.0, 4.0 / 5.0, 8.0 / 9.0, 1.0)
+DP_A = (
+    (),
+    (1.0 / 5.0,),
+    (3.0 / 40.0, 9.0 / 40.0),
+    (44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0),
+    (19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0),
+    (9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0),
+)
+DP_B = (35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0)
+# difference between the fifth- and fourth-order weights, including the last (FSAL) stage
+DP_E = (
+    71.0 / 57600.0,
+    0.0,
+    -71.0 / 16695.0,
+    71.0 / 1920.0,
+    -17253.0 / 339200.0,
+    22.0 / 525.0,
+    -1.0 / 40.0,
+)
+
+
+class DormandPrince:
+    """Adaptive Dormand-Prince 5(4) integrator with dense output.
+
+    The step size is controlled such that the root-mean-square of the local error, relative to
+    ``atol + rtol * |y|``, stays below one (for ensembles, in every member). Steps are taken
+    independently of the times at which the state is requested; :meth:`advance` interpolates
+    the state within the last step.
+    """
+
+    def __init__(self, rhs, start, h, rtol, atol):
+        """Start the integration at ``start``, the (time, state, tendencies), with step size ``h``."""
+        time, y, f = start
+        self.rhs = rhs
+        self.rtol = rtol
+        self.atol = atol
+        self.h = h
+        self.t0 = self.t1 = time
+        self.y0 = self.y1 = y
+        self.f0 = self.f1 = f
+        self.nsteps = 0
+        self.nrejected = 0
+
+    def advance(self, time):
+        """Take steps until ``time`` is reached and return the state at ``time``."""
+        while self.t1 < time:
+            self.step()
+        return hermite((self.t0, self.y0, self.f0), (self.t1, self.y1, self.f1), time)
+
+    def step(self):
+        """Take one accepted step from the current time."""
+        t, y = self.t1, self.y1
+        while True:
+            h = self.h
+            k = [self.f1]
+            for c, a in zip(DP_C[1:], DP_A[1:], strict=True):
+                k.append(self.rhs(t + c * h, y + h * sum(aj * kj for aj, kj in zip(a, k, strict=True))))
+            y_new = y + h * sum(b * kb for b, kb in zip(DP_B, k, strict=True) if b != 0.0)
+            k.append(self.rhs(t + h, y_new))
+
+            error = h * sum(e * ke for e, ke in zip(DP_E, k, strict=True) if e != 0.0)
+            scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+            norm = np.max(np.sqrt(np.mean((error / scale) ** 2, axis=0)))
+
+            factor = 0.9 * norm**-0.2 if norm > 0.0 else 5.0
+            if norm <= 1.0:
+                self.h = h * min(5.0, max(0.2, factor))
+                break
+
+            self.nrejected += 1
+            self.h = h * max(0.2, factor)
+            if self.h < 1e-8 * max(abs(t), 1.0):
+                raise RuntimeError(f"step size of the adaptive integrator became too small at t = {t:g} s")
+
+        self.t0, self.y0, self.f0 = t, y, self.f1
+        self.t1, self.y1, self.f1 = t + h, y_new, k[-1]
+        self.nsteps += 1
+
+
+# fixed-step schemes by name
+STEPS = {"euler": euler_step, "heun": heun_step, "rk4": rk4_step}
@@ -24,37 +24,363 @@ along with CLASS.  If not, see <http://www.gnu.org/licenses/>.
 
 import copy as cp
 import sys
+import warnings
+from dataclasses import replace
 
 import numpy as np
 
-from classmodel.output import ModelOutput
-
-
-def esat(T):
-    return 0.611e3 * np.exp(17.2694 * (T - 273.16) / (T - 35.86))
-
-
-def qsat(T, p):
-    return 0.622 * esat(T) / p
+from classmodel.checkpoint import load_checkpoint, save_checkpoint
+from classmodel.events import Event
+from classmodel.forcing import resample_forcing
+from classmodel.integrators import STEPS, DormandPrince
+from classmodel.output import VARIABLES, ModelOutput
+from classmodel.profiling import Profiler
+from classmodel.sltable import get_table
+from classmodel.special import E1
+from classmodel.state import SLOTS, TRANSIENT, items
+from classmodel.surfacelayer import L_NEUTRAL
+from classmodel.thermodynamics import ConvergenceWarning, esat, lcl_analytic, lcl_newton, qsat
+
+# output variables that are stored from a model variable with a different name
+OUTPUT_ATTRIBUTES = {"zlcl": "lcl", "dz": "dz_h"}
+
+# output CO2 fluxes, which are converted from [ppm m s-1] to [mgC m-2 s-1]
+OUTPUT_CO2_FLUXES = ("wCO2", "wCO2A", "wCO2R", "wCO2e", "wCO2M")
+
+OUTPUT_REDUCTIONS = ("instantaneous", "mean", "min", "max", "sum")
+
+# prognostic variables of the mixed layer, the wind and the land surface, with their tendencies
+MIXED_LAYER_STATE = (
+    ("h", "htend"),
+    ("theta", "thetatend"),
+    ("dtheta", "dthetatend"),
+    ("q", "qtend"),
+    ("dq", "dqtend"),
+    ("CO2", "CO2tend"),
+    ("dCO2", "dCO2tend"),
+    ("dz_h", "dztend"),
+)
+WIND_STATE = (("u", "utend"), ("du", "dutend"), ("v", "vtend"), ("dv", "dvtend"))
+LAND_SURFACE_STATE = (("Tsoil", "Tsoiltend"), ("wg", "wgtend"), ("Wl", "Wltend"))
+
+LCL_SOLVERS = ("fixed", "newton", "analytic")
+
+# the 'fd' Obukhov length solver stops once L changes by less than RIBTOL_FD_TOL [m]; its
+# maximum number of iterations allows |L| to double towards neutral stability until |L| > L_NEUTRAL
+RIBTOL_FD_TOL = 0.001
+RIBTOL_FD_ITMAX = 100
+
+# the fixed-step LCL iteration stops once the relative humidity at the LCL is within these bounds
+LCL_RH_MIN = 0.9999
+LCL_RH_MAX = 1.0001
+
+# plant-type dependent A-gs parameters, indexed with 0 for C3 and 1 for C4 plants
+AGS_PLANT_PARAMETERS = (
+    "CO2comp298",
+    "Q10CO2",
+    "gm298",
+    "Ammax298",
+    "Q10gm",
+    "T1gm",
+    "T2gm",
+    "Q10Am",
+    "T1Am",
+    "T2Am",
+    "f0",
+    "ad",
+    "alpha0",
+    "Kx",
+    "gmin",
+)
+
+INTEGRATORS = ("euler", "heun", "rk4", "rk45")
+
+# settings that define the time axis, the update schedule of the components and the output
+# layout; these cannot change in a branch
+BRANCH_FIXED_FIELDS = (
+    "runtime",
+    "dt",
+    "tstart",
+    "radiation_interval",
+    "surface_layer_interval",
+    "land_surface_interval",
+    "output_variables",
+    "output_interval",
+    "output_reduction",
+)
+
+# attributes that are not copied to a branch
+BRANCH_EXCLUDED = ("input", "out", "prefix", "solver", "sltable", "forcing", "solar_time", "solar_sinlea", "solar_Tr")
+
+# variables through which the components depend on their previous evaluation
+COUPLING_VARIABLES = ("wtheta", "wq", "wCO2", "Ts", "ustar", "wstar")
+
+# variables that the surface layer sets, which converged ensemble members hold during the spin-up
+SURFACE_LAYER_OUTPUT = (
+    "thetasurf",
+    "qsurf",
+    "thetavsurf",
+    "Rib",
+    "L",
+    "Cm",
+    "Cs",
+    "ustar",
+    "uw",
+    "vw",
+    "T2m",
+    "q2m",
+    "u2m",
+    "v2m",
+    "esat2m",
+    "e2m",
+)
+
+
+def solar_elevation(time, lat, lon, doy, tstart):
+    """Sine of the solar elevation angle at ``time`` since the start of the run [s], at least 0.0001."""
+    sda = 0.409 * np.cos(2.0 * np.pi * (doy - 173.0) / 365.0)
+    sinlea = np.sin(2.0 * np.pi * lat / 360.0) * np.sin(sda) - np.cos(2.0 * np.pi * lat / 360.0) * np.cos(sda) * np.cos(
+        2.0 * np.pi * (time + tstart * 3600.0) / 86400.0 + 2.0 * np.pi * lon / 360.0
+    )
+    return np.maximum(sinlea, 0.0001)
+
+
+def steps_per_interval(name, interval, dt):
+    """Return the number of time steps of ``dt`` in ``interval`` (one step if it is None) [s]."""
+    if interval is None:
+        return 1
+    n = int(round(interval / dt))
+    if n < 1 or abs(n * dt - interval) > 1e-9 * interval:
+        raise ValueError(f"{name} ({interval:g} s) must be a positive multiple of dt ({dt:g} s)")
+    return n
+
+
+def _shared(value):
+    # the value of all ensemble members if they share it, else the array of their values
+    values = np.asarray(value)
+    return values.flat[0] if values.ndim > 0 and np.all(values == values.flat[0]) else value
+
+
+def _where(condition, x, y):
+    # x if condition else y, element-wise for the arrays of an ensemble; both x and y are evaluated
+    if isinstance(condition, np.ndarray) and condition.ndim > 0:
+        return np.where(condition, x, y)
+    return x if condition else y
+
+
+def _take(values, index):
+    # values[index] of a list, for an index or an array of indices of ensemble members
+    return values[index] if isinstance(index, int) else np.take(values, index)
+
+
+def _any(condition):
+    # whether the condition holds for any ensemble member
+    return condition.any() if isinstance(condition, np.ndarray) else bool(condition)
+
+
+def _max(a, b):
+    # element-wise equivalent of the builtin max(a, b)
+    return _where(b > a, b, a)
+
+
+def _min(a, b):
+    # element-wise equivalent of the builtin min(a, b)
+    return _where(b < a, b, a)
+
+
+def _moisture_factor(w, wfc, wwilt):
+    # soil moisture factor (wfc - wwilt) / (w - wwilt) of the resistances, 1e8 at and below the wilting point
+    wet = w > wwilt
+    return _where(wet, (wfc - wwilt) / _where(wet, w - wwilt, 1.0), 1.0e8)
 
 
 class Model:
+    # the model state is held in slots, by group; other attributes are stored in __dict__
+    __slots__ = SLOTS + ("__dict__",)
+
     def __init__(self, model_input):
         # initialize the different components of the model
         self.input = cp.deepcopy(model_input)
 
+        # events that are checked during the run
+        self.events = []
+
     def run(self):
-        # initialize model variables
-        self.init()
+        # initialize model variables and output
+        self.start()
 
         # time integrate model
-        for self.t in range(self.tsteps):
+        self.advance(self.tsteps)
+
+        # delete unnecessary variables from memory
+        self.exitmodel()
+
+    def start(self):
+        """Initialize the model and its output for a run that is integrated with :meth:`advance`."""
+        self.init()
+        self.out = self.new_output(self.tsteps)
+
+    def advance(self, stop):
+        """Integrate the time steps up to (but not including) step ``stop``.
+
+        Stops early at a terminal event, in which case the output is truncated to the rows
+        that have been written.
+        """
+        if self.stopped:
+            return
+
+        for t in range(self.tnext, min(stop, self.tsteps)):
+            self.t = t
+
             # time integrate components
             self.timestep()
+            self.tnext = self.t + 1
 
-        # delete unnecessary variables from memory
+            # stop at a terminal event
+            if self.stopped:
+                self.out = self.out.view(0, (self.t - self.tstore) // self.nstore + 1)
+                break
+
+    def resume(self):
+        """Integrate the remaining time steps of a started or restored run, and finish it."""
+        self.advance(self.tsteps)
         self.exitmodel()
 
+    def checkpoint(self, path):
+        """Save the state and output of a started run to ``path``; see :mod:`classmodel.checkpoint`."""
+        save_checkpoint(self, path)
+
+    @classmethod
+    def restore(cls, path):
+        """Restore a run from a checkpoint; continue it with :meth:`advance` or :meth:`resume`."""
+        return load_checkpoint(cls, path)
+
+    def branch(self, overrides=None):
+        """Return a new run that continues from the current state of this started run.
+
+        ``overrides`` maps configuration fields to new values, which take effect from the
+        current time step on: fields that set a model variable (such as ``advtheta`` or ``h``)
+        replace its current value. The branch holds its own output from the current output row
+        on; the output of the shared part of the run is a view of this run's output, available
+        as ``prefix`` (see :meth:`full_output`). This run is not changed, and can be continued
+        or branched again.
+        """
+        overrides = dict(overrides or {})
+        fixed = [name for name in overrides if name in BRANCH_FIXED_FIELDS]
+        if fixed:
+            raise ValueError(f"cannot change {', '.join(fixed)} in a branch")
+
+        child = self.__class__(replace(self.input, **overrides))
+        child.init()
+        for name, value in items(self):
+            # callables are the timed methods of a profiler
+            if name not in BRANCH_EXCLUDED and name not in overrides and not callable(value):
+                setattr(child, name, cp.deepcopy(value))
+
+        # the adaptive integrator continues from its last step, with the tendencies of the branch
+        if self.solver is not None and child.integrator == "rk45":
+            child.solver = cp.copy(self.solver)
+            child.solver.rhs = child.rhs
+
+        # complete output rows are shared, a row that is being reduced is copied
+        rows = (self.tnext - self.tstore) // self.nstore
+        child.tstore = self.tstore + rows * self.nstore
+        shared = self.full_output()
+        child.prefix = shared.view(0, len(shared) - len(self.out) + rows)
+        child.out = child.new_output(self.tsteps - child.tstore)
+        if child.tstore < self.tnext:
+            child.out.data[:, 0] = self.out.data[:, rows]
+        return child
+
+    def fork(self, at_step, overrides):
+        """Run up to step ``at_step`` and return a branch for every dict in ``overrides``.
+
+        The run is started if it has not been yet. Continue the branches with :meth:`resume`.
+        """
+        if not hasattr(self, "tnext"):
+            self.start()
+        self.advance(at_step)
+        return [self.branch(o) for o in overrides]
+
+    def full_output(self):
+        """Return the output of the run, including the part that is shared with the run it branched from."""
+        if self.prefix is None:
+            return self.out
+        return ModelOutput.from_buffer(np.concatenate([self.prefix.data, self.out.data], axis=1), self.out.variables)
+
+    def iter_chunks(self, chunksize):
+        """Run the model and yield the output in chunks of ``chunksize`` output rows.
+
+        A row holds a time step, or an output interval if ``output_interval`` is set. Every
+        chunk is a new :class:`ModelOutput` (the last one may be shorter), so the full history
+        is only held in memory if the caller keeps the chunks.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+
+        self.init()
+
+        steps = chunksize * self.nstore
+        for start in range(0, self.tsteps, steps):
+            self.out = self.new_output(min(steps, self.tsteps - start))
+            self.tstore = start
+            self.advance(start + steps)
+            yield self.out
+            if self.stopped:
+                break
+
+        self.exitmodel()
+
+    def iter_steps(self):
+        """Run the model and yield every output row as a dict of variable values."""
+        for out in self.iter_chunks(1):
+            yield dict(zip(out.variables, out.data[:, 0], strict=True))
+
+    def run_to_sink(self, sink, member=0, chunksize=1000):
+        """Run the model and write the output to ``sink`` in chunks of ``chunksize`` output rows.
+
+        The output of the run (or of the first ensemble member) is written to member
+        ``member`` of the sink; see :mod:`classmodel.sink`.
+        """
+        start = 0
+        for out in self.iter_chunks(chunksize):
+            sink.write(out, member, start)
+            start += len(out)
+
+    def profile(self, trace=False):
+        """Time the components of this model until the returned profiler is detached.
+
+        Use the :class:`classmodel.profiling.Profiler` as a context manager around a run; with
+        ``trace=True`` it also records every call for a Chrome trace.
+        """
+        return Profiler(trace).attach(self)
+
+    def add_event(self, name, function, direction=0, terminal=False):
+        """Register an event that is checked at every time step of the following runs.
+
+        The event occurs when ``function(model)`` crosses zero, in the given ``direction``;
+        a terminal event stops the run. Returns the :class:`classmodel.events.Event`, which
+        holds the time of the first crossing after the run (see also :meth:`event_summary`).
+        """
+        event = Event(name, function, direction, terminal)
+        self.events.append(event)
+        return event
+
+    def event_summary(self):
+        """Return the time of the first occurrence of every event [h], NaN if it did not occur."""
+        return {event.name: event.time for event in self.events}
+
+    def check_events(self):
+        """Check the registered events; returns True if a terminal event stops the run."""
+        stop = False
+        for event in self.events:
+            stop |= event.check(self)
+        return stop
+
+    def new_output(self, tsteps):
+        """Allocate the output for ``tsteps`` time steps."""
+        return ModelOutput(-(-tsteps // self.nstore), variables=self.output_variables)
+
     def init(self):
         # assign variables from input data
         # initialize constants
@@ -170,6 +496,13 @@ class Model:
         self.RH_h = None  # Mixed-layer top relavtive humidity [-]
         self.dz_h = None  # Transition layer thickness [-]
         self.lcl = None  # Lifting condensation level [m]
+        self.lcl_type = self.input.lcl_type  # LCL solver ('fixed', 'newton' or 'analytic')
+        self.lcl_tol = self.input.lcl_tol  # tolerance on ln(RH) at the LCL of the 'newton' solver [-]
+        self.lcl_itmax = self.input.lcl_itmax  # maximum number of iterations of the 'newton' solver [-]
+        self.lcl_it = 0  # iterations used by the last lifting condensation level solve [-]
+        self.lcl_failures = 0  # LCL solves that did not converge [-]
+        if self.lcl_type not in LCL_SOLVERS:
+            raise ValueError(f"lcl_type must be one of {', '.join(LCL_SOLVERS)}")
 
         # Virtual temperatures and fluxes
         self.thetav = None  # initial mixed-layer potential temperature [K]
@@ -240,6 +573,17 @@ class Model:
         self.L = None  # Obukhov length [m]
         self.Rib = None  # bulk Richardson number [-]
         self.ra = None  # aerodynamic resistance [s m-1]
+        self.ribtol_type = self.input.ribtol_type  # Obukhov length solver ('fd' or 'newton')
+        self.ribtol_tol = self.input.ribtol_tol  # relative tolerance of the 'newton' solver [-]
+        self.ribtol_itmax = self.input.ribtol_itmax  # maximum number of iterations of the 'newton' solver [-]
+        self.ribtol_it = 0  # iterations used by the last Obukhov length solve [-]
+        self.ribtol_res = None  # residual of the last Obukhov length solve [-]
+        self.ribtol_failures = 0  # Obukhov length solves of the 'fd' solver that did not converge [-]
+        self.sl_spinup_tol = self.input.sl_spinup_tol  # relative tolerance of the initial spin-up [-]
+        self.sl_spinup_itmax = self.input.sl_spinup_itmax  # maximum number of passes of the initial spin-up [-]
+        self.sl_spinup_it = 0  # passes used by the initial spin-up [-]
+        self.sw_sltable = self.input.sw_sltable  # tabulated surface layer switch
+        self.sltable = None  # surface-layer lookup table
 
         # initialize radiation
         self.lat = self.input.lat  # latitude [deg]
@@ -319,14 +663,27 @@ class Model:
         self.tsteps = int(np.floor(self.input.runtime / self.input.dt))
         self.dt = self.input.dt
         self.t = 0
+        self.time = 0.0  # time since the start of the run [s]
+        self.tstore = 0  # time step of the first row of the output
+        self.tnext = 0  # next time step to integrate
+        self.prefix = None  # output of the run that this run branched from
+        self.stopped = False  # a terminal event occurred
+        for event in self.events:
+            event.reset()
+
+        self._init_forcing()
+        self._init_integration()
+        self._init_solar_geometry()
+        self._init_output()
 
         # Some sanity checks for valid input
         if self.c_beta is None:
             self.c_beta = 0  # Zero curvature; linear response
-        assert self.c_beta >= 0 or self.c_beta <= 1
+        assert np.all((self.c_beta >= 0) & (self.c_beta <= 1))
 
-        # initialize output
-        self.out = ModelOutput(self.tsteps)
+        # load the surface-layer table, which is built only once per process
+        if self.sw_sl and self.sw_sltable:
+            self.sltable = get_table(self.input.sltable_shape, self.input.sltable_tol, self.input.sltable_path)
 
         self.statistics()
 
@@ -335,8 +692,7 @@ class Model:
             self.run_radiation()
 
         if self.sw_sl:
-            for i in range(10):
-                self.run_surface_layer()
+            self.spinup_surface_layer()
 
         if self.sw_ls:
             self.run_land_surface()
@@ -348,19 +704,130 @@ class Model:
         if self.sw_ml:
             self.run_mixed_layer()
 
+    def _init_forcing(self):
+        """Resample the time-varying forcing onto the time steps, and set its initial value."""
+        self.forcing = resample_forcing(self.input, self.tsteps, self.dt)
+        if self.sw_ls and ("wtheta" in self.forcing or "wq" in self.forcing):
+            raise ValueError("wtheta and wq are computed by the land surface and cannot vary in time with sw_ls")
+        self.apply_forcing(0)
+
+    def _init_integration(self):
+        """Set up the time integrator and the update intervals of the components."""
+        self.integrator = self.input.integrator
+        if self.integrator not in INTEGRATORS:
+            raise ValueError(f"integrator must be one of {', '.join(INTEGRATORS)}")
+        self.integrator_rtol = self.input.integrator_rtol
+        self.integrator_atol = self.input.integrator_atol
+        self.integrator_itmax = self.input.integrator_itmax
+        self.integrator_it = 0  # passes over the components in the last tendency evaluation
+        self.solver = None  # adaptive integrator, created at the first time step
+
+        # time steps between the updates of the slow components; in between, their output is held
+        self.nradiation = steps_per_interval("radiation_interval", self.input.radiation_interval, self.dt)
+        self.nsurface_layer = steps_per_interval("surface_layer_interval", self.input.surface_layer_interval, self.dt)
+        self.nland_surface = steps_per_interval("land_surface_interval", self.input.land_surface_interval, self.dt)
+        if self.integrator == "rk45" and max(self.nradiation, self.nsurface_layer, self.nland_surface) > 1:
+            raise ValueError("the rk45 scheme does not support update intervals of the components other than dt")
+
+    def _init_solar_geometry(self):
+        """Precompute the solar geometry at the times at which the radiation is evaluated.
+
+        These are the time steps, and for the rk4 scheme also the half steps; ensemble members
+        with the same location and date share one column.
+        """
+        if self.sw_rad:
+            self.solar_dt = 0.5 * self.dt if self.integrator == "rk4" else self.dt
+            self.solar_time = np.arange(int(round(self.dt / self.solar_dt)) * self.tsteps + 1) * self.solar_dt
+            geometry = [_shared(value) for value in (self.lat, self.lon, self.doy, self.tstart)]
+            time = self.solar_time if all(np.ndim(value) == 0 for value in geometry) else self.solar_time[:, None]
+            self.solar_sinlea = solar_elevation(time, *geometry)
+            self.solar_Tr = 0.6 + 0.2 * self.solar_sinlea  # transmissivity without clouds [-]
+        else:
+            self.solar_dt = self.solar_time = self.solar_sinlea = self.solar_Tr = None
+
+    def _init_output(self):
+        """Set up the output variables and their reduction over an output interval."""
+        # time is always stored as the first variable
+        self.output_variables = ("t",) + tuple(
+            name for name in (self.input.output_variables or VARIABLES) if name != "t"
+        )
+        unknown = [name for name in self.output_variables if name not in VARIABLES]
+        if unknown:
+            raise ValueError(f"unknown output variables: {', '.join(unknown)}")
+        self.output_attributes = [
+            (OUTPUT_ATTRIBUTES.get(name, name), name in OUTPUT_CO2_FLUXES) for name in self.output_variables[1:]
+        ]
+
+        self.nstore = steps_per_interval("output_interval", self.input.output_interval, self.dt)  # steps per row
+
+        self.output_reduction = self.input.output_reduction
+        if self.output_reduction not in OUTPUT_REDUCTIONS:
+            raise ValueError(f"output_reduction must be one of {', '.join(OUTPUT_REDUCTIONS)}")
+
+    def spinup_surface_layer(self):
+        """Repeat the surface layer until ustar, L and thetasurf change by less than the relative tolerance.
+
+        The surface layer starts from the drag coefficients of a neutral guess. Ensemble members
+        that have converged hold their values, so that each reproduces the spin-up of a single run.
+        """
+        converged = False
+        for it in range(1, self.sl_spinup_itmax + 1):
+            self.sl_spinup_it = it
+            previous = {name: getattr(self, name) for name in SURFACE_LAYER_OUTPUT}
+            self.run_surface_layer()
+            if it == 1:
+                continue
+            for name, value in previous.items():
+                setattr(self, name, _where(converged, value, getattr(self, name)))
+            converged = converged | np.all(
+                [
+                    np.abs(getattr(self, name) - previous[name]) <= self.sl_spinup_tol * np.abs(getattr(self, name))
+                    for name in ("ustar", "L", "thetasurf")
+                ],
+                axis=0,
+            )
+            if np.all(converged):
+                break
+
     def timestep(self):
+        self.time = self.t * self.dt
+        if self.forcing:
+            self.apply_forcing(self.t)
+
+        # compute diagnostic variables and tendencies at the current state
+        if self.integrator == "euler":
+            self.run_components()
+        else:
+            self.converge_components()
+
+        # check events, and store output before time integration
+        self.stopped = self.check_events()
+        self.store()
+        if self.stopped:
+            return
+
+        # time integrate prognostic variables
+        self.integrate()
+
+    def apply_forcing(self, t):
+        """Set the time-varying forcing to its value at time step ``t``."""
+        for name, values in self.forcing.items():
+            setattr(self, name, values[t])
+
+    def run_components(self):
+        """Compute the diagnostic variables and tendencies of the active components."""
         self.statistics()
 
         # run radiation model
-        if self.sw_rad:
+        if self.sw_rad and self.t % self.nradiation == 0:
             self.run_radiation()
 
         # run surface layer model
-        if self.sw_sl:
+        if self.sw_sl and self.t % self.nsurface_layer == 0:
             self.run_surface_layer()
 
         # run land surface model
-        if self.sw_ls:
+        if self.sw_ls and self.t % self.nland_surface == 0:
             self.run_land_surface()
 
         # run cumulus parameterization
@@ -371,16 +838,92 @@ class Model:
         if self.sw_ml:
             self.run_mixed_layer()
 
-        # store output before time integration
-        self.store()
+    def converge_components(self):
+        """Run the components until the variables that couple them converge.
+
+        The surface layer and land surface are coupled to the other components through the
+        fluxes, skin temperature and velocity scales of their previous evaluation. The
+        higher-order schemes need tendencies that only depend on the state, so the components
+        are repeated until these coupling variables converge.
+        """
+        self.run_components()
+        self.integrator_it = 1
+        sl = self.sw_sl and self.t % self.nsurface_layer == 0
+        ls = self.sw_ls and self.t % self.nland_surface == 0
+        if not (sl or ls):
+            return
+
+        coupling = self.get_coupling()
+        for it in range(2, self.integrator_itmax + 1):
+            self.integrator_it = it
+            self.run_components()
+            previous, coupling = coupling, self.get_coupling()
+            if np.all(np.abs(coupling - previous) <= self.integrator_rtol * np.abs(coupling) + self.integrator_atol):
+                break
+
+    def get_coupling(self):
+        """Return the variables that couple the components, see :meth:`converge_components`."""
+        return np.array(np.broadcast_arrays(*[getattr(self, name) for name in COUPLING_VARIABLES]))
+
+    def integrate(self):
+        """Integrate the prognostic variables over one time step with the configured scheme."""
+        if self.integrator == "euler":
+            # time integrate land surface model
+            if self.sw_ls:
+                self.integrate_land_surface()
+
+            # time integrate mixed-layer model
+            if self.sw_ml:
+                self.integrate_mixed_layer()
+            return
+
+        y = self.get_state()
+        f = self.get_tendencies()
+        if self.integrator == "rk45":
+            # the adaptive integrator runs ahead of the model time and interpolates the state
+            if self.solver is None:
+                self.solver = DormandPrince(
+                    self.rhs, (self.time, y, f), self.dt, self.integrator_rtol, self.integrator_atol
+                )
+            y = self.solver.advance(self.time + self.dt)
+        else:
+            y = STEPS[self.integrator](self.rhs, self.time, y, f, self.dt)
+        self.set_state(y)
 
-        # time integrate land surface model
+    def state_variables(self):
+        """Return the prognostic variables and their tendencies, depending on the active components."""
+        variables = ()
+        if self.sw_ml:
+            variables += MIXED_LAYER_STATE
+            if self.sw_wind:
+                variables += WIND_STATE
         if self.sw_ls:
-            self.integrate_land_surface()
+            variables += LAND_SURFACE_STATE
+        return variables
+
+    def get_state(self):
+        """Return the prognostic variables of the active components as an array."""
+        return np.array(np.broadcast_arrays(*[getattr(self, name) for name, _ in self.state_variables()]))
+
+    def get_tendencies(self):
+        """Return the tendencies of the prognostic variables, in the order of :meth:`get_state`."""
+        return np.array(np.broadcast_arrays(*[getattr(self, tend) for _, tend in self.state_variables()]))
 
-        # time integrate mixed-layer model
+    def set_state(self, y):
+        """Set the prognostic variables from the array ``y`` of :meth:`get_state`."""
+        for (name, _), value in zip(self.state_variables(), y, strict=True):
+            setattr(self, name, value)
+
+        # Limit dz to minimal value
         if self.sw_ml:
-            self.integrate_mixed_layer()
+            self.dz_h = np.maximum(self.dz_h, 50.0)
+
+    def rhs(self, time, y):
+        """Return the tendencies of the prognostic variables ``y`` at ``time`` since the start [s]."""
+        self.set_state(y)
+        self.time = time
+        self.converge_components()
+        return self.get_tendencies()
 
     def statistics(self):
         # Calculate virtual temperatures
@@ -399,48 +942,85 @@ class Model:
 
         self.RH_h = self.q / qsat(self.T_h, self.P_h)
 
-        # Find lifting condensation level iteratively
-        if self.t == 0:
+        # Find lifting condensation level, from the mixed-layer height at the start of the run
+        # (not at the later stages of the first step of the higher-order integrators)
+        if self.time == 0.0:
             self.lcl = self.h
             RHlcl = 0.5
         else:
             RHlcl = 0.9998
 
+        if self.lcl_type != "fixed":
+            self.solve_lcl()
+            return
+
+        # fixed-step iteration, ensemble members hold their LCL once converged
         itmax = 30
         it = 0
-        while ((RHlcl <= 0.9999) or (RHlcl >= 1.0001)) and it < itmax:
-            self.lcl += (1.0 - RHlcl) * 1000.0
-            p_lcl = self.Ps - self.rho * self.g * self.lcl
-            T_lcl = self.theta - self.g / self.cp * self.lcl
-            RHlcl = self.q / qsat(T_lcl, p_lcl)
+        active = (RHlcl <= LCL_RH_MIN) | (RHlcl >= LCL_RH_MAX)
+        while _any(active) and it < itmax:
+            lcl = self.lcl + (1.0 - RHlcl) * 1000.0
+            p_lcl = self.Ps - self.rho * self.g * lcl
+            T_lcl = self.theta - self.g / self.cp * lcl
+            RHlcl = _where(active, self.q / qsat(T_lcl, p_lcl), RHlcl)
+            self.lcl = _where(active, lcl, self.lcl)
+            active = (RHlcl <= LCL_RH_MIN) | (RHlcl >= LCL_RH_MAX)
             it += 1
 
-        if it == itmax:
-            print("LCL calculation not converged!!")
-            print(f"RHlcl = {RHlcl:f}, zlcl={self.lcl:f}")
+        self.lcl_it = it
+
+        if _any(active):
+            self.lcl_not_converged(np.count_nonzero(active))
+
+    def solve_lcl(self):
+        """Solve the lifting condensation level with a solver of :mod:`classmodel.thermodynamics`."""
+        if self.lcl_type == "analytic":
+            # linearized around the LCL of the previous time step; the initial guess is
+            # further off, so the solution is refined once at the first time step
+            if self.time == 0.0:
+                self.lcl = lcl_analytic(self.theta, self.q, self.Ps, self.rho, self.g, self.cp, self.lcl)
+            self.lcl = lcl_analytic(self.theta, self.q, self.Ps, self.rho, self.g, self.cp, self.lcl)
+            self.lcl_it = 0
+            return
+
+        lcl, it, res = lcl_newton(
+            self.theta, self.q, self.Ps, self.rho, self.g, self.cp, self.lcl, self.lcl_tol, self.lcl_itmax
+        )
+        self.lcl = lcl[()]
+        self.lcl_it = it[()]
+        failed = np.count_nonzero(~(np.abs(res) <= self.lcl_tol))
+        if failed:
+            self.lcl_not_converged(failed)
+
+    def lcl_not_converged(self, n):
+        """Count ``n`` LCL solves that did not converge; the warning is shown once, not at every time step."""
+        self.lcl_failures += n
+        warnings.warn("LCL calculation not converged, see lcl_failures", ConvergenceWarning, stacklevel=3)
+
+    def ribtol_not_converged(self, n):
+        """Count ``n`` Obukhov length solves that did not converge, as :meth:`lcl_not_converged`."""
+        self.ribtol_failures += n
+        warnings.warn("Obukhov length calculation not converged, see ribtol_failures", ConvergenceWarning, stacklevel=3)
 
     def run_cumulus(self):
         # Calculate mixed-layer top relative humidity variance (Neggers et. al 2006/7)
-        if self.wthetav > 0:
-            self.q2_h = -(self.wqe + self.wqM) * self.dq * self.h / (self.dz_h * self.wstar)
-            self.CO22_h = -(self.wCO2e + self.wCO2M) * self.dCO2 * self.h / (self.dz_h * self.wstar)
-        else:
-            self.q2_h = 0.0
-            self.CO22_h = 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            convective = self.wthetav > 0
+            self.q2_h = _where(convective, -(self.wqe + self.wqM) * self.dq * self.h / (self.dz_h * self.wstar), 0.0)
+            self.CO22_h = _where(
+                convective, -(self.wCO2e + self.wCO2M) * self.dCO2 * self.h / (self.dz_h * self.wstar), 0.0
+            )
 
-        # calculate cloud core fraction (ac), mass flux (M) and moisture flux (wqM)
-        self.ac = max(
-            0.0,
-            0.5 + (0.36 * np.arctan(1.55 * ((self.q - qsat(self.T_h, self.P_h)) / self.q2_h**0.5))),
-        )
-        self.M = self.ac * self.wstar
-        self.wqM = self.M * self.q2_h**0.5
+            # calculate cloud core fraction (ac), mass flux (M) and moisture flux (wqM)
+            self.ac = _max(
+                0.0,
+                0.5 + (0.36 * np.arctan(1.55 * ((self.q - qsat(self.T_h, self.P_h)) / self.q2_h**0.5))),
+            )
+            self.M = self.ac * self.wstar
+            self.wqM = self.M * self.q2_h**0.5
 
-        # Only calculate CO2 mass-flux if mixed-layer top jump is negative
-        if self.dCO2 < 0:
-            self.wCO2M = self.M * self.CO22_h**0.5
-        else:
-            self.wCO2M = 0.0
+            # Only calculate CO2 mass-flux if mixed-layer top jump is negative
+            self.wCO2M = _where(self.dCO2 < 0, self.M * self.CO22_h**0.5, 0.0)
 
     def run_mixed_layer(self):
         if not self.sw_sl:
@@ -465,23 +1045,22 @@ class Model:
         self.wf = self.dFz / (self.rho * self.cp * self.dtheta)
 
         # calculate convective velocity scale w*
-        if self.wthetav > 0.0:
-            self.wstar = ((self.g * self.h * self.wthetav) / self.thetav) ** (1.0 / 3.0)
-        else:
-            self.wstar = 1e-6
+        with np.errstate(invalid="ignore"):
+            self.wstar = _where(
+                self.wthetav > 0.0, ((self.g * self.h * self.wthetav) / self.thetav) ** (1.0 / 3.0), 1e-6
+            )
 
         # Virtual heat entrainment flux
         self.wthetave = -self.beta * self.wthetav
 
         # compute mixed-layer tendencies
         if self.sw_shearwe:
-            self.we = (-self.wthetave + 5.0 * self.ustar**3.0 * self.thetav / (self.g * self.h)) / self.dthetav
+            we = (-self.wthetave + 5.0 * self.ustar**3.0 * self.thetav / (self.g * self.h)) / self.dthetav
         else:
-            self.we = -self.wthetave / self.dthetav
+            we = -self.wthetave / self.dthetav
 
         # Don't allow boundary layer shrinking if wtheta < 0
-        if self.we < 0:
-            self.we = 0.0
+        self.we = _where(we < 0, 0.0, we)
 
         # Calculate entrainment fluxes
         self.wthetae = -self.we * self.dtheta
@@ -507,10 +1086,7 @@ class Model:
             self.dvtend = self.gammav * (self.we + self.wf - self.M) - self.vtend
 
         # tendency of the transition layer thickness
-        if self.ac > 0 or self.lcl - self.h < 300:
-            self.dztend = ((self.lcl - self.h) - self.dz_h) / 7200.0
-        else:
-            self.dztend = 0.0
+        self.dztend = _where((self.ac > 0) | (self.lcl - self.h < 300), ((self.lcl - self.h) - self.dz_h) / 7200.0, 0.0)
 
     def integrate_mixed_layer(self):
         # set values previous time step
@@ -542,8 +1118,7 @@ class Model:
 
         # Limit dz to minimal value
         dz0 = 50
-        if self.dz_h < dz0:
-            self.dz_h = dz0
+        self.dz_h = _where(self.dz_h < dz0, dz0, self.dz_h)
 
         if self.sw_wind:
             self.u = u0 + self.dt * self.utend
@@ -552,15 +1127,18 @@ class Model:
             self.dv = dv0 + self.dt * self.dvtend
 
     def run_radiation(self):
-        sda = 0.409 * np.cos(2.0 * np.pi * (self.doy - 173.0) / 365.0)
-        sinlea = np.sin(2.0 * np.pi * self.lat / 360.0) * np.sin(sda) - np.cos(2.0 * np.pi * self.lat / 360.0) * np.cos(
-            sda
-        ) * np.cos(2.0 * np.pi * (self.t * self.dt + self.tstart * 3600.0) / 86400.0 + 2.0 * np.pi * self.lon / 360.0)
-        sinlea = max(sinlea, 0.0001)
+        # solar geometry from the table of the run, or computed at times between its entries
+        k = round(self.time / self.solar_dt)
+        if k < self.solar_time.size and self.solar_time[k] == self.time:
+            sinlea = self.solar_sinlea[k]
+            Tr = self.solar_Tr[k]
+        else:
+            sinlea = solar_elevation(self.time, self.lat, self.lon, self.doy, self.tstart)
+            Tr = 0.6 + 0.2 * sinlea
 
         Ta = self.theta * ((self.Ps - 0.1 * self.h * self.rho * self.g) / self.Ps) ** (self.Rd / self.cp)
 
-        Tr = (0.6 + 0.2 * sinlea) * (1.0 - 0.4 * self.cc)
+        Tr = Tr * (1.0 - 0.4 * self.cc)
 
         self.Swin = self.S0 * Tr * sinlea
         self.Swout = self.alpha * self.S0 * Tr * sinlea
@@ -570,7 +1148,7 @@ class Model:
         self.Q = self.Swin - self.Swout + self.Lwin - self.Lwout
 
     def run_surface_layer(self):
-        ueff = max(0.01, np.sqrt(self.u**2.0 + self.v**2.0 + self.wstar**2.0))
+        ueff = _max(0.01, np.sqrt(self.u**2.0 + self.v**2.0 + self.wstar**2.0))
         self.thetasurf = self.theta + self.wtheta / (self.Cs * ueff)
         qsatsurf = qsat(self.thetasurf, self.Ps)
         cq = (1.0 + self.Cs * ueff * self.rs) ** -1.0
@@ -580,17 +1158,12 @@ class Model:
 
         zsl = 0.1 * self.h
         self.Rib = self.g / self.thetav * zsl * (self.thetav - self.thetavsurf) / ueff**2.0
-        self.Rib = min(self.Rib, 0.2)
+        self.Rib = _min(self.Rib, 0.2)
 
-        self.L = self.ribtol(self.Rib, zsl, self.z0m, self.z0h)  # Slow python iteration
-        # self.L    = ribtol.ribtol(self.Rib, zsl, self.z0m, self.z0h) # Fast C++ iteration
-
-        self.Cm = self.k**2.0 / (np.log(zsl / self.z0m) - self.psim(zsl / self.L) + self.psim(self.z0m / self.L)) ** 2.0
-        self.Cs = (
-            self.k**2.0
-            / (np.log(zsl / self.z0m) - self.psim(zsl / self.L) + self.psim(self.z0m / self.L))
-            / (np.log(zsl / self.z0h) - self.psih(zsl / self.L) + self.psih(self.z0h / self.L))
-        )
+        if self.sltable is None:
+            self.L, self.Cm, self.Cs = self.drag_coefficients(self.Rib, zsl, self.z0m, self.z0h, self.L)
+        else:
+            self.L, self.Cm, self.Cs = self.lookup_drag_coefficients(self.Rib, zsl)
 
         self.ustar = np.sqrt(self.Cm) * ueff
         self.uw = -self.Cm * ueff * self.u
@@ -618,7 +1191,36 @@ class Model:
         self.esat2m = 0.611e3 * np.exp(17.2694 * (self.T2m - 273.16) / (self.T2m - 35.86))
         self.e2m = self.q2m * self.Ps / 0.622
 
-    def ribtol(self, Rib, zsl, z0m, z0h):
+    def drag_coefficients(self, Rib, zsl, z0m, z0h, L):  # noqa: N803
+        """Return the Obukhov length and drag coefficients from the iterative surface-layer solution."""
+        if self.ribtol_type == "fd":
+            L = self.ribtol(Rib, zsl, z0m, z0h)  # Slow python iteration
+        elif self.ribtol_type == "newton":
+            L = self.ribtol_newton(Rib, zsl, z0m, z0h, L)
+        else:
+            sys.exit(f'option "{self.ribtol_type}" for "ribtol_type" invalid')
+
+        Cm = self.k**2.0 / (np.log(zsl / z0m) - self.psim(zsl / L) + self.psim(z0m / L)) ** 2.0
+        Cs = (
+            self.k**2.0
+            / (np.log(zsl / z0m) - self.psim(zsl / L) + self.psim(z0m / L))
+            / (np.log(zsl / z0h) - self.psih(zsl / L) + self.psih(z0h / L))
+        )
+        return L, Cm, Cs
+
+    def lookup_drag_coefficients(self, Rib, zsl):  # noqa: N803
+        """Interpolate the Obukhov length and drag coefficients from the surface-layer table.
+
+        Outside the range of the table they are solved with :meth:`drag_coefficients`.
+        """
+        lookup = self.sltable.lookup(Rib, zsl, self.z0m, self.z0h)
+        if lookup is None:
+            return self.drag_coefficients(Rib, zsl, self.z0m, self.z0h, self.L)
+        self.ribtol_it = 0
+        self.ribtol_res = None
+        return lookup
+
+    def ribtol(self, Rib, zsl, z0m, z0h):  # noqa: N803
         if Rib > 0.0:
             L = 1.0
             L0 = 2.0
@@ -626,7 +1228,9 @@ class Model:
             L = -1.0
             L0 = -2.0
 
-        while abs(L - L0) > 0.001:
+        it = 0
+        while abs(L - L0) > RIBTOL_FD_TOL and it < RIBTOL_FD_ITMAX:
+            it += 1
             L0 = L
             fx = (
                 Rib
@@ -653,9 +1257,53 @@ class Model:
             ) / (Lstart - Lend)
             L = L - fx / fxdif
 
-            if abs(L) > 1e15:
+            if abs(L) > L_NEUTRAL:
+                break
+        else:
+            if abs(L - L0) > RIBTOL_FD_TOL:
+                self.ribtol_not_converged(1)
+
+        self.ribtol_it = it
+        self.ribtol_res = fx
+        return L
+
+    def ribtol_newton(self, Rib, zsl, z0m, z0h, L):  # noqa: N803
+        """Solve the Obukhov length with a Newton iteration with analytic derivative.
+
+        The iteration is warm started from the Obukhov length ``L`` of the previous call if it
+        has the stability of ``Rib``.
+        """
+        if L is None or (L > 0.0) != (Rib > 0.0) or abs(L) > L_NEUTRAL:
+            L = 1.0 if Rib > 0.0 else -1.0
+
+        lnm = np.log(zsl / z0m)
+        lnh = np.log(zsl / z0h)
+
+        for it in range(1, self.ribtol_itmax + 1):
+            self.ribtol_it = it
+            zeta = zsl / L
+            zetam = z0m / L
+            zetah = z0h / L
+            Fm = lnm - self.psim(zeta) + self.psim(zetam)
+            Fh = lnh - self.psih(zeta) + self.psih(zetah)
+            fx = Rib - zeta * Fh / Fm**2.0
+
+            # derivatives of the integrated profile functions to L
+            dFm = (zeta * self.dpsim(zeta) - zetam * self.dpsim(zetam)) / L
+            dFh = (zeta * self.dpsih(zeta) - zetah * self.dpsih(zetah)) / L
+            fxdif = zeta * Fh / (L * Fm**2.0) - zeta * (dFh - 2.0 * Fh * dFm / Fm) / Fm**2.0
+
+            L0 = L
+            L = L - fx / fxdif
+
+            # do not allow the iteration to jump to the other stability regime
+            if (L > 0.0) != (L0 > 0.0):
+                L = 0.5 * L0
+
+            if abs(L - L0) <= self.ribtol_tol * abs(L) or abs(L) > L_NEUTRAL:
                 break
 
+        self.ribtol_res = fx
         return L
 
     def psim(self, zeta):
@@ -668,6 +1316,15 @@ class Model:
             psim = -2.0 / 3.0 * (zeta - 5.0 / 0.35) * np.exp(-0.35 * zeta) - zeta - (10.0 / 3.0) / 0.35
         return psim
 
+    def dpsim(self, zeta):
+        """Return the derivative of :meth:`psim` to ``zeta``."""
+        if zeta <= 0:
+            x = (1.0 - 16.0 * zeta) ** (0.25)
+            dpsim = -4.0 / x**3.0 * (2.0 / (1.0 + x) + 2.0 * (x - 1.0) / (1.0 + x**2.0))
+        else:
+            dpsim = (0.7 / 3.0 * zeta - 4.0) * np.exp(-0.35 * zeta) - 1.0
+        return dpsim
+
     def psih(self, zeta):
         if zeta <= 0:
             x = (1.0 - 16.0 * zeta) ** (0.25)
@@ -683,119 +1340,102 @@ class Model:
             )
         return psih
 
+    def dpsih(self, zeta):
+        """Return the derivative of :meth:`psih` to ``zeta``."""
+        if zeta <= 0:
+            x = (1.0 - 16.0 * zeta) ** (0.25)
+            dpsih = -16.0 / (x**2.0 * (1.0 + x**2.0))
+        else:
+            dpsih = (0.7 / 3.0 * zeta - 4.0) * np.exp(-0.35 * zeta) - (1.0 + (2.0 / 3.0) * zeta) ** (0.5)
+        return dpsih
+
     def jarvis_stewart(self):
         # calculate surface resistances using Jarvis-Stewart model
         if self.sw_rad:
-            f1 = 1.0 / min(1.0, ((0.004 * self.Swin + 0.05) / (0.81 * (0.004 * self.Swin + 1.0))))
+            f1 = 1.0 / _min(1.0, ((0.004 * self.Swin + 0.05) / (0.81 * (0.004 * self.Swin + 1.0))))
         else:
             f1 = 1.0
 
-        if self.w2 > self.wwilt:  # and self.w2 <= self.wfc):
-            f2 = (self.wfc - self.wwilt) / (self.w2 - self.wwilt)
-        else:
-            f2 = 1.0e8
+        f2 = _moisture_factor(self.w2, self.wfc, self.wwilt)
 
         # Limit f2 in case w2 > wfc, where f2 < 1
-        f2 = max(f2, 1.0)
+        f2 = _max(f2, 1.0)
         f3 = 1.0 / np.exp(-self.gD * (self.esat - self.e) / 100.0)
         f4 = 1.0 / (1.0 - 0.0016 * (298.0 - self.theta) ** 2.0)
 
         self.rs = self.rsmin / self.LAI * f1 * f2 * f3 * f4
 
-    def factorial(self, k):
-        factorial = 1
-        for n in range(2, k + 1):
-            factorial = factorial * float(n)
-        return factorial
-
-    def E1(self, x):
-        E1sum = 0
-        for k in range(1, 100):
-            E1sum += pow((-1.0), (k + 0.0)) * pow(x, (k + 0.0)) / ((k + 0.0) * self.factorial(k))
-        return -0.57721566490153286060 - np.log(x) - E1sum
-
     def ags(self):
         # Select index for plant type
-        if self.c3c4 == "c3":
-            c = 0
-        elif self.c3c4 == "c4":
-            c = 1
-        else:
-            sys.exit('option "%s" for "c3c4" invalid' % self.c3c4)
+        c3c4 = np.asarray(self.c3c4)
+        invalid = (c3c4 != "c3") & (c3c4 != "c4")
+        if invalid.any():
+            sys.exit(f'option "{c3c4[invalid][0]}" for "c3c4" invalid')
+        c = np.where(c3c4 == "c4", 1, 0)
+        c = int(c) if c.ndim == 0 else c
+
+        (CO2comp298, Q10CO2, gm298, Ammax298, Q10gm, T1gm, T2gm, Q10Am, T1Am, T2Am, f0, ad, alpha0, Kx, gmin) = (
+            _take(getattr(self, name), c) for name in AGS_PLANT_PARAMETERS
+        )
 
         # calculate CO2 compensation concentration
-        CO2comp = self.CO2comp298[c] * self.rho * pow(self.Q10CO2[c], (0.1 * (self.thetasurf - 298.0)))
+        CO2comp = CO2comp298 * self.rho * pow(Q10CO2, (0.1 * (self.thetasurf - 298.0)))
 
         # calculate mesophyll conductance
         gm = (
-            self.gm298[c]
-            * pow(self.Q10gm[c], (0.1 * (self.thetasurf - 298.0)))
-            / (
-                (1.0 + np.exp(0.3 * (self.T1gm[c] - self.thetasurf)))
-                * (1.0 + np.exp(0.3 * (self.thetasurf - self.T2gm[c])))
-            )
+            gm298
+            * pow(Q10gm, (0.1 * (self.thetasurf - 298.0)))
+            / ((1.0 + np.exp(0.3 * (T1gm - self.thetasurf))) * (1.0 + np.exp(0.3 * (self.thetasurf - T2gm))))
         )
         gm = gm / 1000.0  # conversion from mm s-1 to m s-1
 
         # calculate CO2 concentration inside the leaf (ci)
-        fmin0 = self.gmin[c] / self.nuco2q - 1.0 / 9.0 * gm
-        fmin = -fmin0 + pow((pow(fmin0, 2.0) + 4 * self.gmin[c] / self.nuco2q * gm), 0.5) / (2.0 * gm)
+        fmin0 = gmin / self.nuco2q - 1.0 / 9.0 * gm
+        fmin = -fmin0 + pow((pow(fmin0, 2.0) + 4 * gmin / self.nuco2q * gm), 0.5) / (2.0 * gm)
 
         Ds = (esat(self.Ts) - self.e) / 1000.0  # kPa
-        D0 = (self.f0[c] - fmin) / self.ad[c]
+        D0 = (f0 - fmin) / ad
 
-        cfrac = self.f0[c] * (1.0 - (Ds / D0)) + fmin * (Ds / D0)
+        cfrac = f0 * (1.0 - (Ds / D0)) + fmin * (Ds / D0)
         co2abs = self.CO2 * (self.mco2 / self.mair) * self.rho  # conversion mumol mol-1 (ppm) to mgCO2 m3
         ci = cfrac * (co2abs - CO2comp) + CO2comp
 
         # calculate maximal gross primary production in high light conditions (Ag)
         Ammax = (
-            self.Ammax298[c]
-            * pow(self.Q10Am[c], (0.1 * (self.thetasurf - 298.0)))
-            / (
-                (1.0 + np.exp(0.3 * (self.T1Am[c] - self.thetasurf)))
-                * (1.0 + np.exp(0.3 * (self.thetasurf - self.T2Am[c])))
-            )
+            Ammax298
+            * pow(Q10Am, (0.1 * (self.thetasurf - 298.0)))
+            / ((1.0 + np.exp(0.3 * (T1Am - self.thetasurf))) * (1.0 + np.exp(0.3 * (self.thetasurf - T2Am))))
         )
 
         # calculate effect of soil moisture stress on gross assimilation rate
-        betaw = max(1e-3, min(1.0, (self.w2 - self.wwilt) / (self.wfc - self.wwilt)))
+        betaw = _max(1e-3, _min(1.0, (self.w2 - self.wwilt) / (self.wfc - self.wwilt)))
 
-        # calculate stress function
-        if self.c_beta == 0:
-            fstr = betaw
-        else:
-            # Following Combe et al (2016)
-            if self.c_beta < 0.25:
-                P = 6.4 * self.c_beta
-            elif self.c_beta < 0.50:
-                P = 7.6 * self.c_beta - 0.3
-            else:
-                P = 2 ** (3.66 * self.c_beta + 0.34) - 1
-            fstr = (1.0 - np.exp(-P * betaw)) / (1 - np.exp(-P))
+        # calculate stress function, following Combe et al (2016) for non-zero curvature
+        P = _where(
+            self.c_beta < 0.25,
+            6.4 * self.c_beta,
+            _where(self.c_beta < 0.50, 7.6 * self.c_beta - 0.3, 2 ** (3.66 * self.c_beta + 0.34) - 1),
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fstr = _where(self.c_beta == 0, betaw, (1.0 - np.exp(-P * betaw)) / (1 - np.exp(-P)))
 
         # calculate gross assimilation rate (Am)
         Am = Ammax * (1.0 - np.exp(-(gm * (ci - CO2comp) / Ammax)))
         Rdark = (1.0 / 9.0) * Am
-        PAR = 0.5 * max(1e-1, self.Swin * self.cveg)
+        PAR = 0.5 * _max(1e-1, self.Swin * self.cveg)
 
         # calculate  light use efficiency
-        alphac = self.alpha0[c] * (co2abs - CO2comp) / (co2abs + 2.0 * CO2comp)
-
-        # calculate gross primary productivity
-        Ag = (Am + Rdark) * (1 - np.exp(alphac * PAR / (Am + Rdark)))
+        alphac = alpha0 * (co2abs - CO2comp) / (co2abs + 2.0 * CO2comp)
 
         # 1.- calculate upscaling from leaf to canopy: net flow CO2 into the plant (An)
-        y = alphac * self.Kx[c] * PAR / (Am + Rdark)
-        An = (Am + Rdark) * (
-            1.0 - 1.0 / (self.Kx[c] * self.LAI) * (self.E1(y * np.exp(-self.Kx[c] * self.LAI)) - self.E1(y))
-        )
+        y = alphac * Kx * PAR / (Am + Rdark)
+        An = (Am + Rdark) * (1.0 - 1.0 / (Kx * self.LAI) * (E1(y * np.exp(-Kx * self.LAI)) - E1(y)))
 
         # 2.- calculate upscaling from leaf to canopy: CO2 conductance at canopy level
-        a1 = 1.0 / (1.0 - self.f0[c])
-        Dstar = D0 / (a1 * (self.f0[c] - fmin))
+        a1 = 1.0 / (1.0 - f0)
+        Dstar = D0 / (a1 * (f0 - fmin))
 
-        gcco2 = self.LAI * (self.gmin[c] / self.nuco2q + a1 * fstr * An / ((co2abs - CO2comp) * (1.0 + Ds / Dstar)))
+        gcco2 = self.LAI * (gmin / self.nuco2q + a1 * fstr * An / ((co2abs - CO2comp) * (1.0 + Ds / Dstar)))
 
         # calculate surface resistance for moisture and carbon dioxide
         self.rs = 1.0 / (1.6 * gcco2)
@@ -820,7 +1460,7 @@ class Model:
         if self.sw_sl:
             self.ra = (self.Cs * ueff) ** -1.0
         else:
-            self.ra = ueff / max(1.0e-3, self.ustar) ** 2.0
+            self.ra = ueff / _max(1.0e-3, self.ustar) ** 2.0
 
         # first calculate essential thermodynamic variables
         self.esat = esat(self.theta)
@@ -839,14 +1479,11 @@ class Model:
             sys.exit('option "%s" for "ls_type" invalid' % self.ls_type)
 
         # recompute f2 using wg instead of w2
-        if self.wg > self.wwilt:  # and self.w2 <= self.wfc):
-            f2 = (self.wfc - self.wwilt) / (self.wg - self.wwilt)
-        else:
-            f2 = 1.0e8
+        f2 = _moisture_factor(self.wg, self.wfc, self.wwilt)
         self.rssoil = self.rssoilmin * f2
 
         Wlmx = self.LAI * self.Wmax
-        self.cliq = min(1.0, self.Wl / Wlmx)
+        self.cliq = _min(1.0, self.Wl / Wlmx)
 
         # calculate skin temperature implictly
         self.Ts = (
@@ -940,231 +1577,43 @@ class Model:
 
     # store model output
     def store(self):
-        t = self.t
-        self.out.t[t] = t * self.dt / 3600.0 + self.tstart
-        self.out.h[t] = self.h
-
-        self.out.theta[t] = self.theta
-        self.out.thetav[t] = self.thetav
-        self.out.dtheta[t] = self.dtheta
-        self.out.dthetav[t] = self.dthetav
-        self.out.wtheta[t] = self.wtheta
-        self.out.wthetav[t] = self.wthetav
-        self.out.wthetae[t] = self.wthetae
-        self.out.wthetave[t] = self.wthetave
-
-        self.out.q[t] = self.q
-        self.out.dq[t] = self.dq
-        self.out.wq[t] = self.wq
-        self.out.wqe[t] = self.wqe
-        self.out.wqM[t] = self.wqM
-
-        self.out.qsat[t] = self.qsat
-        self.out.e[t] = self.e
-        self.out.esat[t] = self.esat
+        # output row and the time step within its interval
+        i, k = divmod(self.t - self.tstore, self.nstore)
+        reduction = self.output_reduction
+        if k > 0 and reduction == "instantaneous":
+            return
+
+        # gather the output variables into one column
+        data = self.out.data
+        row = self.output_row(np.empty_like(data[1:, i]))
+
+        # the time of a row is the start of its interval
+        if k == 0:
+            data[0, i] = self.t * self.dt / 3600.0 + self.tstart
+            data[1:, i] = row
+        elif reduction == "min":
+            np.minimum(data[1:, i], row, out=data[1:, i])
+        elif reduction == "max":
+            np.maximum(data[1:, i], row, out=data[1:, i])
+        else:
+            data[1:, i] += row
+
+        if reduction == "mean" and (k == self.nstore - 1 or self.t == self.tsteps - 1 or self.stopped):
+            data[1:, i] /= k + 1
 
+    def output_row(self, row):
+        """Write the output variables except the time into ``row``."""
         fac = (self.rho * self.mco2) / self.mair
-        self.out.CO2[t] = self.CO2
-        self.out.dCO2[t] = self.dCO2
-        self.out.wCO2[t] = self.wCO2 * fac
-        self.out.wCO2e[t] = self.wCO2e * fac
-        self.out.wCO2R[t] = self.wCO2R * fac
-        self.out.wCO2A[t] = self.wCO2A * fac
-
-        self.out.u[t] = self.u
-        self.out.du[t] = self.du
-        self.out.uw[t] = self.uw
-
-        self.out.v[t] = self.v
-        self.out.dv[t] = self.dv
-        self.out.vw[t] = self.vw
-
-        self.out.T2m[t] = self.T2m
-        self.out.q2m[t] = self.q2m
-        self.out.u2m[t] = self.u2m
-        self.out.v2m[t] = self.v2m
-        self.out.e2m[t] = self.e2m
-        self.out.esat2m[t] = self.esat2m
-
-        self.out.thetasurf[t] = self.thetasurf
-        self.out.thetavsurf[t] = self.thetavsurf
-        self.out.qsurf[t] = self.qsurf
-        self.out.ustar[t] = self.ustar
-        self.out.Cm[t] = self.Cm
-        self.out.Cs[t] = self.Cs
-        self.out.L[t] = self.L
-        self.out.Rib[t] = self.Rib
-
-        self.out.Swin[t] = self.Swin
-        self.out.Swout[t] = self.Swout
-        self.out.Lwin[t] = self.Lwin
-        self.out.Lwout[t] = self.Lwout
-        self.out.Q[t] = self.Q
-
-        self.out.ra[t] = self.ra
-        self.out.rs[t] = self.rs
-        self.out.H[t] = self.H
-        self.out.LE[t] = self.LE
-        self.out.LEliq[t] = self.LEliq
-        self.out.LEveg[t] = self.LEveg
-        self.out.LEsoil[t] = self.LEsoil
-        self.out.LEpot[t] = self.LEpot
-        self.out.LEref[t] = self.LEref
-        self.out.G[t] = self.G
-
-        self.out.zlcl[t] = self.lcl
-        self.out.RH_h[t] = self.RH_h
-
-        self.out.ac[t] = self.ac
-        self.out.M[t] = self.M
-        self.out.dz[t] = self.dz_h
-
-    # delete class variables to facilitate analysis in ipython
+        for j, (name, co2) in enumerate(self.output_attributes):
+            # variables of components that are switched off are None, and stored as NaN
+            value = getattr(self, name)
+            row[j] = value * fac if co2 and value is not None else value
+        return row
+
+    # delete the model state to facilitate analysis in ipython; see classmodel.state
     def exitmodel(self):
-        del self.Lv
-        del self.cp
-        del self.rho
-        del self.k
-        del self.g
-        del self.Rd
-        del self.Rv
-        del self.bolz
-        del self.S0
-        del self.rhow
-
-        del self.t
-        del self.dt
-        del self.tsteps
-
-        del self.h
-        del self.Ps
-        del self.fc
-        del self.ws
-        del self.we
-
-        del self.theta
-        del self.dtheta
-        del self.gammatheta
-        del self.advtheta
-        del self.beta
-        del self.wtheta
-
-        del self.T2m
-        del self.q2m
-        del self.e2m
-        del self.esat2m
-        del self.u2m
-        del self.v2m
-
-        del self.thetasurf
-        del self.qsatsurf
-        del self.thetav
-        del self.dthetav
-        del self.thetavsurf
-        del self.qsurf
-        del self.wthetav
-
-        del self.q
-        del self.qsat
-        del self.dqsatdT
-        del self.e
-        del self.esat
-        del self.dq
-        del self.gammaq
-        del self.advq
-        del self.wq
-
-        del self.u
-        del self.du
-        del self.gammau
-        del self.advu
-
-        del self.v
-        del self.dv
-        del self.gammav
-        del self.advv
-
-        del self.htend
-        del self.thetatend
-        del self.dthetatend
-        del self.qtend
-        del self.dqtend
-        del self.utend
-        del self.dutend
-        del self.vtend
-        del self.dvtend
-
-        del self.Tsoiltend
-        del self.wgtend
-        del self.Wltend
-
-        del self.ustar
-        del self.uw
-        del self.vw
-        del self.z0m
-        del self.z0h
-        del self.Cm
-        del self.Cs
-        del self.L
-        del self.Rib
-        del self.ra
-
-        del self.lat
-        del self.lon
-        del self.doy
-        del self.tstart
-
-        del self.Swin
-        del self.Swout
-        del self.Lwin
-        del self.Lwout
-        del self.cc
-
-        del self.wg
-        del self.w2
-        del self.cveg
-        del self.cliq
-        del self.Tsoil
-        del self.T2
-        del self.a
-        del self.b
-        del self.p
-        del self.CGsat
-
-        del self.wsat
-        del self.wfc
-        del self.wwilt
-
-        del self.C1sat
-        del self.C2ref
-
-        del self.LAI
-        del self.rs
-        del self.rssoil
-        del self.rsmin
-        del self.rssoilmin
-        del self.alpha
-        del self.gD
-
-        del self.Ts
-
-        del self.Wmax
-        del self.Wl
-
-        del self.Lambda
-
-        del self.Q
-        del self.H
-        del self.LE
-        del self.LEliq
-        del self.LEveg
-        del self.LEsoil
-        del self.LEpot
-        del self.LEref
-        del self.G
-
-        del self.sw_ls
-        del self.sw_rad
-        del self.sw_sl
-        del self.sw_wind
-        del self.sw_shearwe
+        for name in TRANSIENT:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
@@ -1,112 +1,150 @@
+"""Output variables of the model and the buffer that holds them."""
+
 import numpy as np
-import pandas as pd
+
+# names of all output variables, in the order of the rows of the output buffer
+VARIABLES = (
+    "t",  # time [s]
+    # mixed-layer variables
+    "h",  # ABL height [m]
+    "theta",  # initial mixed-layer potential temperature [K]
+    "thetav",  # initial mixed-layer virtual potential temperature [K]
+    "dtheta",  # initial potential temperature jump at h [K]
+    "dthetav",  # initial virtual potential temperature jump at h [K]
+    "wtheta",  # surface kinematic heat flux [K m s-1]
+    "wthetav",  # surface kinematic virtual heat flux [K m s-1]
+    "wthetae",  # entrainment kinematic heat flux [K m s-1]
+    "wthetave",  # entrainment kinematic virtual heat flux [K m s-1]
+    "q",  # mixed-layer specific humidity [kg kg-1]
+    "dq",  # initial specific humidity jump at h [kg kg-1]
+    "wq",  # surface kinematic moisture flux [kg kg-1 m s-1]
+    "wqe",  # entrainment kinematic moisture flux [kg kg-1 m s-1]
+    "wqM",  # cumulus mass-flux kinematic moisture flux [kg kg-1 m s-1]
+    "qsat",  # mixed-layer saturated specific humidity [kg kg-1]
+    "e",  # mixed-layer vapor pressure [Pa]
+    "esat",  # mixed-layer saturated vapor pressure [Pa]
+    "CO2",  # mixed-layer CO2 [ppm]
+    "dCO2",  # initial CO2 jump at h [ppm]
+    "wCO2",  # surface total CO2 flux [mgC m-2 s-1]
+    "wCO2A",  # surface assimilation CO2 flux [mgC m-2 s-1]
+    "wCO2R",  # surface respiration CO2 flux [mgC m-2 s-1]
+    "wCO2e",  # entrainment CO2 flux [mgC m-2 s-1]
+    "wCO2M",  # CO2 mass flux [mgC m-2 s-1]
+    "u",  # initial mixed-layer u-wind speed [m s-1]
+    "du",  # initial u-wind jump at h [m s-1]
+    "uw",  # surface momentum flux u [m2 s-2]
+    "v",  # initial mixed-layer u-wind speed [m s-1]
+    "dv",  # initial u-wind jump at h [m s-1]
+    "vw",  # surface momentum flux v [m2 s-2]
+    # diagnostic meteorological variables
+    "T2m",  # 2m temperature [K]
+    "q2m",  # 2m specific humidity [kg kg-1]
+    "u2m",  # 2m u-wind [m s-1]
+    "v2m",  # 2m v-wind [m s-1]
+    "e2m",  # 2m vapor pressure [Pa]
+    "esat2m",  # 2m saturated vapor pressure [Pa]
+    # surface-layer variables
+    "thetasurf",  # surface potential temperature [K]
+    "thetavsurf",  # surface virtual potential temperature [K]
+    "qsurf",  # surface specific humidity [kg kg-1]
+    "ustar",  # surface friction velocity [m s-1]
+    "z0m",  # roughness length for momentum [m]
+    "z0h",  # roughness length for scalars [m]
+    "Cm",  # drag coefficient for momentum []
+    "Cs",  # drag coefficient for scalars []
+    "L",  # Obukhov length [m]
+    "Rib",  # bulk Richardson number [-]
+    "ribtol_it",  # iterations of the Obukhov length solver [-]
+    "ribtol_res",  # residual of the Obukhov length solver [-]
+    # radiation variables
+    "Swin",  # incoming short wave radiation [W m-2]
+    "Swout",  # outgoing short wave radiation [W m-2]
+    "Lwin",  # incoming long wave radiation [W m-2]
+    "Lwout",  # outgoing long wave radiation [W m-2]
+    "Q",  # net radiation [W m-2]
+    # land surface variables
+    "ra",  # aerodynamic resistance [s m-1]
+    "rs",  # surface resistance [s m-1]
+    "H",  # sensible heat flux [W m-2]
+    "LE",  # evapotranspiration [W m-2]
+    "LEliq",  # open water evaporation [W m-2]
+    "LEveg",  # transpiration [W m-2]
+    "LEsoil",  # soil evaporation [W m-2]
+    "LEpot",  # potential evaporation [W m-2]
+    "LEref",  # reference evaporation at rs = rsmin / LAI [W m-2]
+    "G",  # ground heat flux [W m-2]
+    # Mixed-layer top variables
+    "zlcl",  # lifting condensation level [m]
+    "RH_h",  # mixed-layer top relative humidity [-]
+    # cumulus variables
+    "ac",  # cloud core fraction [-]
+    "M",  # cloud core mass flux [m s-1]
+    "dz",  # transition layer thickness [m]
+)
 
 
 # class for storing mixed-layer model output data
 class ModelOutput:
-    def __init__(self, tsteps):
-        self.t = np.zeros(tsteps)  # time [s]
-
-        # mixed-layer variables
-        self.h = np.zeros(tsteps)  # ABL height [m]
-
-        self.theta = np.zeros(tsteps)  # initial mixed-layer potential temperature [K]
-        self.thetav = np.zeros(
-            tsteps
-        )  # initial mixed-layer virtual potential temperature [K]
-        self.dtheta = np.zeros(tsteps)  # initial potential temperature jump at h [K]
-        self.dthetav = np.zeros(
-            tsteps
-        )  # initial virtual potential temperature jump at h [K]
-        self.wtheta = np.zeros(tsteps)  # surface kinematic heat flux [K m s-1]
-        self.wthetav = np.zeros(tsteps)  # surface kinematic virtual heat flux [K m s-1]
-        self.wthetae = np.zeros(tsteps)  # entrainment kinematic heat flux [K m s-1]
-        self.wthetave = np.zeros(
-            tsteps
-        )  # entrainment kinematic virtual heat flux [K m s-1]
-
-        self.q = np.zeros(tsteps)  # mixed-layer specific humidity [kg kg-1]
-        self.dq = np.zeros(tsteps)  # initial specific humidity jump at h [kg kg-1]
-        self.wq = np.zeros(tsteps)  # surface kinematic moisture flux [kg kg-1 m s-1]
-        self.wqe = np.zeros(
-            tsteps
-        )  # entrainment kinematic moisture flux [kg kg-1 m s-1]
-        self.wqM = np.zeros(
-            tsteps
-        )  # cumulus mass-flux kinematic moisture flux [kg kg-1 m s-1]
-
-        self.qsat = np.zeros(
-            tsteps
-        )  # mixed-layer saturated specific humidity [kg kg-1]
-        self.e = np.zeros(tsteps)  # mixed-layer vapor pressure [Pa]
-        self.esat = np.zeros(tsteps)  # mixed-layer saturated vapor pressure [Pa]
-
-        self.CO2 = np.zeros(tsteps)  # mixed-layer CO2 [ppm]
-        self.dCO2 = np.zeros(tsteps)  # initial CO2 jump at h [ppm]
-        self.wCO2 = np.zeros(tsteps)  # surface total CO2 flux [mgC m-2 s-1]
-        self.wCO2A = np.zeros(tsteps)  # surface assimilation CO2 flux [mgC m-2 s-1]
-        self.wCO2R = np.zeros(tsteps)  # surface respiration CO2 flux [mgC m-2 s-1]
-        self.wCO2e = np.zeros(tsteps)  # entrainment CO2 flux [mgC m-2 s-1]
-        self.wCO2M = np.zeros(tsteps)  # CO2 mass flux [mgC m-2 s-1]
-
-        self.u = np.zeros(tsteps)  # initial mixed-layer u-wind speed [m s-1]
-        self.du = np.zeros(tsteps)  # initial u-wind jump at h [m s-1]
-        self.uw = np.zeros(tsteps)  # surface momentum flux u [m2 s-2]
-
-        self.v = np.zeros(tsteps)  # initial mixed-layer u-wind speed [m s-1]
-        self.dv = np.zeros(tsteps)  # initial u-wind jump at h [m s-1]
-        self.vw = np.zeros(tsteps)  # surface momentum flux v [m2 s-2]
-
-        # diagnostic meteorological variables
-        self.T2m = np.zeros(tsteps)  # 2m temperature [K]
-        self.q2m = np.zeros(tsteps)  # 2m specific humidity [kg kg-1]
-        self.u2m = np.zeros(tsteps)  # 2m u-wind [m s-1]
-        self.v2m = np.zeros(tsteps)  # 2m v-wind [m s-1]
-        self.e2m = np.zeros(tsteps)  # 2m vapor pressure [Pa]
-        self.esat2m = np.zeros(tsteps)  # 2m saturated vapor pressure [Pa]
-
-        # surface-layer variables
-        self.thetasurf = np.zeros(tsteps)  # surface potential temperature [K]
-        self.thetavsurf = np.zeros(tsteps)  # surface virtual potential temperature [K]
-        self.qsurf = np.zeros(tsteps)  # surface specific humidity [kg kg-1]
-        self.ustar = np.zeros(tsteps)  # surface friction velocity [m s-1]
-        self.z0m = np.zeros(tsteps)  # roughness length for momentum [m]
-        self.z0h = np.zeros(tsteps)  # roughness length for scalars [m]
-        self.Cm = np.zeros(tsteps)  # drag coefficient for momentum []
-        self.Cs = np.zeros(tsteps)  # drag coefficient for scalars []
-        self.L = np.zeros(tsteps)  # Obukhov length [m]
-        self.Rib = np.zeros(tsteps)  # bulk Richardson number [-]
-
-        # radiation variables
-        self.Swin = np.zeros(tsteps)  # incoming short wave radiation [W m-2]
-        self.Swout = np.zeros(tsteps)  # outgoing short wave radiation [W m-2]
-        self.Lwin = np.zeros(tsteps)  # incoming long wave radiation [W m-2]
-        self.Lwout = np.zeros(tsteps)  # outgoing long wave radiation [W m-2]
-        self.Q = np.zeros(tsteps)  # net radiation [W m-2]
-
-        # land surface variables
-        self.ra = np.zeros(tsteps)  # aerodynamic resistance [s m-1]
-        self.rs = np.zeros(tsteps)  # surface resistance [s m-1]
-        self.H = np.zeros(tsteps)  # sensible heat flux [W m-2]
-        self.LE = np.zeros(tsteps)  # evapotranspiration [W m-2]
-        self.LEliq = np.zeros(tsteps)  # open water evaporation [W m-2]
-        self.LEveg = np.zeros(tsteps)  # transpiration [W m-2]
-        self.LEsoil = np.zeros(tsteps)  # soil evaporation [W m-2]
-        self.LEpot = np.zeros(tsteps)  # potential evaporation [W m-2]
-        self.LEref = np.zeros(
-            tsteps
-        )  # reference evaporation at rs = rsmin / LAI [W m-2]
-        self.G = np.zeros(tsteps)  # ground heat flux [W m-2]
-
-        # Mixed-layer top variables
-        self.zlcl = np.zeros(tsteps)  # lifting condensation level [m]
-        self.RH_h = np.zeros(tsteps)  # mixed-layer top relative humidity [-]
-
-        # cumulus variables
-        self.ac = np.zeros(tsteps)  # cloud core fraction [-]
-        self.M = np.zeros(tsteps)  # cloud core mass flux [m s-1]
-        self.dz = np.zeros(tsteps)  # transition layer thickness [m]
+    """Output of a model run, stored in a single buffer with one row per variable.
+
+    The buffer ``data`` has shape (variables, tsteps), or (variables, tsteps, members) for
+    ensemble output; every stored variable is an attribute that views its row. ``variables``
+    holds the names of the stored variables (a subset of ``VARIABLES``) in the order of the rows.
+    """
+
+    def __init__(self, tsteps, nmembers=None, variables=VARIABLES):
+        """Allocate zeroed output of ``tsteps`` time steps; ensemble output holds a column per member."""
+        shape = (len(variables), tsteps) if nmembers is None else (len(variables), tsteps, nmembers)
+        self._set_data(np.zeros(shape), variables)
+
+    def _set_data(self, data, variables):
+        self.variables = tuple(variables)
+        self.data = data
+        for name, row in zip(self.variables, data, strict=True):
+            setattr(self, name, row)
+
+    @classmethod
+    def from_buffer(cls, data, variables=VARIABLES):
+        """Return output that views an existing buffer of shape (variables, tsteps[, members])."""
+        out = cls.__new__(cls)
+        out._set_data(data, variables)
+        return out
+
+    def __getstate__(self):
+        """Return the buffer and the variable names; the views are restored from the buffer."""
+        return {"data": self.data, "variables": self.variables}
+
+    def __setstate__(self, state):
+        """Restore the output and the views on its buffer."""
+        self._set_data(state["data"], state["variables"])
+
+    def __len__(self):
+        """Return the number of time steps."""
+        return self.data.shape[1]
+
+    def member(self, i):
+        """Return a view on the output of ensemble member ``i``."""
+        return ModelOutput.from_buffer(self.data[:, :, i], self.variables)
+
+    def view(self, start=None, stop=None):
+        """Return a view on the output of time steps ``start`` to ``stop``."""
+        return ModelOutput.from_buffer(self.data[:, start:stop], self.variables)
+
+    def to_dict(self):
+        """Return a dict that maps the names of the stored variables to their rows."""
+        return {name: getattr(self, name) for name in self.variables}
+
+    def to_numpy(self):
+        """Return a view of shape (tsteps, variables), with the columns in the order of ``variables``."""
+        return self.data.T
 
     def to_pandas(self):
-        df = pd.DataFrame(self.__dict__)
+        """Return a DataFrame with a column per variable.
+
+        pandas is imported here, so that importing the model does not load it.
+        """
+        import pandas as pd
+
+        # the buffer already has the column-major layout of a pandas block, so no copy is made
+        df = pd.DataFrame(self.data.T, columns=list(self.variables), copy=False)
         return df
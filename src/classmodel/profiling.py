@@ -0,0 +1,146 @@
+"""Timing of the model components.
+
+A :class:`Profiler` measures the wall time and the number of calls of the components of a
+model run, and the iterations of the LCL and Obukhov length solvers. It is attached to a single
+model with :meth:`classmodel.model.Model.profile`, which replaces the profiled methods of that
+model instance by timed wrappers; the model class itself is not changed, so a model without a
+profiler runs without any overhead::
+
+    with model.profile() as profiler:
+        model.run()
+    print(profiler.summary())
+"""
+
+import json
+import time
+
+import numpy as np
+
+# methods that are timed
+PROFILED = (
+    "statistics",
+    "run_radiation",
+    "run_surface_layer",
+    "ribtol",
+    "ribtol_newton",
+    "run_land_surface",
+    "ags",
+    "jarvis_stewart",
+    "run_cumulus",
+    "run_mixed_layer",
+    "check_events",
+    "store",
+    "integrate",
+    "integrate_land_surface",
+    "integrate_mixed_layer",
+)
+
+# iteration counters that are set by the profiled methods
+ITERATIONS = {"statistics": "lcl_it", "ribtol": "ribtol_it", "ribtol_newton": "ribtol_it"}
+
+
+class Profiler:
+    """Wall time, call counts and solver iterations of the components of a model.
+
+    With ``trace=True`` every call is recorded as well, for :meth:`write_trace`; this takes
+    memory in proportion to the number of calls.
+    """
+
+    def __init__(self, trace=False):
+        """Create a profiler that is not attached to a model yet."""
+        self.trace = trace
+        self.model = None
+        self.calls = dict.fromkeys(PROFILED, 0)
+        self.times = dict.fromkeys(PROFILED, 0.0)
+        self.iterations = dict.fromkeys(ITERATIONS, 0)
+        self.max_iterations = dict.fromkeys(ITERATIONS, 0)
+        self.events = []  # (name, start, duration) of every call if trace is set
+        self.wall_time = 0.0
+
+    def attach(self, model):
+        """Start timing the components of ``model``."""
+        if self.model is not None:
+            raise RuntimeError("the profiler is already attached to a model")
+        self.model = model
+        for name in PROFILED:
+            setattr(model, name, self._wrap(name, getattr(model, name)))
+        self.start = time.perf_counter()
+        return self
+
+    def detach(self):
+        """Stop timing and restore the methods of the model."""
+        if self.model is None:
+            return
+        self.wall_time += time.perf_counter() - self.start
+        for name in PROFILED:
+            del self.model.__dict__[name]
+        self.model = None
+
+    def __enter__(self):
+        """Return the profiler, which is detached at the end of the ``with`` block."""
+        return self
+
+    def __exit__(self, *exc):
+        """Detach the profiler from the model."""
+        self.detach()
+
+    def _wrap(self, name, method):
+        model = self.model
+        counter = ITERATIONS.get(name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            duration = time.perf_counter() - start
+            self.calls[name] += 1
+            self.times[name] += duration
+            if counter is not None:
+                it = getattr(model, counter)
+                self.iterations[name] += int(np.sum(it))
+                self.max_iterations[name] = max(self.max_iterations[name], int(np.max(it)))
+            if self.trace:
+                self.events.append((name, start - self.start, duration))
+            return result
+
+        return timed
+
+    def report(self):
+        """Return the measurements as a dict per method with calls, time [s] and iterations.
+
+        Times of nested methods are included in the time of the methods that call them (for
+        example ``ribtol`` in ``run_surface_layer``). Methods that were not called are left out.
+        """
+        report = {}
+        for name in PROFILED:
+            if self.calls[name] == 0:
+                continue
+            report[name] = {"calls": self.calls[name], "time": self.times[name]}
+            if name in ITERATIONS:
+                report[name]["iterations"] = self.iterations[name]
+                report[name]["max_iterations"] = self.max_iterations[name]
+        return report
+
+    def summary(self):
+        """Return the report as a table, sorted by time."""
+        report = self.report()
+        lines = [f"{'method':<24}{'calls':>10}{'time [s]':>12}{'per call [us]':>16}{'share':>8}{'iterations':>12}"]
+        for name, entry in sorted(report.items(), key=lambda item: -item[1]["time"]):
+            share = entry["time"] / self.wall_time if self.wall_time > 0 else np.nan
+            iterations = entry.get("iterations", "")
+            lines.append(
+                f"{name:<24}{entry['calls']:>10}{entry['time']:>12.4f}{1e6 * entry['time'] / entry['calls']:>16.2f}"
+                f"{share:>8.1%}{iterations:>12}"
+            )
+        lines.append(f"{'total':<24}{'':>10}{self.wall_time:>12.4f}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Write the recorded calls as a Chrome trace (JSON), to be viewed in a trace viewer."""
+        if not self.trace:
+            raise RuntimeError("calls are only recorded by a profiler with trace=True")
+        events = [
+            {"name": name, "ph": "X", "ts": 1e6 * start, "dur": 1e6 * duration, "pid": 0, "tid": 0}
+            for name, start, duration in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
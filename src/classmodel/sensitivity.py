@@ -0,0 +1,156 @@
+"""Forward-mode sensitivities of the model output to configuration parameters.
+
+:func:`sensitivities` runs the model once with :class:`classmodel.dual.Dual` numbers for a
+selection of numeric fields of the configuration, and returns the output together with its
+derivatives to these fields::
+
+    out, jacobian = sensitivities(config, ["beta", "rsmin"])
+    jacobian["beta"].h  # dh/dbeta at every output time [m]
+
+The derivatives are those of the discretized model, exact up to round-off, at the cost of one
+run in which every operation also updates a vector of derivatives; this replaces the 2P extra
+runs of central finite differences. Branches of the physics (such as the stability regime of
+the surface layer) are differentiated as the branch that is taken; at a switch between branches
+the output is not differentiable.
+"""
+
+from dataclasses import fields, replace
+
+import numpy as np
+
+from classmodel.dual import Dual, primal
+from classmodel.model import COUPLING_VARIABLES, Model
+from classmodel.output import ModelOutput
+from classmodel.surfacelayer import L_NEUTRAL
+
+# settings that cannot be differentiated: the adaptive step size control, the Newton LCL
+# solver and the surface-layer table work on floats only
+UNSUPPORTED = {
+    "integrator": ("rk45",),
+    "lcl_type": ("newton",),
+    "sw_sltable": (True,),
+    "output_reduction": ("min", "max"),
+}
+
+
+def _stack(values):
+    # 1-D object array of scalars and dual numbers
+    stacked = np.empty(len(values), dtype=object)
+    stacked[:] = values
+    return stacked
+
+
+class TangentLinearModel(Model):
+    """Scalar model that propagates the derivatives to ``parameters`` through the run.
+
+    The output has the layout of ensemble output with 1 + P columns: the values, and the
+    derivatives to every parameter; see :func:`sensitivities`.
+    """
+
+    def __init__(self, model_input, parameters):
+        """Check that ``parameters`` are numeric fields and that their derivatives are available."""
+        super().__init__(model_input)
+        self.parameters = tuple(parameters)
+
+        names = {f.name for f in fields(model_input)}
+        for name in self.parameters:
+            value = getattr(model_input, name, None) if name in names else None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'field "{name}" is not a numeric parameter of the configuration')
+        for name, values in UNSUPPORTED.items():
+            if getattr(model_input, name) in values:
+                raise ValueError(f"sensitivities are not available with {name}={getattr(model_input, name)!r}")
+
+    def init(self):
+        """Initialize the model from a configuration in which the parameters are dual numbers."""
+        model_input = self.input
+        n = len(self.parameters)
+        duals = {name: Dual.variable(getattr(model_input, name), i, n) for i, name in enumerate(self.parameters)}
+        self.input = replace(model_input, **duals)
+        try:
+            super().init()
+        finally:
+            self.input = model_input
+
+    # the state vectors of the integrators hold dual numbers
+    def get_state(self):
+        """Return the prognostic variables, dual numbers, as an object array."""
+        return _stack([getattr(self, name) for name, _ in self.state_variables()])
+
+    def get_tendencies(self):
+        """Return the tendencies of the prognostic variables as an object array."""
+        return _stack([getattr(self, tend) for _, tend in self.state_variables()])
+
+    def get_coupling(self):
+        """Return the coupling variables as an object array."""
+        return _stack([getattr(self, name) for name in COUPLING_VARIABLES])
+
+    # the Obukhov length is iterated on the values, and differentiated at the solution
+    def ribtol(self, Rib, zsl, z0m, z0h):  # noqa: N803
+        """Solve the Obukhov length with the 'fd' method on the values and differentiate the solution."""
+        L = super().ribtol(primal(Rib), primal(zsl), primal(z0m), primal(z0h))
+        return self.obukhov_derivatives(L, Rib, zsl, z0m, z0h)
+
+    def ribtol_newton(self, Rib, zsl, z0m, z0h, L):  # noqa: N803
+        """Solve the Obukhov length with the Newton method on the values and differentiate the solution."""
+        L = super().ribtol_newton(primal(Rib), primal(zsl), primal(z0m), primal(z0h), primal(L))
+        return self.obukhov_derivatives(L, Rib, zsl, z0m, z0h)
+
+    def obukhov_derivatives(self, L, Rib, zsl, z0m, z0h):  # noqa: N803
+        """Return ``L`` with the implicit derivatives of the root of fx = Rib - zeta * Fh / Fm**2.
+
+        These are dL/dp = -(dfx/dp) / (dfx/dL); a neutral surface layer has no derivatives.
+        """
+        zeta = zsl / L
+        zetam = z0m / L
+        zetah = z0h / L
+        Fm = np.log(zsl / z0m) - self.psim(zeta) + self.psim(zetam)
+        Fh = np.log(zsl / z0h) - self.psih(zeta) + self.psih(zetah)
+        fx = Rib - zeta * Fh / Fm**2.0
+        if not isinstance(fx, Dual) or abs(L) > L_NEUTRAL:
+            return L
+
+        dFm = (zeta * self.dpsim(zeta) - zetam * self.dpsim(zetam)) / L
+        dFh = (zeta * self.dpsih(zeta) - zetah * self.dpsih(zetah)) / L
+        fxdif = zeta * Fh / (L * Fm**2.0) - zeta * (dFh - 2.0 * Fh * dFm / Fm) / Fm**2.0
+        return Dual(L, -fx.eps / primal(fxdif))
+
+    def new_output(self, tsteps):
+        """Allocate output with a column for the values and one per parameter."""
+        return ModelOutput(-(-tsteps // self.nstore), 1 + len(self.parameters), self.output_variables)
+
+    def output_row(self, row):
+        """Fill ``row`` with the values and the derivatives of the output variables."""
+        fac = (self.rho * self.mco2) / self.mair
+        for j, (name, co2) in enumerate(self.output_attributes):
+            value = getattr(self, name)
+            if co2 and value is not None:
+                value = value * fac
+            if isinstance(value, Dual):
+                row[j, 0] = value.value
+                row[j, 1:] = value.eps
+            else:
+                # constants have no derivatives; variables of components that are switched off are NaN
+                row[j, 0] = value
+                row[j, 1:] = 0.0 if value is not None else np.nan
+        return row
+
+
+def sensitivities(config, parameters):
+    """Run the model and return its output and the derivatives of the output to ``parameters``.
+
+    ``parameters`` are names of numeric fields of ``config``. Returns a :class:`ModelOutput`
+    and a dict that maps every parameter to a :class:`ModelOutput` with the derivatives of all
+    output variables to that parameter (the derivative of the time is zero).
+    """
+    model = TangentLinearModel(config, parameters)
+    model.run()
+
+    data = model.out.data
+    data[0, :, 1:] = 0.0
+    out = ModelOutput.from_buffer(np.ascontiguousarray(data[:, :, 0]), model.out.variables)
+    jacobian = {
+        name: ModelOutput.from_buffer(np.ascontiguousarray(data[:, :, i + 1]), model.out.variables)
+        for i, name in enumerate(model.parameters)
+    }
+    return out, jacobian
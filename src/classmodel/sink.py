@@ -0,0 +1,240 @@
+"""On-disk output of large ensembles and sweeps.
+
+A sink holds the output of ``nmembers`` runs of ``tsteps`` output rows in a directory, laid out
+as (member, time, variable). Model output is written in chunks of rows with ``write`` (see
+:meth:`classmodel.model.Model.run_to_sink`); the variables follow the variable list of
+:class:`classmodel.output.ModelOutput`. Two formats are available:
+
+- ``MemmapSink`` stores one memory-mapped array of shape (members, tsteps, variables).
+- ``ColumnarSink`` stores one file per variable and block of members, optionally compressed.
+
+Use :func:`open_output` to read either format back, sliced by member and variable.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from classmodel.output import VARIABLES, ModelOutput
+
+SCHEMA = "schema.json"
+
+
+def _member_data(out):
+    # output rows as an array of shape (members, tsteps, variables); a single run is one member
+    return out.data.reshape(out.data.shape[:2] + (-1,)).transpose(2, 1, 0)
+
+
+class _Sink:
+    def __init__(self, path, nmembers, tsteps, variables, **options):
+        """Create the directory ``path`` and write the schema, which includes ``options``."""
+        self.path = path
+        self.nmembers = int(nmembers)
+        self.tsteps = int(tsteps)
+        self.variables = tuple(variables)
+        unknown = [name for name in self.variables if name not in VARIABLES]
+        if unknown:
+            raise ValueError(f"unknown output variables: {', '.join(unknown)}")
+
+        os.makedirs(path, exist_ok=True)
+        schema = {
+            "format": self.format,
+            "nmembers": self.nmembers,
+            "tsteps": self.tsteps,
+            "variables": list(self.variables),
+            **options,
+        }
+        with open(os.path.join(path, SCHEMA), "w") as f:
+            json.dump(schema, f, indent=2)
+
+    def write(self, out, member=0, start=0):
+        """Write ``out`` at the given first member and first output row.
+
+        ``out`` is a :class:`ModelOutput` of a single run or of an ensemble, whose members
+        are written to consecutive members of the sink.
+        """
+        if out.variables != self.variables:
+            raise ValueError("the output variables do not match the variables of the sink")
+        data = _member_data(out)
+        nmembers, tsteps, _ = data.shape
+        if member < 0 or member + nmembers > self.nmembers or start < 0 or start + tsteps > self.tsteps:
+            raise IndexError(
+                f"members {member}:{member + nmembers} and rows {start}:{start + tsteps} are outside "
+                f"the sink of {self.nmembers} members and {self.tsteps} rows"
+            )
+        self._write(data, member, start)
+
+    def __enter__(self):
+        """Return the sink, which is closed at the end of the ``with`` block."""
+        return self
+
+    def __exit__(self, *exc):
+        """Close the sink."""
+        self.close()
+
+
+class MemmapSink(_Sink):
+    """Sink that stores all output in one memory-mapped array of shape (members, tsteps, variables)."""
+
+    format = "memmap"
+
+    def __init__(self, path, nmembers, tsteps, variables=VARIABLES):
+        """Create the sink and its array file."""
+        super().__init__(path, nmembers, tsteps, variables)
+        self.array = np.lib.format.open_memmap(
+            os.path.join(path, "data.npy"), mode="w+", shape=(self.nmembers, self.tsteps, len(self.variables))
+        )
+
+    def _write(self, data, member, start):
+        self.array[member : member + data.shape[0], start : start + data.shape[1]] = data
+
+    def close(self):
+        """Flush the array to disk."""
+        self.array.flush()
+
+
+class ColumnarSink(_Sink):
+    """Sink that stores every variable in a separate file per block of ``block`` members.
+
+    Each file holds an array of shape (members, tsteps); with ``compress=True`` the files are
+    compressed. A block is kept in memory until all its rows are written, so the memory use
+    is bounded by the blocks that are being filled. Rows may be written more than once until
+    their block is complete; a complete block is written to disk and cannot be written again.
+    """
+
+    format = "columnar"
+
+    def __init__(self, path, nmembers, tsteps, variables=VARIABLES, *, block=64, compress=False):  # noqa: PLR0913
+        """Create the sink and a directory per variable."""
+        super().__init__(path, nmembers, tsteps, variables, block=int(block), compress=bool(compress))
+        self.block = int(block)
+        self.compress = bool(compress)
+        for name in self.variables:
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+        # blocks that are being filled, with a mask of the rows that have been written, and the
+        # blocks that have been written to disk
+        self.buffers = {}
+        self.written = {}
+        self.flushed = set()
+
+    def _block_size(self, b):
+        return min(self.block, self.nmembers - b * self.block)
+
+    def _write(self, data, member, start):
+        stop = member + data.shape[0]
+        for b in range(member // self.block, (stop - 1) // self.block + 1):
+            if b in self.flushed:
+                raise ValueError(f"members {b * self.block}:{(b + 1) * self.block} have already been written to disk")
+            if b not in self.buffers:
+                self.buffers[b] = np.zeros((self._block_size(b), self.tsteps, len(self.variables)))
+                self.written[b] = np.zeros((self._block_size(b), self.tsteps), dtype=bool)
+
+            lo = max(member, b * self.block)
+            hi = min(stop, (b + 1) * self.block)
+            rows = (slice(lo - b * self.block, hi - b * self.block), slice(start, start + data.shape[1]))
+            self.buffers[b][rows] = data[lo - member : hi - member]
+            self.written[b][rows] = True
+
+            if self.written[b].all():
+                self._flush(b)
+
+    def _flush(self, b):
+        buffer = self.buffers.pop(b)
+        del self.written[b]
+        self.flushed.add(b)
+        for i, name in enumerate(self.variables):
+            column = np.ascontiguousarray(buffer[:, :, i])
+            if self.compress:
+                np.savez_compressed(os.path.join(self.path, name, f"{b:06d}.npz"), data=column)
+            else:
+                np.save(os.path.join(self.path, name, f"{b:06d}.npy"), column)
+
+    def close(self):
+        """Write the blocks that are not complete."""
+        for b in list(self.buffers):
+            self._flush(b)
+
+
+class _Reader:
+    def __init__(self, path, schema):
+        """Open the output in ``path``, described by ``schema``."""
+        self.path = path
+        self.nmembers = schema["nmembers"]
+        self.tsteps = schema["tsteps"]
+        self.variables = tuple(schema["variables"])
+
+    def _indices(self, variables, members):
+        if variables is None:
+            variables = self.variables
+        elif isinstance(variables, str):
+            variables = (variables,)
+        columns = [self.variables.index(name) for name in variables]
+        members = np.arange(self.nmembers)[members if members is not None else slice(None)]
+        return tuple(variables), columns, np.atleast_1d(members)
+
+    def member(self, i):
+        """Return the output of member ``i`` as a :class:`ModelOutput`."""
+        return ModelOutput.from_buffer(self.read(members=[i])[0].T, self.variables)
+
+    def variable(self, name, members=None):
+        """Return variable ``name`` as an array of shape (members, tsteps)."""
+        return self.read(name, members)[..., 0]
+
+
+class MemmapReader(_Reader):
+    """Reader of the output of a :class:`MemmapSink`."""
+
+    def __init__(self, path, schema):
+        """Open the array file as a memory map."""
+        super().__init__(path, schema)
+        self.array = np.load(os.path.join(path, "data.npy"), mmap_mode="r")
+
+    def read(self, variables=None, members=None):
+        """Read the given variables of the given members as an array of shape (members, tsteps, variables).
+
+        Only the selected elements are copied from the file.
+        """
+        _, columns, members = self._indices(variables, members)
+        return self.array[np.ix_(members, np.arange(self.tsteps), columns)]
+
+
+class ColumnarReader(_Reader):
+    """Reader of the output of a :class:`ColumnarSink`."""
+
+    def __init__(self, path, schema):
+        """Open the output; the files are read when they are needed."""
+        super().__init__(path, schema)
+        self.block = schema["block"]
+        self.compress = schema["compress"]
+
+    def _load(self, name, b):
+        if self.compress:
+            with np.load(os.path.join(self.path, name, f"{b:06d}.npz")) as data:
+                return data["data"]
+        return np.load(os.path.join(self.path, name, f"{b:06d}.npy"), mmap_mode="r")
+
+    def read(self, variables=None, members=None):
+        """Read the given variables of the given members as an array of shape (members, tsteps, variables).
+
+        Only the files of the requested variables and member blocks are read.
+        """
+        variables, _, members = self._indices(variables, members)
+        result = np.empty((len(members), self.tsteps, len(variables)))
+        blocks = members // self.block
+        for b in np.unique(blocks):
+            mask = blocks == b
+            for i, name in enumerate(variables):
+                result[mask, :, i] = self._load(name, b)[members[mask] - b * self.block]
+        return result
+
+
+def open_output(path):
+    """Open the output written by a sink for reading."""
+    with open(os.path.join(path, SCHEMA)) as f:
+        schema = json.load(f)
+    readers = {"memmap": MemmapReader, "columnar": ColumnarReader}
+    if schema["format"] not in readers:
+        raise ValueError(f'unknown output format "{schema["format"]}"')
+    return readers[schema["format"]](path, schema)
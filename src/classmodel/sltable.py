@@ -0,0 +1,179 @@
+"""Tabulated surface-layer drag coefficients.
+
+The drag coefficients ``Cm`` and ``Cs`` and the stability parameter ``zsl / L`` only depend on
+the bulk Richardson number and the roughness ratios ``zsl / z0m`` and ``z0m / z0h``. This module
+computes them once on a grid over these three dimensions, so that the surface layer can
+interpolate instead of solving for the Obukhov length every time step.
+"""
+
+import math
+import os
+
+import numpy as np
+
+from classmodel.surfacelayer import psih, psim, ribtol_newton
+
+# table ranges for Rib, ln(zsl / z0m) and ln(z0m / z0h); outside these the exact solver is used
+RIB_RANGE = (-5.0, 0.2)
+LNZM_RANGE = (2.0, 15.0)
+LNMH_RANGE = (0.0, 10.0)
+
+# the Rib axis is uniform in asinh(Rib / RIB_SCALE), which refines the grid around neutral
+RIB_SCALE = 0.05
+
+K = 0.4  # Von Karman constant [-]
+
+# tables built in this process, by shape
+_TABLES = {}
+
+
+def exact(Rib, lnzm, lnmh):  # noqa: N803
+    """Solve zeta / Rib, ln(Cm) and ln(Cs) with the iterative surface-layer solution."""
+    Rib = np.where(Rib == 0.0, 1e-9, Rib)
+    z0m = np.exp(-lnzm)
+    z0h = np.exp(-lnzm - lnmh)
+    L, _, _ = ribtol_newton(Rib, 1.0, z0m, z0h, tol=1e-12, itmax=200)
+    zeta = 1.0 / L
+    Fm = lnzm - psim(zeta) + psim(zeta * z0m)
+    Fh = lnzm + lnmh - psih(zeta) + psih(zeta * z0h)
+    return np.stack([zeta / Rib, np.log(K**2.0 / Fm**2.0), np.log(K**2.0 / (Fm * Fh))], axis=-1)
+
+
+class SurfaceLayerTable:
+    """Grid of zeta / Rib, ln(Cm) and ln(Cs) with trilinear interpolation."""
+
+    def __init__(self, shape, values=None):
+        """Create the table; its values are computed with :func:`exact` unless given."""
+        self.shape = tuple(shape)
+        self.u0 = math.asinh(RIB_RANGE[0] / RIB_SCALE)
+        self.du = (math.asinh(RIB_RANGE[1] / RIB_SCALE) - self.u0) / (self.shape[0] - 1)
+        self.a0 = LNZM_RANGE[0]
+        self.da = (LNZM_RANGE[1] - LNZM_RANGE[0]) / (self.shape[1] - 1)
+        self.b0 = LNMH_RANGE[0]
+        self.db = (LNMH_RANGE[1] - LNMH_RANGE[0]) / (self.shape[2] - 1)
+        self.max_error = None
+
+        if values is None:
+            values = exact(*self.nodes(np.meshgrid(*[np.arange(n) for n in self.shape], indexing="ij")))
+        self.values = values
+
+    def nodes(self, index):
+        """Return Rib, ln(zsl / z0m) and ln(z0m / z0h) at (fractional) grid indices."""
+        i, j, k = index
+        return RIB_SCALE * np.sinh(self.u0 + i * self.du), self.a0 + j * self.da, self.b0 + k * self.db
+
+    def validate(self):
+        """Return the maximum relative error of Cm and Cs at the centres of the grid cells."""
+        index = np.meshgrid(*[np.arange(n - 1) + 0.5 for n in self.shape], indexing="ij")
+        Rib, lnzm, lnmh = self.nodes(index)
+        expected = exact(Rib, lnzm, lnmh)[..., 1:]
+        _, Cm, Cs, _ = self.interpolate(Rib, 1.0, np.exp(-lnzm), np.exp(-lnzm - lnmh))
+        self.max_error = np.max(np.abs(np.stack([Cm, Cs], axis=-1) / np.exp(expected) - 1.0))
+        return self.max_error
+
+    def lookup(self, Rib, zsl, z0m, z0h):  # noqa: N803
+        """Interpolate L, Cm and Cs for scalar input, or return None outside of the table."""
+        x = (math.asinh(Rib / RIB_SCALE) - self.u0) / self.du
+        y = (math.log(zsl / z0m) - self.a0) / self.da
+        z = (math.log(z0m / z0h) - self.b0) / self.db
+        nx, ny, nz = self.shape
+        if not (0.0 <= x <= nx - 1 and 0.0 <= y <= ny - 1 and 0.0 <= z <= nz - 1):
+            return None
+
+        i = min(int(x), nx - 2)
+        j = min(int(y), ny - 2)
+        k = min(int(z), nz - 2)
+        fx = x - i
+        fy = y - j
+        fz = z - k
+
+        c = self.values[i : i + 2, j : j + 2, k : k + 2]
+        c = c[0] * (1.0 - fx) + c[1] * fx
+        c = c[0] * (1.0 - fy) + c[1] * fy
+        c = c[0] * (1.0 - fz) + c[1] * fz
+
+        zeta = float(c[0]) * Rib
+        L = zsl / zeta if zeta != 0.0 else math.inf
+        return L, math.exp(c[1]), math.exp(c[2])
+
+    def interpolate(self, Rib, zsl, z0m, z0h):  # noqa: N803
+        """Interpolate L, Cm and Cs for arrays; also returns the mask of points inside the table."""
+        Rib, zsl, z0m, z0h = np.broadcast_arrays(Rib, zsl, z0m, z0h)
+        x = (np.arcsinh(Rib / RIB_SCALE) - self.u0) / self.du
+        y = (np.log(zsl / z0m) - self.a0) / self.da
+        z = (np.log(z0m / z0h) - self.b0) / self.db
+        nx, ny, nz = self.shape
+        inside = (x >= 0.0) & (x <= nx - 1) & (y >= 0.0) & (y <= ny - 1) & (z >= 0.0) & (z <= nz - 1)
+
+        x = np.where(inside, x, 0.0)
+        y = np.where(inside, y, 0.0)
+        z = np.where(inside, z, 0.0)
+        i = np.minimum(x.astype(int), nx - 2)
+        j = np.minimum(y.astype(int), ny - 2)
+        k = np.minimum(z.astype(int), nz - 2)
+        fx = (x - i)[..., None]
+        fy = (y - j)[..., None]
+        fz = (z - k)[..., None]
+
+        v = self.values
+        c = (
+            (v[i, j, k] * (1.0 - fx) + v[i + 1, j, k] * fx) * (1.0 - fy)
+            + (v[i, j + 1, k] * (1.0 - fx) + v[i + 1, j + 1, k] * fx) * fy
+        ) * (1.0 - fz) + (
+            (v[i, j, k + 1] * (1.0 - fx) + v[i + 1, j, k + 1] * fx) * (1.0 - fy)
+            + (v[i, j + 1, k + 1] * (1.0 - fx) + v[i + 1, j + 1, k + 1] * fx) * fy
+        ) * fz
+
+        zeta = c[..., 0] * Rib
+        with np.errstate(divide="ignore"):
+            L = np.where(zeta != 0.0, zsl / zeta, np.inf)
+        return L, np.exp(c[..., 1]), np.exp(c[..., 2]), inside
+
+    def save(self, path):
+        """Write the table to ``path``."""
+        with open(path, "wb") as f:
+            np.savez(f, shape=self.shape, values=self.values, max_error=self.max_error)
+
+    @staticmethod
+    def stored_shape(path):
+        """Return the shape of the table in ``path``, without reading its values."""
+        with np.load(path) as data:
+            return tuple(int(n) for n in data["shape"])
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by :meth:`save`."""
+        with np.load(path) as data:
+            table = cls(data["shape"], data["values"])
+            table.max_error = float(data["max_error"])
+        return table
+
+
+def get_table(shape, tol, path=None):
+    """Return the surface-layer table of the given shape.
+
+    The table is built once per process, or loaded from ``path`` if that file exists and holds
+    a table of the same shape (a new table is written to ``path`` otherwise). Raises a
+    ``ValueError`` if the interpolation error of the table exceeds ``tol``.
+    """
+    shape = tuple(int(n) for n in shape)
+    table = _TABLES.get(shape)
+    stored = path is not None and os.path.exists(path) and SurfaceLayerTable.stored_shape(path) == shape
+
+    if table is None and stored:
+        table = SurfaceLayerTable.load(path)
+
+    if table is None:
+        table = SurfaceLayerTable(shape)
+        table.validate()
+    _TABLES[shape] = table
+
+    if path is not None and not stored:
+        table.save(path)
+
+    if table.max_error > tol:
+        raise ValueError(
+            f"surface-layer table of shape {shape} has a relative error of {table.max_error:.2g} "
+            f"in Cm and Cs, which exceeds sltable_tol = {tol:g}; increase sltable_shape"
+        )
+    return table
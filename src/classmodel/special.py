@@ -0,0 +1,79 @@
+"""Special functions."""
+
+import math
+from functools import singledispatch
+
+import numpy as np
+
+EULER = 0.57721566490153286060  # Euler-Mascheroni constant [-]
+
+# E1 is evaluated with its power series for x <= SERIES_MAX and with a continued fraction above
+SERIES_MAX = 2.0
+
+# coefficients (-1)**k / (k * k!) of the power series of E1, k = 1..24; for x <= SERIES_MAX
+# the truncation error is below the double precision round-off
+_SERIES = tuple((-1.0) ** k / (k * math.factorial(k)) for k in range(1, 25))
+
+# depth of the continued fraction of E1 that is evaluated for arrays; converged for x > SERIES_MAX
+_CF_DEPTH = 50
+
+# relative change of the scalar continued fraction at which it is converged
+_CF_TOL = 1.0e-16
+
+
+@singledispatch
+def E1(x):  # noqa: N802
+    """Exponential integral of x > 0: the integral of exp(-t) / t from x to infinity.
+
+    Uses the power series for x <= 2 and a continued fraction for x > 2. Accepts a scalar
+    or an array; arrays are evaluated element-wise. Other types of numbers can register
+    their own implementation with ``E1.register``.
+    """
+    if np.ndim(x) == 0:
+        return e1_scalar(float(x))
+    return _e1_array(np.asarray(x, dtype=float))
+
+
+def e1_scalar(x):
+    """Return the exponential integral of the float x > 0."""
+    if x <= SERIES_MAX:
+        s = 0.0
+        for c in reversed(_SERIES):
+            s = s * x + c
+        return -EULER - math.log(x) - s * x
+
+    # continued fraction, evaluated with the modified Lentz method
+    b = x + 1.0
+    c = 1.0e300
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        a = -float(i * i)
+        b += 2.0
+        d = 1.0 / (a * d + b)
+        c = b + a / c
+        delta = c * d
+        h *= delta
+        if abs(delta - 1.0) < _CF_TOL:
+            break
+    return h * math.exp(-x)
+
+
+def _e1_array(x):
+    small = x <= SERIES_MAX
+
+    # power series
+    xs = np.where(small, x, SERIES_MAX)
+    s = np.zeros_like(xs)
+    for c in reversed(_SERIES):
+        s = s * xs + c
+    series = -EULER - np.log(xs) - s * xs
+
+    # continued fraction, evaluated backward from a fixed depth
+    xl = np.where(small, SERIES_MAX, x)
+    t = np.zeros_like(xl)
+    for i in range(_CF_DEPTH, 0, -1):
+        t = -float(i * i) / (xl + 2.0 * i + 1.0 + t)
+    fraction = np.exp(-xl) / (xl + 1.0 + t)
+
+    return np.where(small, series, fraction)
@@ -0,0 +1,279 @@
+"""Attributes of the model state, by group.
+
+:class:`classmodel.model.Model` declares these attributes as ``__slots__``, so that they are
+stored in the model instance itself instead of in its ``__dict__``. This makes a model smaller
+and the attribute access in the time loop direct. The groups are:
+
+- ``CONSTANTS``: physical constants and the constants of the A-gs scheme.
+- ``PARAMETERS``: switches, settings and parameters that are read from the configuration,
+  and settings of the run that follow from them.
+- ``PROGNOSTIC``: prognostic variables and their tendencies.
+- ``DIAGNOSTIC``: diagnostic variables, recomputed at every time step.
+- ``RUN``: the time step and the state of the time integration.
+- ``RETAINED``: constants, parameters and variables that remain readable after a run, as they
+  did before the state was held in slots.
+- ``RESULTS``: the configuration, events and output, which are kept after a run.
+
+The groups up to ``RUN`` are deleted at the end of a run. Attributes that are not listed (such
+as those of subclasses) are stored in the ``__dict__`` of the model as usual.
+"""
+
+CONSTANTS = (
+    "Lv",
+    "cp",
+    "rho",
+    "k",
+    "g",
+    "Rd",
+    "Rv",
+    "bolz",
+    "rhow",
+    "S0",
+)
+
+PARAMETERS = (
+    # switches
+    "sw_shearwe",
+    "sw_wind",
+    "sw_sl",
+    "sw_rad",
+    "sw_ls",
+    # mixed layer
+    "Ps",
+    "fc",
+    "gammatheta",
+    "advtheta",
+    "beta",
+    "gammaq",
+    "advq",
+    "gammau",
+    "advu",
+    "gammav",
+    "advv",
+    "lcl_type",
+    "lcl_tol",
+    "lcl_itmax",
+    # surface layer
+    "z0m",
+    "z0h",
+    "ribtol_type",
+    "ribtol_tol",
+    "ribtol_itmax",
+    "sl_spinup_tol",
+    "sl_spinup_itmax",
+    "sw_sltable",
+    "sltable",
+    # radiation
+    "lat",
+    "lon",
+    "doy",
+    "tstart",
+    "cc",
+    "solar_dt",
+    "solar_time",
+    "solar_sinlea",
+    "solar_Tr",
+    # time-varying forcing
+    "forcing",
+    # land surface
+    "w2",
+    "T2",
+    "a",
+    "b",
+    "p",
+    "CGsat",
+    "wsat",
+    "wfc",
+    "wwilt",
+    "C1sat",
+    "C2ref",
+    "LAI",
+    "gD",
+    "rsmin",
+    "rssoilmin",
+    "alpha",
+    "cveg",
+    "Wmax",
+    "Lambda",
+    # time integration and output
+    "dt",
+    "tsteps",
+    "integrator",
+    "integrator_rtol",
+    "integrator_atol",
+    "integrator_itmax",
+    "nradiation",
+    "nsurface_layer",
+    "nland_surface",
+    "output_variables",
+    "output_attributes",
+    "output_reduction",
+    "nstore",
+)
+
+PROGNOSTIC = (
+    "h",
+    "theta",
+    "dtheta",
+    "q",
+    "dq",
+    "u",
+    "du",
+    "v",
+    "dv",
+    "Tsoil",
+    "wg",
+    "Wl",
+    "htend",
+    "thetatend",
+    "dthetatend",
+    "qtend",
+    "dqtend",
+    "utend",
+    "dutend",
+    "vtend",
+    "dvtend",
+    "Tsoiltend",
+    "wgtend",
+    "Wltend",
+)
+
+DIAGNOSTIC = (
+    # mixed layer
+    "ws",
+    "we",
+    "thetav",
+    "dthetav",
+    "wtheta",
+    "wthetav",
+    "wq",
+    "qsat",
+    "esat",
+    "e",
+    "lcl_it",
+    # surface layer
+    "T2m",
+    "q2m",
+    "e2m",
+    "esat2m",
+    "u2m",
+    "v2m",
+    "thetasurf",
+    "thetavsurf",
+    "qsurf",
+    "qsatsurf",
+    "dqsatdT",
+    "ustar",
+    "uw",
+    "vw",
+    "Cm",
+    "Cs",
+    "L",
+    "Rib",
+    "ribtol_it",
+    "ribtol_res",
+    # radiation
+    "Swin",
+    "Swout",
+    "Lwin",
+    "Lwout",
+    "Q",
+    # land surface
+    "ra",
+    "rs",
+    "rssoil",
+    "Ts",
+    "cliq",
+    "H",
+    "LE",
+    "LEliq",
+    "LEveg",
+    "LEsoil",
+    "LEpot",
+    "LEref",
+    "G",
+)
+
+RUN = ("t", "time", "tstore", "tnext", "integrator_it", "solver")
+
+RETAINED = (
+    # constants
+    "CO2comp298",
+    "Q10CO2",
+    "gm298",
+    "Ammax298",
+    "Q10gm",
+    "T1gm",
+    "T2gm",
+    "Q10Am",
+    "T1Am",
+    "T2Am",
+    "f0",
+    "ad",
+    "alpha0",
+    "Kx",
+    "gmin",
+    "mco2",
+    "mair",
+    "nuco2q",
+    "Cw",
+    "wmax",
+    "wmin",
+    "R10",
+    "E0",
+    # switches and parameters
+    "sw_ml",
+    "sw_fixft",
+    "ls_type",
+    "sw_cu",
+    "divU",
+    "gammaCO2",
+    "advCO2",
+    "dFz",
+    "c_beta",
+    "c3c4",
+    # prognostic variables
+    "CO2",
+    "dCO2",
+    "dz_h",
+    "CO2tend",
+    "dCO2tend",
+    "dztend",
+    # diagnostic variables
+    "wf",
+    "wstar",
+    "wthetae",
+    "wthetave",
+    "wqe",
+    "wqM",
+    "wCO2",
+    "wCO2A",
+    "wCO2R",
+    "wCO2e",
+    "wCO2M",
+    "P_h",
+    "T_h",
+    "q2_h",
+    "CO22_h",
+    "RH_h",
+    "lcl",
+    "ac",
+    "M",
+)
+
+RESULTS = ("input", "events", "out", "prefix", "stopped", "lcl_failures", "ribtol_failures", "sl_spinup_it")
+
+# attributes that are deleted at the end of a run
+TRANSIENT = CONSTANTS + PARAMETERS + PROGNOSTIC + DIAGNOSTIC + RUN
+
+SLOTS = TRANSIENT + RETAINED + RESULTS
+
+
+def items(model):
+    """Yield the name and value of every attribute of ``model`` that is set."""
+    for name in SLOTS:
+        try:
+            yield name, getattr(model, name)
+        except AttributeError:
+            pass
+    yield from vars(model).items()
@@ -0,0 +1,117 @@
+"""Vectorized surface-layer similarity functions.
+
+Array versions of the stability functions and the Obukhov-length solver of
+:class:`classmodel.model.Model`; the stability branches are evaluated as masks.
+"""
+
+import numpy as np
+
+# Obukhov length beyond which the surface layer is taken as neutral [m]
+L_NEUTRAL = 1e15
+
+
+def rib(L, zsl, z0m, z0h):  # noqa: N803
+    """Return the bulk Richardson number as function of the Obukhov length."""
+    return (
+        zsl
+        / L
+        * (np.log(zsl / z0h) - psih(zsl / L) + psih(z0h / L))
+        / (np.log(zsl / z0m) - psim(zsl / L) + psim(z0m / L)) ** 2.0
+    )
+
+
+def psim(zeta):
+    """Return the integrated stability function for momentum."""
+    unstable = zeta <= 0
+    x = (1.0 - 16.0 * np.where(unstable, zeta, 0.0)) ** (0.25)
+    psim_unstable = 3.14159265 / 2.0 - 2.0 * np.arctan(x) + np.log((1.0 + x) ** 2.0 * (1.0 + x**2.0) / 8.0)
+    zeta = np.where(unstable, 0.0, zeta)
+    psim_stable = -2.0 / 3.0 * (zeta - 5.0 / 0.35) * np.exp(-0.35 * zeta) - zeta - (10.0 / 3.0) / 0.35
+    return np.where(unstable, psim_unstable, psim_stable)
+
+
+def dpsim(zeta):
+    """Return the derivative of :func:`psim` to zeta."""
+    unstable = zeta <= 0
+    x = (1.0 - 16.0 * np.where(unstable, zeta, 0.0)) ** (0.25)
+    dpsim_unstable = -4.0 / x**3.0 * (2.0 / (1.0 + x) + 2.0 * (x - 1.0) / (1.0 + x**2.0))
+    zeta = np.where(unstable, 0.0, zeta)
+    dpsim_stable = (0.7 / 3.0 * zeta - 4.0) * np.exp(-0.35 * zeta) - 1.0
+    return np.where(unstable, dpsim_unstable, dpsim_stable)
+
+
+def psih(zeta):
+    """Return the integrated stability function for heat."""
+    unstable = zeta <= 0
+    x = (1.0 - 16.0 * np.where(unstable, zeta, 0.0)) ** (0.25)
+    psih_unstable = 2.0 * np.log((1.0 + x * x) / 2.0)
+    zeta = np.where(unstable, 0.0, zeta)
+    psih_stable = (
+        -2.0 / 3.0 * (zeta - 5.0 / 0.35) * np.exp(-0.35 * zeta)
+        - (1.0 + (2.0 / 3.0) * zeta) ** (1.5)
+        - (10.0 / 3.0) / 0.35
+        + 1.0
+    )
+    return np.where(unstable, psih_unstable, psih_stable)
+
+
+def dpsih(zeta):
+    """Return the derivative of :func:`psih` to zeta."""
+    unstable = zeta <= 0
+    x = (1.0 - 16.0 * np.where(unstable, zeta, 0.0)) ** (0.25)
+    dpsih_unstable = -16.0 / (x**2.0 * (1.0 + x**2.0))
+    zeta = np.where(unstable, 0.0, zeta)
+    dpsih_stable = (0.7 / 3.0 * zeta - 4.0) * np.exp(-0.35 * zeta) - (1.0 + (2.0 / 3.0) * zeta) ** (0.5)
+    return np.where(unstable, dpsih_unstable, dpsih_stable)
+
+
+def ribtol_newton(Rib, zsl, z0m, z0h, L=None, tol=1.0e-6, itmax=50):  # noqa: N803, PLR0913, PLR0917
+    """Solve the Obukhov length for arrays of bulk Richardson numbers.
+
+    Newton iteration with analytic derivative; members drop out once converged. Returns
+    the Obukhov length, the number of iterations and the last residual of every member.
+    """
+    Rib, zsl, z0m, z0h, tol = np.broadcast_arrays(Rib, zsl, z0m, z0h, tol)
+    shape = Rib.shape
+    Rib, zsl, z0m, z0h, tol = (np.ravel(a) for a in (Rib, zsl, z0m, z0h, tol))
+
+    # warm start from the previous Obukhov length where it has the stability of Rib
+    start = np.where(Rib > 0.0, 1.0, -1.0)
+    if L is None:
+        L = start
+    else:
+        L = np.where(((L > 0.0) != (Rib > 0.0)) | (abs(L) > L_NEUTRAL), start, np.ravel(L))
+    it = np.zeros(L.size, dtype=int)
+    res = np.full(L.size, np.nan)
+
+    lnm = np.log(zsl / z0m)
+    lnh = np.log(zsl / z0h)
+
+    active = np.arange(L.size)
+    for _ in range(itmax):
+        if active.size == 0:
+            break
+
+        L0 = L[active]
+        zeta = zsl[active] / L0
+        zetam = z0m[active] / L0
+        zetah = z0h[active] / L0
+        Fm = lnm[active] - psim(zeta) + psim(zetam)
+        Fh = lnh[active] - psih(zeta) + psih(zetah)
+        fx = Rib[active] - zeta * Fh / Fm**2.0
+
+        # derivatives of the integrated profile functions to L
+        dFm = (zeta * dpsim(zeta) - zetam * dpsim(zetam)) / L0
+        dFh = (zeta * dpsih(zeta) - zetah * dpsih(zetah)) / L0
+        fxdif = zeta * Fh / (L0 * Fm**2.0) - zeta * (dFh - 2.0 * Fh * dFm / Fm) / Fm**2.0
+
+        L_new = L0 - fx / fxdif
+        L_new = np.where((L_new > 0.0) != (L0 > 0.0), 0.5 * L0, L_new)
+        L[active] = L_new
+        it[active] += 1
+        res[active] = fx
+
+        converged = (abs(L_new - L0) <= tol[active] * abs(L_new)) | (abs(L_new) > L_NEUTRAL)
+        active = active[~converged]
+
+    return L.reshape(shape), it.reshape(shape), res.reshape(shape)
@@ -0,0 +1,147 @@
+"""Parallel parameter sweeps over CLASS configurations."""
+
+import heapq
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+
+
+def grid(base=None, **axes):
+    """Generate the Cartesian product of configuration fields.
+
+    Each keyword argument names a ``CLASSConfig`` field and gives the values it should take;
+    all other fields are taken from ``base`` (default configuration if omitted).
+
+    >>> configs = list(grid(beta=[0.1, 0.2], wg=[0.2, 0.25, 0.3]))
+    >>> len(configs)
+    6
+    """
+    if base is None:
+        base = CLASSConfig()
+    names = list(axes)
+    for values in itertools.product(*axes.values()):
+        yield replace(base, **dict(zip(names, values, strict=True)))
+
+
+def estimate_cost(config):
+    """Estimate the relative cost of a single model run.
+
+    The cost scales with the number of time steps; the weights of the components are rough
+    timings relative to the bare mixed-layer model.
+    """
+    weight = 1.0
+    if config.sw_sl:
+        weight += 15.0
+    if config.sw_rad:
+        weight += 1.0
+    if config.sw_ls:
+        weight += 35.0 if config.ls_type == "ags" else 3.0
+    if config.sw_cu:
+        weight += 1.0
+    # tendency evaluations per step of the higher-order integrators, with a few passes over
+    # the coupled components each
+    weight *= {"euler": 1.0, "heun": 6.0, "rk4": 12.0, "rk45": 18.0}[config.integrator]
+    return np.floor(config.runtime / config.dt) * weight
+
+
+def partition(costs, nchunks):
+    """Distribute tasks over chunks of about equal total cost.
+
+    Uses the longest-processing-time-first heuristic: the most expensive remaining task
+    is assigned to the chunk with the lowest load. Returns lists of task indices, most
+    expensive chunk first.
+    """
+    nchunks = max(1, min(nchunks, len(costs)))
+    loads = [(0.0, i, []) for i in range(nchunks)]
+    for index in sorted(range(len(costs)), key=lambda i: costs[i], reverse=True):
+        load, i, chunk = heapq.heappop(loads)
+        chunk.append(index)
+        heapq.heappush(loads, (load + costs[index], i, chunk))
+    loads.sort(reverse=True)
+    return [chunk for _, _, chunk in loads if chunk]
+
+
+def _run_chunk(members):
+    # run a chunk of (member, config) pairs in a worker; only the output is sent back
+    results = []
+    for member, config in members:
+        model = Model(config)
+        model.run()
+        results.append((member, model.out))
+    return results
+
+
+def run_sweep(configs, max_workers=None, chunks_per_worker=4, sink=None):
+    """Run the model for every configuration on a pool of worker processes.
+
+    Members are numbered in the order of ``configs``. Members are grouped into chunks of
+    about equal estimated cost (see :func:`estimate_cost`), so that runs with a different
+    ``runtime`` or ``dt`` are balanced over the workers. With ``max_workers=1`` the runs are
+    executed in the current process.
+
+    Returns a single ``pandas.DataFrame`` with all output, indexed by member and time step.
+    If a ``sink`` is given (see :mod:`classmodel.sink`), the output of every member is written
+    to it as soon as its chunk is done and ``None`` is returned instead.
+    """
+    configs = list(configs)
+    if not configs:
+        raise ValueError("a sweep needs at least one configuration")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    members = list(enumerate(configs))
+    chunks = partition([estimate_cost(c) for c in configs], max_workers * chunks_per_worker)
+
+    outputs = {}
+
+    def collect(results):
+        for member, out in results:
+            if sink is None:
+                outputs[member] = out
+            else:
+                sink.write(out, member)
+
+    if max_workers == 1:
+        for chunk in chunks:
+            collect(_run_chunk([members[i] for i in chunk]))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_run_chunk, [members[i] for i in chunk]) for chunk in chunks]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    if sink is not None:
+        return None
+    return concat_outputs([outputs[member] for member, _ in members])
+
+
+def concat_outputs(outputs):
+    """Concatenate the output of several members into one table.
+
+    All members must have the same output variables; their numbers of rows may differ, as the
+    rows are indexed by member and step.
+    """
+    import pandas as pd
+
+    for member, out in enumerate(outputs):
+        if out.variables != outputs[0].variables:
+            raise ValueError(
+                f"member {member} has other output variables than member 0: {', '.join(out.variables)}; "
+                "all members of a sweep need the same output_variables"
+            )
+    lengths = [len(out) for out in outputs]
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(np.arange(len(outputs)), lengths),
+            np.concatenate([np.arange(n) for n in lengths]),
+        ],
+        names=["member", "step"],
+    )
+    data = np.concatenate([out.data for out in outputs], axis=1)
+    return pd.DataFrame(data.T, index=index, columns=list(outputs[0].variables), copy=False)
@@ -0,0 +1,110 @@
+"""Moisture thermodynamics of the mixed layer.
+
+Saturation functions and solvers for the lifting condensation level (LCL), the height at which
+a parcel with the mixed-layer potential temperature ``theta`` and specific humidity ``q``
+saturates. With height ``z``, the temperature is ``theta - g / cp * z`` and the pressure
+``Ps - rho * g * z``; the LCL is the root of ``ln(RH(z))``, with ``RH = q / qsat``.
+
+The solvers accept scalars or arrays (for ensembles) and are consistent with :func:`esat`
+and :func:`qsat`. The fixed-step iteration of the original model remains in
+:meth:`classmodel.model.Model.statistics`.
+"""
+
+import numpy as np
+
+# coefficients of the saturation vapor pressure
+ESAT0 = 0.611e3  # saturation vapor pressure at 273.16 K [Pa]
+ESAT_A = 17.2694  # [-]
+ESAT_B = 35.86  # [K]
+T0 = 273.16  # [K]
+
+# largest change of the LCL per Newton iteration before the root is bracketed [m]
+LCL_MAX_STEP = 1000.0
+
+
+class ConvergenceWarning(RuntimeWarning):
+    """Warning for an iterative solver that did not converge."""
+
+
+def esat(T):  # noqa: N803
+    """Return the saturation vapor pressure at temperature ``T`` [Pa]."""
+    return ESAT0 * np.exp(ESAT_A * (T - T0) / (T - ESAT_B))
+
+
+def qsat(T, p):  # noqa: N803
+    """Return the saturation specific humidity at temperature ``T`` and pressure ``p`` [kg kg-1]."""
+    return 0.622 * esat(T) / p
+
+
+def _lcl_residual(z, theta, q, Ps, rho, g, cp):  # noqa: N803, PLR0913, PLR0917
+    # ln(RH) at height z and its derivative to z
+    T = theta - g / cp * z
+    p = Ps - rho * g * z
+    f = np.log(q * p / (0.622 * esat(T)))
+    df = -rho * g / p + g / cp * ESAT_A * (T0 - ESAT_B) / (T - ESAT_B) ** 2.0
+    return f, df
+
+
+def lcl_newton(theta, q, Ps, rho, g, cp, lcl, tol=1.0e-10, itmax=20):  # noqa: N803, PLR0913, PLR0917
+    """Solve the lifting condensation level with a safeguarded Newton iteration.
+
+    Starts from ``lcl`` (such as the LCL of the previous time step). The root is bracketed
+    as soon as the residual changes sign; steps that leave the bracket, or that go the wrong
+    way, are replaced by bisection, and steps are limited to ``LCL_MAX_STEP`` before the root
+    is bracketed. Members drop out once ``|ln(RH)| <= tol``. Returns the LCL, the number of
+    iterations and the last residual of every member.
+    """
+    theta, q, Ps, lcl = np.broadcast_arrays(theta, q, Ps, lcl)
+    shape = theta.shape
+    theta, q, Ps = (np.ravel(a).astype(float) for a in (theta, q, Ps))
+    z = np.ravel(lcl).astype(float)
+    lo = np.full(z.size, -np.inf)
+    hi = np.full(z.size, np.inf)
+    it = np.zeros(z.size, dtype=int)
+    res = np.full(z.size, np.nan)
+
+    active = np.arange(z.size)
+    for i in range(itmax + 1):
+        f, df = _lcl_residual(z[active], theta[active], q[active], Ps[active], rho, g, cp)
+        res[active] = f
+        converged = np.abs(f) <= tol
+        active, f, df = active[~converged], f[~converged], df[~converged]
+        if active.size == 0 or i == itmax:
+            break
+
+        # RH < 1 below the LCL
+        z0 = z[active]
+        lo[active] = np.where(f < 0.0, z0, lo[active])
+        hi[active] = np.where(f > 0.0, z0, hi[active])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(df > 0.0, -f / df, -np.sign(f) * LCL_MAX_STEP)
+        step = np.clip(step, -LCL_MAX_STEP, LCL_MAX_STEP)
+        z1 = z0 + step
+        bracketed = np.isfinite(lo[active]) & np.isfinite(hi[active])
+        outside = bracketed & ((z1 <= lo[active]) | (z1 >= hi[active]) | ~np.isfinite(z1))
+        z[active] = np.where(outside, 0.5 * (lo[active] + hi[active]), z1)
+        it[active] += 1
+
+    return z.reshape(shape), it.reshape(shape), res.reshape(shape)
+
+
+def lcl_analytic(theta, q, Ps, rho, g, cp, lcl):  # noqa: N803, PLR0913, PLR0917
+    """Closed-form lifting condensation level.
+
+    Expressed in the temperature ``T`` at the LCL, the vapor pressure of the parcel is linear
+    in ``T``; with its logarithm linearized around the temperature at ``lcl``, saturation
+    (``ln(e / ESAT0) = ESAT_A * (T - T0) / (T - ESAT_B)``) is a quadratic equation in ``T``.
+    The error is second order in the distance between ``lcl`` and the LCL, so the LCL of the
+    previous time step is a good linearization point.
+    """
+    T1 = theta - g / cp * lcl
+    p1 = Ps - rho * g * lcl
+    s = rho * cp / p1
+    a = np.log(q * p1 / (0.622 * ESAT0)) - s * T1
+
+    # s * T**2 + b * T + c = 0; the physical root is the smaller one
+    b = a - ESAT_B * s - ESAT_A
+    c = ESAT_A * T0 - ESAT_B * a
+    T = 2.0 * c / (-b + np.sqrt(b * b - 4.0 * s * c))
+    return (theta - T) * cp / g
@@ -0,0 +1,25 @@
+"""Tests for the benchmark script."""
+
+import os
+import sys
+from dataclasses import replace
+
+import pytest
+
+from classmodel.model import Model
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks"))
+from run_benchmarks import QUICK, switch_matrix  # noqa: E402
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_switch_matrix():
+    """Verify that every configuration of the switch matrix runs."""
+    names = []
+    for name, config in switch_matrix():
+        model = Model(replace(config, runtime=config.dt))
+        model.run()
+        assert len(model.out) == 1
+        names.append(name)
+    assert len(set(names)) == len(names)
+    assert set(QUICK) <= set(names)
@@ -0,0 +1,109 @@
+"""Tests for the cache of model results."""
+
+import os
+from dataclasses import replace
+
+import numpy as np
+
+from classmodel.cache import ResultCache, config_key
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+
+
+def test_config_key():
+    """Verify that the key depends on every field and on the model class."""
+    config = CLASSConfig()
+    assert config_key(config) == config_key(CLASSConfig())
+    assert config_key(config) != config_key(replace(config, beta=0.21))
+    assert config_key(config) != config_key(config, EnsembleModel)
+
+    batched = replace(config, wg=np.array([0.2, 0.3]))
+    assert config_key(batched) == config_key(replace(config, wg=np.array([0.2, 0.3])))
+    assert config_key(batched) != config_key(replace(config, wg=np.array([0.2, 0.31])))
+
+
+def test_cache(tmp_path):
+    """Verify that repeated runs are served from memory and from disk."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, runtime=3 * 3600)
+    r1 = Model(config)
+    r1.run()
+
+    cache = ResultCache(tmp_path, memory_items=1)
+    out = cache.run(config)
+    np.testing.assert_array_equal(out.data, r1.out.data)
+    assert config in cache
+
+    # returned outputs are copies
+    out.h[:] = 0.0
+    np.testing.assert_array_equal(cache.run(config).h, r1.out.h)
+
+    # a new configuration pushes the first one out of memory, but not off the disk
+    cache.run(replace(config, beta=0.25))
+    np.testing.assert_array_equal(cache.run(config).data, r1.out.data)
+    assert cache.stats() == {
+        "hits_memory": 1,
+        "hits_disk": 1,
+        "misses": 2,
+        "evictions": 0,
+        "hit_rate": 0.5,
+        "memory_items": 1,
+    }
+
+    # the disk tier is shared with other caches on the same directory
+    other = ResultCache(tmp_path)
+    np.testing.assert_array_equal(other.run(config).data, r1.out.data)
+    assert other.stats()["hits_disk"] == 1
+
+    # membership depends on the model class
+    assert not cache.contains(config, EnsembleModel)
+    cache.run(config, EnsembleModel)
+    assert cache.contains(config, EnsembleModel)
+
+
+def test_cache_evicted_while_read(tmp_path, monkeypatch):
+    """Verify that a file that another process removes while it is read counts as a miss."""
+    config = CLASSConfig(runtime=3600)
+    ResultCache(tmp_path).run(config)
+
+    def utime(path):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", utime)
+    cache = ResultCache(tmp_path)
+    assert cache.get(config) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_eviction(tmp_path):
+    """Verify that the least recently used files are removed when the directory is full."""
+    config = CLASSConfig(runtime=3600)
+    configs = [replace(config, beta=beta) for beta in (0.1, 0.2, 0.3)]
+    cache = ResultCache(tmp_path, memory_items=0)
+    cache.run(configs[0])
+    size = os.path.getsize(os.path.join(tmp_path, config_key(configs[0]) + ".npz"))
+
+    # a temporary file of a writer that died is removed, one that is being written counts
+    stale = os.path.join(tmp_path, "stale.1.tmp")
+    fresh = os.path.join(tmp_path, "fresh.2.tmp")
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(bytes(size // 2))
+    os.utime(stale, (0, 0))
+
+    cache.max_bytes = 2 * size + size // 2
+    cache.run(configs[1])
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+    assert cache.stats()["evictions"] == 0
+    os.remove(fresh)
+    os.utime(os.path.join(tmp_path, config_key(configs[0]) + ".npz"), (0, 0))
+    os.utime(os.path.join(tmp_path, config_key(configs[1]) + ".npz"), (1, 1))
+    cache.run(configs[2])
+
+    assert cache.stats()["evictions"] == 1
+    assert configs[0] not in cache
+    assert configs[1] in cache and configs[2] in cache
+
+    cache.clear()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,62 @@
+"""Tests for the calibration against observations."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classmodel.calibrate import Calibration, calibrate
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+
+CONFIG = CLASSConfig(runtime=4 * 3600.0)
+BOUNDS = {"beta": (0.05, 0.5), "gammatheta": (0.002, 0.01)}
+TRUTH = {"beta": 0.3, "gammatheta": 0.004}
+
+
+def observations():
+    """Return hourly observations of a run with the true parameters."""
+    model = Model(CLASSConfig(runtime=4 * 3600.0, **TRUTH))
+    model.run()
+    index = np.arange(0, len(model.out), 60)
+    return pd.concat(
+        [
+            pd.DataFrame({"time": model.out.t[index], "variable": name, "value": getattr(model.out, name)[index]})
+            for name in ("h", "theta")
+        ]
+    )
+
+
+def test_misfit():
+    """Verify the misfit, and the evaluation of candidates as an ensemble and as a sweep."""
+    calibration = Calibration(CONFIG, observations(), BOUNDS, weights={"h": 1.0e-4})
+    points = np.array([[CONFIG.beta, CONFIG.gammatheta], [TRUTH["beta"], TRUTH["gammatheta"]]])
+    misfits = calibration.evaluate(points)
+    assert misfits[0] > 1.0
+    assert misfits[1] == pytest.approx(0.0, abs=1.0e-20)
+    np.testing.assert_allclose(calibration.evaluate(points, "processes", max_workers=1), misfits, atol=1.0e-20)
+    assert calibration.evaluations == 2 * len(points)
+
+    with pytest.raises(ValueError, match="theta"):
+        Calibration(CLASSConfig(output_variables=("h",)), observations(), BOUNDS)
+    with pytest.raises(ValueError, match="sw_ls"):
+        Calibration(CONFIG, observations(), {"sw_ls": (0, 1)})
+
+
+def test_levenberg_marquardt():
+    """Verify that the gradient-based calibration recovers the true parameters."""
+    result = calibrate(CONFIG, observations(), BOUNDS, method="levenberg-marquardt", weights={"h": 1.0e-4})
+    assert result.misfit == pytest.approx(0.0, abs=1.0e-12)
+    for name, value in TRUTH.items():
+        assert result.parameters[name] == pytest.approx(value, rel=1.0e-6)
+    assert result.history[-1] == result.misfit
+
+
+def test_differential_evolution():
+    """Verify that differential evolution reduces the misfit and stays within the bounds."""
+    result = calibrate(CONFIG, observations(), BOUNDS, weights={"h": 1.0e-4}, popsize=8, generations=15, seed=0)
+    assert result.history[-1] < 0.01 * result.history[0]
+    assert np.all(np.diff(result.history) <= 0.0)
+    assert result.evaluations == 8 * len(result.history)
+    for name, (lower, upper) in BOUNDS.items():
+        assert lower <= result.parameters[name] <= upper
+        assert result.parameters[name] == pytest.approx(TRUTH[name], rel=0.1)
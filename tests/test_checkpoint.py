@@ -0,0 +1,79 @@
+"""Tests for checkpoint and restart of model runs."""
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+from classmodel.sensitivity import TangentLinearModel
+
+CONFIGS = [
+    {"sw_sl": True, "sw_rad": True, "sw_ls": True, "sw_cu": True},
+    {"sw_sl": True, "sw_rad": True, "sw_ls": True, "ls_type": "ags", "sw_wind": True},
+    {"sw_sl": True, "sw_ls": True, "sw_rad": True, "integrator": "rk45", "dt": 600.0},
+    {"sw_sl": True, "ribtol_type": "newton", "output_interval": 420.0, "output_reduction": "mean"},
+]
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("switches", CONFIGS)
+def test_restart_is_identical(tmp_path, switches):
+    """Verify that a restored run reproduces an uninterrupted run bit for bit."""
+    config = CLASSConfig(**switches)
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(config)
+    r2.start()
+    r2.advance(r2.tsteps // 3 + 1)
+    r2.checkpoint(tmp_path / "run.npz")
+    del r2
+
+    r3 = Model.restore(tmp_path / "run.npz")
+    r3.resume()
+    np.testing.assert_array_equal(r3.out.data, r1.out.data)
+
+
+def test_restart_ensemble(tmp_path):
+    """Verify that an ensemble run can be checkpointed and restored."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, beta=np.array([0.1, 0.2]), c3c4=np.array(["c3", "c4"]))
+    e1 = EnsembleModel(config)
+    e1.run()
+
+    e2 = EnsembleModel(config)
+    e2.start()
+    stop = 100
+    e2.advance(stop)
+    e2.checkpoint(tmp_path / "run.npz")
+
+    with pytest.raises(TypeError, match="EnsembleModel"):
+        Model.restore(tmp_path / "run.npz")
+
+    e3 = EnsembleModel.restore(tmp_path / "run.npz")
+    assert e3.tnext == stop
+    e3.resume()
+    np.testing.assert_array_equal(e3.out.data, e1.out.data)
+
+
+def test_restart_branch(tmp_path):
+    """Verify that a restored branch keeps the output of the run that it branched from."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True)
+    r1 = Model(config)
+    r1.run()
+
+    (branch,) = Model(config).fork(240, [{}])
+    branch.advance(300)
+    branch.checkpoint(tmp_path / "run.npz")
+
+    r2 = Model.restore(tmp_path / "run.npz")
+    r2.resume()
+    np.testing.assert_array_equal(r2.full_output().data, r1.out.data)
+
+
+def test_checkpoint_unsupported(tmp_path):
+    """Verify that a value that cannot be stored raises instead of being left out of the checkpoint."""
+    r1 = TangentLinearModel(CLASSConfig(), ["h"])
+    r1.start()
+    with pytest.raises(TypeError, match="cannot store a Dual"):
+        r1.checkpoint(tmp_path / "run.npz")
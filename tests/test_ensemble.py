@@ -0,0 +1,124 @@
+"""Consistency of the batched ensemble model with the scalar model."""
+
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+from classmodel.thermodynamics import ConvergenceWarning
+
+SWITCHES = [
+    {},
+    {"sw_sl": True, "sw_rad": True, "sw_ls": True, "sw_wind": True},
+    {"sw_sl": True, "sw_rad": True, "sw_ls": True, "ls_type": "ags", "sw_cu": True},
+    {"sw_sl": True, "ribtol_type": "newton", "lcl_type": "newton"},
+    {"sw_rad": True, "sw_cu": True, "lcl_type": "analytic"},
+    {"sw_sl": True, "sw_rad": True, "sw_sltable": True},
+    {"sw_rad": True, "sw_ls": True, "integrator": "rk4", "dt": 300.0, "integrator_rtol": 1e-12},
+    {"sw_sl": True, "sw_rad": True, "sw_ls": True, "radiation_interval": 900.0, "land_surface_interval": 300.0},
+    {"sw_sl": True, "output_variables": ("h", "theta", "L"), "output_interval": 600.0, "output_reduction": "max"},
+]
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("switches", SWITCHES)
+def test_ensemble_matches_model(switches):
+    """Verify that every ensemble member reproduces the scalar model output."""
+    base = CLASSConfig(runtime=3 * 3600, **switches)
+    configs = [
+        base,
+        replace(base, beta=0.25, wg=0.3, c3c4="c4", c_beta=0.3),
+        replace(base, h=400.0, theta=290.0, u=2.0, c_beta=0.7),
+        replace(base, z0m=2.0, z0h=0.002),
+    ]
+
+    ensemble = EnsembleModel(configs)
+    ensemble.run()
+
+    # with the higher-order integrators the iterations of the components are repeated several
+    # times per step, which amplifies the differences in their stopping criteria
+    rtol = 1e-8 if base.integrator == "euler" else 1e-6
+
+    spinup = []
+    for i, config in enumerate(configs):
+        model = Model(config)
+        model.run()
+        pd.testing.assert_frame_equal(ensemble.out.member(i).to_pandas(), model.out.to_pandas(), rtol=rtol)
+        spinup.append(model.sl_spinup_it)
+
+    # the spin-up of the surface layer lasts until all members have converged
+    assert ensemble.sl_spinup_it == max(spinup)
+
+
+def test_ensemble_from_batched_config():
+    """Verify that array-valued fields of a single config are broadcast to members."""
+    config = CLASSConfig(runtime=3600, beta=np.array([0.1, 0.2, 0.3]))
+    ensemble = EnsembleModel(config)
+    ensemble.run()
+
+    assert ensemble.out.h.shape == (60, 3)
+    assert np.all(np.diff(ensemble.out.h[-1]) > 0)
+
+
+def test_ensemble_solar_geometry():
+    """Verify that members share the solar geometry, unless their location or date differ."""
+    shared = EnsembleModel(CLASSConfig(sw_rad=True, beta=np.array([0.1, 0.2, 0.3])))
+    shared.start()
+    assert shared.solar_sinlea.shape == (shared.tsteps + 1,)
+
+    members = EnsembleModel(CLASSConfig(sw_rad=True, lat=np.array([40.0, CLASSConfig.lat, 60.0])))
+    members.start()
+    assert members.solar_sinlea.shape == (members.tsteps + 1, 3)
+    np.testing.assert_array_equal(members.solar_sinlea[:, 1], shared.solar_sinlea)
+
+
+def test_ensemble_iter_chunks():
+    """Verify that ensemble output can be streamed in chunks."""
+    config = CLASSConfig(runtime=3600, beta=np.array([0.1, 0.2, 0.3]))
+    ensemble = EnsembleModel(config)
+    ensemble.run()
+
+    chunks = list(EnsembleModel(config).iter_chunks(25))
+    assert [chunk.h.shape for chunk in chunks] == [(25, 3), (25, 3), (10, 3)]
+    np.testing.assert_array_equal(np.concatenate([chunk.h for chunk in chunks]), ensemble.out.h)
+
+
+def test_ensemble_branch():
+    """Verify that an ensemble can be branched with member-dependent overrides."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, beta=np.array([0.1, 0.2]))
+    e1 = EnsembleModel(replace(config, advq=np.array([0.0, 1e-8])))
+    e1.start()
+    e1.advance(200)
+    e1.advq = np.array([1e-8, 0.0])
+    e1.resume()
+
+    trunk = EnsembleModel(replace(config, advq=np.array([0.0, 1e-8])))
+    (branch,) = trunk.fork(200, [{"advq": np.array([1e-8, 0.0])}])
+    branch.resume()
+    np.testing.assert_array_equal(branch.full_output().data, e1.out.data)
+
+
+def test_ensemble_rejects_mixed_switches():
+    """Verify that members must share their switches."""
+    with pytest.raises(ValueError, match="sw_sl"):
+        EnsembleModel([CLASSConfig(), CLASSConfig(sw_sl=True)])
+
+
+def test_ensemble_ribtol_not_converged(monkeypatch):
+    """Verify that the 'fd' solver stops at its iteration limit and counts the members that did not converge."""
+    itmax = 3
+    monkeypatch.setattr("classmodel.model.RIBTOL_FD_ITMAX", itmax)
+    monkeypatch.setattr("classmodel.ensemble.RIBTOL_FD_ITMAX", itmax)
+    config = CLASSConfig(sw_sl=True, runtime=600.0, z0m=np.array([0.02, 0.05]))
+    with pytest.warns(ConvergenceWarning, match="ribtol_failures"):
+        r1 = Model(replace(config, z0m=0.02))
+        r1.run()
+    with pytest.warns(ConvergenceWarning, match="ribtol_failures"):
+        e1 = EnsembleModel(config)
+        e1.run()
+    assert e1.out.ribtol_it.max() == itmax
+    assert e1.ribtol_failures > r1.ribtol_failures > 0
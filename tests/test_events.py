@@ -0,0 +1,69 @@
+"""Tests for event detection during a model run."""
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.events import threshold
+from classmodel.model import Model
+
+
+def expected_crossing(t, value):
+    """Return the time of the first upward zero crossing, interpolated linearly between the output steps."""
+    i = np.argmax(value > 0.0)
+    return t[i - 1] + value[i - 1] / (value[i - 1] - value[i]) * (t[i] - t[i - 1])
+
+
+def test_event_times():
+    """Verify that events record the interpolated time of their first crossing."""
+    config = CLASSConfig(sw_cu=True)
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(config)
+    r2.add_event("clouds", lambda model: model.ac, direction=1)
+    r2.add_event("h1000", threshold("h", 1000.0))
+    r2.add_event("collapse", threshold("h", 100.0), direction=-1)
+    r2.run()
+
+    summary = r2.event_summary()
+    assert summary["clouds"] == expected_crossing(r1.out.t, r1.out.ac)
+    assert summary["h1000"] == expected_crossing(r1.out.t, r1.out.h - 1000.0)
+    assert np.isnan(summary["collapse"])
+    assert r2.events[1].count == 1
+    assert len(r2.out) == len(r1.out)
+
+
+def test_terminal_event():
+    """Verify that a terminal event stops the run and truncates the output."""
+    config = CLASSConfig(output_interval=600.0, output_reduction="mean")
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(config)
+    event = r2.add_event("h1000", threshold("h", 1000.0), terminal=True)
+    r2.run()
+
+    nrows = len(r2.out)
+    assert nrows < len(r1.out)
+    # the crossing lies between the last time step and the one before
+    assert r2.out.t[-1] - 60.0 / 3600.0 <= event.time < r2.out.t[-1] + 600.0 / 3600.0
+    np.testing.assert_array_equal(r2.out.data[:, : nrows - 1], r1.out.data[:, : nrows - 1])
+
+    chunks = list(Model(config).iter_chunks(5))
+    assert sum(len(chunk) for chunk in chunks) == len(r1.out)
+    r3 = Model(config)
+    r3.add_event("h1000", threshold("h", 1000.0), terminal=True)
+    assert sum(len(chunk) for chunk in r3.iter_chunks(5)) == nrows
+
+
+def test_ensemble_events():
+    """Verify that ensemble events are recorded per member and stop once all members had them."""
+    ensemble = EnsembleModel(CLASSConfig(wtheta=np.array([0.05, 0.1, 0.2])))
+    ensemble.add_event("h1000", threshold("h", 1000.0), terminal=True)
+    ensemble.run()
+
+    times = ensemble.event_summary()["h1000"]
+    assert times.shape == (3,)
+    assert np.all(np.diff(times) < 0)
+    assert ensemble.out.t[-2, 0] <= times.max() <= ensemble.out.t[-1, 0]
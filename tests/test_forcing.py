@@ -0,0 +1,123 @@
+"""Tests for the time-varying forcing."""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from classmodel.cache import config_key
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.forcing import TimeSeries, resample_forcing
+from classmodel.model import Model
+
+TIME = np.array([0.0, 3 * 3600.0, 6 * 3600.0, 12 * 3600.0])
+ADVTHETA = np.array([0.0, 2.0e-4, -1.0e-4, 0.0])
+WTHETA = np.array([0.05, 0.2, 0.15, 0.0])
+
+
+def test_series():
+    """Verify resampling, validation and conversion of (time, values) tuples."""
+    series = TimeSeries([0.0, 10.0], [1.0, 2.0])
+    np.testing.assert_allclose(series.resample(np.array([-5.0, 0.0, 2.5, 10.0, 20.0])), [1.0, 1.0, 1.25, 2.0, 2.0])
+    assert TimeSeries([5.0], [3.0]).resample(np.arange(3.0)).tolist() == [3.0, 3.0, 3.0]
+
+    with pytest.raises(ValueError, match="increasing"):
+        TimeSeries([0.0, 0.0], [1.0, 2.0])
+    with pytest.raises(ValueError, match="shape"):
+        TimeSeries([0.0, 1.0], [1.0, 2.0, 3.0])
+
+    config = CLASSConfig(advtheta=(TIME, ADVTHETA))
+    assert config.advtheta == TimeSeries(TIME, ADVTHETA)
+    with pytest.raises(ValueError, match="land surface"):
+        Model(replace(config, wtheta=(TIME, WTHETA), sw_ls=True)).init()
+
+
+def test_load(tmp_path):
+    """Verify that a series is read from a memory-mapped file."""
+    path = tmp_path / "forcing.npy"
+    np.save(path, np.column_stack([TIME, ADVTHETA, 2.0 * ADVTHETA]))
+    series = TimeSeries.load(path)
+    assert isinstance(series.values.base, np.memmap)
+    np.testing.assert_array_equal(series.values, np.column_stack([ADVTHETA, 2.0 * ADVTHETA]))
+
+    np.save(path, np.column_stack([TIME, ADVTHETA]))
+    assert TimeSeries.load(path) == TimeSeries(TIME, ADVTHETA)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("integrator", ["euler", "rk4"])
+def test_constant_series(integrator):
+    """Verify that constant series reproduce a run with constant forcing bit for bit."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_cu=True, cc=0.2, advq=1.0e-8, integrator=integrator)
+    r1 = Model(config)
+    r1.run()
+
+    series = {name: TimeSeries(TIME, np.full(TIME.size, getattr(config, name))) for name in ("cc", "advq", "Ps")}
+    r2 = Model(replace(config, **series))
+    r2.run()
+    np.testing.assert_array_equal(r2.out.data, r1.out.data)
+
+
+def test_varying_series():
+    """Verify that a run with series equals a run in which the forcing is set at every step."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, advtheta=(TIME, ADVTHETA), wtheta=(TIME, WTHETA))
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(replace(config, advtheta=ADVTHETA[0], wtheta=WTHETA[0]))
+    r2.start()
+    forcing = resample_forcing(config, r2.tsteps, config.dt)
+    for t in range(r2.tsteps):
+        r2.advtheta = forcing["advtheta"][t]
+        r2.wtheta = forcing["wtheta"][t]
+        r2.advance(t + 1)
+    np.testing.assert_array_equal(r2.out.data, r1.out.data)
+
+    # the forcing changes the run
+    r3 = Model(replace(config, advtheta=ADVTHETA[0], wtheta=WTHETA[0]))
+    r3.run()
+    assert not np.allclose(r3.out.theta, r1.out.theta)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_ensemble_series():
+    """Verify that members with their own series match scalar runs."""
+    members = [
+        CLASSConfig(sw_sl=True, sw_rad=True, advtheta=(TIME, ADVTHETA)),
+        CLASSConfig(sw_sl=True, sw_rad=True, advtheta=1.0e-4),
+        CLASSConfig(sw_sl=True, sw_rad=True, advtheta=(TIME, -ADVTHETA), wtheta=(TIME, WTHETA)),
+    ]
+    ensemble = EnsembleModel(members)
+    ensemble.run()
+    for i, config in enumerate(members):
+        model = Model(config)
+        model.run()
+        np.testing.assert_allclose(ensemble.out.member(i).data, model.out.data, rtol=1e-10, atol=1e-12)
+
+    # one series with a column per member
+    values = np.column_stack([ADVTHETA, -ADVTHETA])
+    columns = EnsembleModel(CLASSConfig(sw_sl=True, sw_rad=True, advtheta=(TIME, values)))
+    columns.run()
+    assert columns.nmembers == values.shape[1]
+    np.testing.assert_array_equal(columns.out.member(0).data, ensemble.out.member(0).data)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_restart_and_cache_key(tmp_path):
+    """Verify that runs with series can be checkpointed and have their own cache key."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, advtheta=(TIME, ADVTHETA), cc=(TIME, [0.0, 0.3, 0.6, 0.2]))
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(config)
+    r2.start()
+    r2.advance(300)
+    r2.checkpoint(tmp_path / "run.npz")
+    r3 = Model.restore(tmp_path / "run.npz")
+    assert r3.input == config
+    r3.resume()
+    np.testing.assert_array_equal(r3.out.data, r1.out.data)
+
+    assert config_key(config) == config_key(replace(config, advtheta=(TIME, ADVTHETA.copy())))
+    assert config_key(config) != config_key(replace(config, advtheta=(TIME, 2.0 * ADVTHETA)))
@@ -0,0 +1,41 @@
+"""Tests for the columnar model output."""
+
+import pickle
+
+import numpy as np
+
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+from classmodel.output import VARIABLES, ModelOutput
+
+
+def test_output_views_buffer():
+    """Verify that the output variables are views on one buffer and export without a copy."""
+    r1 = Model(CLASSConfig(runtime=3600))
+    r1.run()
+    out = r1.out
+
+    assert out.data.shape == (len(VARIABLES), 60)
+    assert np.shares_memory(out.h, out.data)
+    np.testing.assert_array_equal(out.data[VARIABLES.index("h")], out.h)
+
+    df = out.to_pandas()
+    assert list(df.columns) == list(VARIABLES)
+    assert np.shares_memory(df["h"].to_numpy(), out.data)
+    assert np.shares_memory(out.to_numpy(), out.data)
+
+    start, stop = 10, 20
+    view = out.view(start, stop)
+    assert len(view) == stop - start
+    assert np.shares_memory(view.h, out.data)
+    np.testing.assert_array_equal(view.h, out.h[start:stop])
+
+
+def test_output_pickle():
+    """Verify that unpickled output views a single buffer again."""
+    out = ModelOutput(5, 3)
+    out.h[:] = np.arange(15).reshape(5, 3)
+
+    copy = pickle.loads(pickle.dumps(out))
+    assert np.shares_memory(copy.h, copy.data)
+    np.testing.assert_array_equal(copy.member(1).h, [1, 4, 7, 10, 13])
@@ -0,0 +1,51 @@
+"""Tests for the timing of model components."""
+
+import json
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_profile():
+    """Verify that a profiled run counts calls and iterations without changing the output."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, ls_type="ags", sw_cu=True)
+    r1 = Model(config)
+    r1.run()
+
+    r2 = Model(config)
+    with r2.profile() as profiler:
+        r2.run()
+    np.testing.assert_array_equal(r2.out.data, r1.out.data)
+    assert "statistics" not in r2.__dict__
+
+    report = profiler.report()
+    tsteps = len(r1.out)
+    assert report["store"]["calls"] == tsteps
+    assert report["integrate"]["calls"] == tsteps
+    assert report["statistics"]["calls"] == tsteps + 1
+    assert report["ags"]["calls"] == report["run_land_surface"]["calls"]
+    assert "jarvis_stewart" not in report
+    assert report["statistics"]["iterations"] > 0
+    assert report["ribtol"]["max_iterations"] >= 1
+    assert report["ribtol"]["time"] < report["run_surface_layer"]["time"] < profiler.wall_time
+    assert "run_surface_layer" in profiler.summary()
+
+
+def test_profile_trace(tmp_path):
+    """Verify the Chrome trace of a profiled ensemble run."""
+    config = CLASSConfig(sw_sl=True, ribtol_type="newton", runtime=3600.0, beta=np.array([0.1, 0.2]))
+    model = EnsembleModel(config)
+    with model.profile(trace=True) as profiler:
+        model.run()
+    profiler.write_trace(tmp_path / "trace.json")
+
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == sum(entry["calls"] for entry in profiler.report().values())
+    assert {event["name"] for event in events} >= {"statistics", "ribtol_newton", "store"}
+    assert all(event["dur"] >= 0.0 for event in events)
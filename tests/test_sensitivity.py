@@ -0,0 +1,83 @@
+"""Tests for the forward-mode sensitivities."""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.dual import Dual
+from classmodel.model import Model
+from classmodel.sensitivity import sensitivities
+from classmodel.special import E1
+
+PARAMETERS = ["beta", "gammatheta", "wg", "rsmin"]
+
+
+def test_dual():
+    """Verify the derivatives of the dual numbers against the analytic derivatives."""
+    a, b = 0.7, 1.9
+    x = Dual.variable(a, 0, 2)
+    y = Dual.variable(b, 1, 2)
+    for f, derivatives in [
+        (x * y / (x + y), (b**2 / (a + b) ** 2, a**2 / (a + b) ** 2)),
+        (x**y, (b * a ** (b - 1.0), a**b * np.log(a))),
+        (np.exp(-x) * np.sqrt(y), (-np.exp(-a) * np.sqrt(b), 0.5 * np.exp(-a) / np.sqrt(b))),
+        (np.arctan(x) - 2.0 / y, (1.0 / (1.0 + a * a), 2.0 / b**2)),
+        (max(x, y) + abs(-x), (1.0, 1.0)),
+        (E1(x), (-np.exp(-a) / a, 0.0)),
+    ]:
+        np.testing.assert_allclose(f.eps, derivatives, rtol=1e-14)
+
+    assert (np.float64(2.0) * x).value == 2.0 * a
+    assert x < y and np.maximum(x, y) is y
+    assert np.all(((0.0 * x) ** 0.5).eps == 0.0)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize(
+    "switches",
+    [
+        {"sw_sl": True, "sw_rad": True, "sw_ls": True},
+        {"sw_sl": True, "sw_rad": True, "sw_ls": True, "ls_type": "ags", "sw_cu": True, "ribtol_type": "newton"},
+        {"sw_sl": True, "sw_rad": True, "sw_ls": True, "integrator": "heun", "lcl_type": "analytic"},
+    ],
+)
+def test_sensitivities(switches):
+    """Verify the sensitivities against central finite differences."""
+    config = CLASSConfig(runtime=3 * 3600.0, **switches)
+    out, jacobian = sensitivities(config, PARAMETERS)
+
+    r1 = Model(config)
+    r1.run()
+    np.testing.assert_array_equal(out.data, r1.out.data)
+
+    for name in PARAMETERS:
+        # smaller differences are dominated by the tolerance of the surface-layer iteration
+        delta = 1.0e-4 * getattr(config, name)
+        runs = []
+        for value in (getattr(config, name) + delta, getattr(config, name) - delta):
+            model = Model(replace(config, **{name: value}))
+            model.run()
+            runs.append(model.out)
+        for variable in ("h", "theta", "q", "H", "LE"):
+            fd = (getattr(runs[0], variable) - getattr(runs[1], variable)) / (2.0 * delta)
+            derivative = getattr(jacobian[name], variable)
+            np.testing.assert_allclose(
+                derivative, fd, rtol=1e-4, atol=1e-6 * np.max(np.abs(fd)), err_msg=f"{variable}, {name}"
+            )
+        assert np.all(jacobian[name].t == 0.0)
+
+
+def test_unsupported():
+    """Verify that unknown parameters and unsupported settings are rejected."""
+    with pytest.raises(ValueError, match="sw_ls"):
+        sensitivities(CLASSConfig(), ["sw_ls"])
+    with pytest.raises(ValueError, match="rk45"):
+        sensitivities(CLASSConfig(integrator="rk45"), ["beta"])
+
+
+def test_switched_off():
+    """Verify that the variables of components that are switched off are stored as NaN."""
+    out, jacobian = sensitivities(CLASSConfig(sw_ml=False, runtime=600.0), ["beta"])
+    assert np.all(np.isnan(out.wCO2e)) and np.all(np.isnan(jacobian["beta"].wCO2e))
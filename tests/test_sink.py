@@ -0,0 +1,91 @@
+"""Tests for the on-disk output sinks."""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.ensemble import EnsembleModel
+from classmodel.model import Model
+from classmodel.output import VARIABLES, ModelOutput
+from classmodel.sink import ColumnarSink, MemmapSink, open_output
+from classmodel.sweep import run_sweep
+
+SINKS = [
+    (MemmapSink, {}),
+    (ColumnarSink, {"block": 2}),
+    (ColumnarSink, {"block": 2, "compress": True}),
+]
+
+
+@pytest.mark.parametrize(("sink_type", "options"), SINKS)
+def test_sink_ensemble(tmp_path, sink_type, options):
+    """Verify that chunked ensemble output is read back by member and by variable."""
+    config = CLASSConfig(runtime=3600, beta=np.linspace(0.1, 0.3, 5))
+    ensemble = EnsembleModel(config)
+    ensemble.run()
+
+    with sink_type(tmp_path / "out", 5, 60, **options) as sink:
+        EnsembleModel(config).run_to_sink(sink, chunksize=7)
+
+    reader = open_output(tmp_path / "out")
+    assert reader.variables == VARIABLES
+    np.testing.assert_array_equal(reader.read(), ensemble.out.data.transpose(2, 1, 0))
+    np.testing.assert_array_equal(reader.variable("h"), ensemble.out.h.T)
+    np.testing.assert_array_equal(reader.read(["theta", "h"], [4, 1])[..., 1], ensemble.out.h[:, [4, 1]].T)
+    np.testing.assert_array_equal(reader.member(3).h, ensemble.out.member(3).h)
+
+
+@pytest.mark.parametrize(("sink_type", "options"), SINKS)
+def test_sink_sweep(tmp_path, sink_type, options):
+    """Verify that a sweep writes every member to the sink."""
+    variables = ("t", "h", "q")
+    configs = [CLASSConfig(runtime=7200, beta=beta, output_variables=variables[1:]) for beta in [0.1, 0.2, 0.3]]
+
+    with sink_type(tmp_path / "out", len(configs), 120, variables, **options) as sink:
+        assert run_sweep(configs, max_workers=1, sink=sink) is None
+
+    reader = open_output(tmp_path / "out")
+    for i, config in enumerate(configs):
+        model = Model(config)
+        model.run()
+        np.testing.assert_array_equal(reader.member(i).data, model.out.data)
+
+
+def test_sink_rejects_other_variables(tmp_path):
+    """Verify that output with different variables is not written to a sink."""
+    model = Model(CLASSConfig(runtime=3600, output_variables=("h",)))
+    with MemmapSink(tmp_path / "out", 1, 60) as sink, pytest.raises(ValueError, match="variables"):
+        model.run_to_sink(sink)
+
+
+def test_memmap_read_variable(tmp_path):
+    """Verify that reading one variable copies only that variable from the file."""
+    rng = np.random.default_rng(0)
+    out = ModelOutput.from_buffer(rng.random((len(VARIABLES), 100, 500)))
+    with MemmapSink(tmp_path / "out", 500, 100) as sink:
+        sink.write(out)
+
+    reader = open_output(tmp_path / "out")
+    tracemalloc.start()
+    h = reader.variable("h")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    np.testing.assert_array_equal(h, out.h.T)
+    assert peak < 4 * h.nbytes < reader.array.nbytes
+
+
+def test_columnar_rewrite(tmp_path):
+    """Verify that rows written twice count once, and that a block on disk is not written again."""
+    out = ModelOutput.from_buffer(np.arange(len(VARIABLES) * 10 * 2, dtype=float).reshape(len(VARIABLES), 10, 2))
+    with ColumnarSink(tmp_path / "out", 2, 10, block=2) as sink:
+        sink.write(out.view(0, 6))
+        sink.write(out.view(0, 6))
+        assert sink.buffers
+        sink.write(out.view(6, 10), start=6)
+        assert not sink.buffers
+        with pytest.raises(ValueError, match="already been written"):
+            sink.write(out.view(0, 1))
+
+    np.testing.assert_array_equal(open_output(tmp_path / "out").read(), out.data.transpose(2, 1, 0))
@@ -0,0 +1,48 @@
+"""Tests for the tabulated surface layer."""
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+from classmodel.sltable import SurfaceLayerTable, get_table
+
+
+def test_table_error_bound():
+    """Verify that a table that is too coarse for the tolerance is rejected."""
+    with pytest.raises(ValueError, match="sltable_tol"):
+        get_table((21, 9, 6), tol=1e-3)
+
+
+def test_table_save_load(tmp_path):
+    """Verify that a saved table is read back identically."""
+    path = tmp_path / "sltable.npz"
+    table = get_table((21, 9, 6), tol=1.0, path=path)
+    loaded = SurfaceLayerTable.load(path)
+
+    assert loaded.shape == table.shape
+    assert loaded.max_error == table.max_error
+    np.testing.assert_array_equal(loaded.values, table.values)
+
+
+def test_table_replace(tmp_path):
+    """Verify that a stored table of another shape is replaced by the requested table."""
+    path = tmp_path / "sltable.npz"
+    get_table((21, 9, 6), tol=1.0, path=path)
+    table = get_table((25, 9, 6), tol=1.0, path=path)
+    assert SurfaceLayerTable.stored_shape(path) == (25, 9, 6)
+    np.testing.assert_array_equal(SurfaceLayerTable.load(path).values, table.values)
+
+
+def test_model_sltable():
+    """Verify that the tabulated surface layer reproduces the iterative solution."""
+    output = {}
+    for sw_sltable in [False, True]:
+        r1 = Model(CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, sw_sltable=sw_sltable))
+        r1.run()
+        output[sw_sltable] = r1.out
+
+    np.testing.assert_allclose(output[True].Cm, output[False].Cm, rtol=CLASSConfig.sltable_tol)
+    np.testing.assert_allclose(output[True].Cs, output[False].Cs, rtol=CLASSConfig.sltable_tol)
+    np.testing.assert_allclose(output[True].h, output[False].h, rtol=1e-3)
+    assert np.all(output[True].ribtol_it == 0)
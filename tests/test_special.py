@@ -0,0 +1,43 @@
+"""Accuracy of the special functions."""
+
+import numpy as np
+import pytest
+
+from classmodel.special import E1
+
+
+def series_e1(x):
+    """Return the 100-term power series of E1 that was used by Model.ags before."""
+    E1sum = 0.0
+    factorial = 1.0
+    for k in range(1, 100):
+        factorial = factorial * float(k)
+        E1sum += (-1.0) ** k * x**k / (k * factorial)
+    return -0.57721566490153286060 - np.log(x) - E1sum
+
+
+# the range of the arguments of E1 in Model.ags is about 1e-5 to 5; beyond that the series
+# itself loses accuracy by cancellation
+Y = np.geomspace(1e-6, 5.0, 400)
+
+
+@pytest.mark.parametrize("x", Y[::20])
+def test_e1_scalar(x):
+    """Verify the scalar E1 against the power series."""
+    assert E1(x) == pytest.approx(series_e1(x), rel=1e-11)
+
+
+def test_e1_array():
+    """Verify the vectorized E1 against the power series and the scalar E1."""
+    expected = series_e1(Y)
+    np.testing.assert_allclose(E1(Y), expected, rtol=1e-11)
+    np.testing.assert_allclose(E1(Y.reshape(20, 20)), expected.reshape(20, 20), rtol=1e-11)
+    np.testing.assert_allclose(E1(Y), [E1(x) for x in Y], rtol=1e-14)
+
+
+def test_e1_large():
+    """Verify E1 beyond the range of the power series against tabulated values."""
+    x = np.array([10.0, 20.0, 100.0])
+    expected = np.array([4.1569689296853242774e-06, 9.8355252906498816904e-11, 3.6835977616820321802e-46])
+    np.testing.assert_allclose(E1(x), expected, rtol=1e-14)
+    assert E1(20.0) == pytest.approx(expected[1], rel=1e-14)
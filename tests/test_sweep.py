@@ -0,0 +1,52 @@
+"""Tests for the parallel parameter sweep."""
+
+import pandas as pd
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+from classmodel.sweep import concat_outputs, grid, partition, run_sweep
+
+
+def test_grid():
+    """Verify that the grid spans the Cartesian product of the given fields."""
+    runtime, beta, wg = 3600.0, [0.1, 0.2], [0.2, 0.25, 0.3]
+    configs = list(grid(CLASSConfig(runtime=runtime), beta=beta, wg=wg))
+
+    assert len(configs) == len(beta) * len(wg)
+    assert {(c.beta, c.wg) for c in configs} == {(b, w) for b in beta for w in wg}
+    assert all(c.runtime == runtime for c in configs)
+
+
+def test_partition_balances_cost():
+    """Verify that expensive tasks are spread over the chunks."""
+    costs = [10, 1, 1, 10, 1, 1]
+    chunks = partition(costs, 2)
+
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(6))
+    assert [sum(costs[i] for i in chunk) for chunk in chunks] == [12, 12]
+
+
+def test_run_sweep():
+    """Verify that a parallel sweep reproduces the individual model runs."""
+    configs = [CLASSConfig(runtime=3600, beta=0.1), CLASSConfig(runtime=7200, dt=30.0, beta=0.3)]
+    output = run_sweep(configs, max_workers=2)
+
+    assert list(output.index.get_level_values("member").unique()) == [0, 1]
+    for member, config in enumerate(configs):
+        model = Model(config)
+        model.run()
+        expected = model.out.to_pandas()
+        expected.index.name = "step"
+        pd.testing.assert_frame_equal(output.loc[member], expected)
+
+
+def test_concat_outputs_variables():
+    """Verify that the output of members with different variables is not concatenated."""
+    outputs = []
+    for variables in [("h", "theta"), ("h", "q")]:
+        model = Model(CLASSConfig(runtime=600, output_variables=variables))
+        model.run()
+        outputs.append(model.out)
+    with pytest.raises(ValueError, match="member 1"):
+        concat_outputs(outputs)
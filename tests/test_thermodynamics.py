@@ -0,0 +1,79 @@
+"""Tests for the lifting condensation level solvers."""
+
+import warnings
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from classmodel.config import CLASSConfig
+from classmodel.model import Model
+from classmodel.thermodynamics import ConvergenceWarning, lcl_analytic, lcl_newton, qsat
+
+RHO, G, CP = 1.2, 9.81, 1005.0
+
+# mixed layers with a cloud base above the ABL, a dry mixed layer and a supersaturated one
+THETA = np.array([288.0, 300.0, 280.0, 295.0])
+Q = np.array([0.008, 0.01, 0.002, 0.017])
+PS = 101300.0
+
+# tolerance of the Newton solver, and the iterations that it needs from the first guesses
+TOL = 1e-10
+ITMAX = 6
+
+
+def relative_humidity(z):
+    """Return the relative humidity of the mixed layers at height ``z``."""
+    return Q / qsat(THETA - G / CP * z, PS - RHO * G * z)
+
+
+@pytest.mark.parametrize("guess", [200.0, 1500.0, -500.0])
+def test_lcl_newton(guess):
+    """Verify that the Newton solver finds saturation from different first guesses."""
+    lcl, it, res = lcl_newton(THETA, Q, PS, RHO, G, CP, guess)
+    np.testing.assert_allclose(relative_humidity(lcl), 1.0, rtol=TOL)
+    assert np.all(np.abs(res) <= TOL)
+    assert np.all(it <= ITMAX)
+    assert lcl[3] < 0.0 < lcl[0] < lcl[1]
+
+    lcl, it, res = lcl_newton(288.0, 0.008, PS, RHO, G, CP, guess)
+    assert np.ndim(lcl) == 0
+    np.testing.assert_allclose(lcl, lcl_newton(THETA, Q, PS, RHO, G, CP, guess)[0][0])
+
+
+def test_lcl_analytic():
+    """Verify that the closed-form LCL converges quadratically with the linearization point."""
+    lcl = lcl_newton(THETA, Q, PS, RHO, G, CP, 200.0)[0]
+    error100 = np.abs(lcl_analytic(THETA, Q, PS, RHO, G, CP, lcl + 100.0) - lcl)
+    error10 = np.abs(lcl_analytic(THETA, Q, PS, RHO, G, CP, lcl + 10.0) - lcl)
+    np.testing.assert_array_less(error100, 0.3)
+    np.testing.assert_allclose(error100 / error10, 100.0, rtol=0.05)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_lcl_type():
+    """Verify that the LCL solvers agree in a run with clouds."""
+    config = CLASSConfig(sw_sl=True, sw_rad=True, sw_ls=True, sw_cu=True)
+    zlcl = {}
+    for lcl_type in ("fixed", "newton", "analytic"):
+        r1 = Model(replace(config, lcl_type=lcl_type))
+        r1.run()
+        zlcl[lcl_type] = r1.out.zlcl
+
+    np.testing.assert_allclose(zlcl["analytic"], zlcl["newton"], rtol=0.0, atol=1e-2)
+    # the fixed-step iteration stops within 1e-4 of saturation, about 0.2 m
+    np.testing.assert_allclose(zlcl["fixed"], zlcl["newton"], rtol=0.0, atol=0.5)
+
+
+def test_lcl_not_converged():
+    """Verify that failures are counted and reported as a warning instead of printed."""
+    r1 = Model(CLASSConfig(lcl_type="newton", lcl_itmax=1, runtime=3600.0))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("default")
+        r1.run()
+    assert r1.lcl_failures > 0
+    assert 0 < len(caught) < r1.lcl_failures
+    assert all(issubclass(w.category, ConvergenceWarning) for w in caught)
+
+    with pytest.raises(ValueError, match="lcl_type"):
+        Model(CLASSConfig(lcl_type="bisection")).run()